@@ -0,0 +1,316 @@
+"""
+Adaptive Concurrency Module
+AIMD controller for outbound SerpAPI calls: the number of calls in flight grows
+additively while responses are healthy and is cut multiplicatively on 429/5xx,
+timeouts or rising latency, with all calls paused for Retry-After. Free slots go
+to waiting calls by priority class, then by weighted fair share of their tenant
+"""
+import time
+import asyncio
+import itertools
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, NamedTuple, Optional
+from priority_lanes import FairShare, priority_rank
+import metrics
+import config
+
+# Concurrency modes (config.SERP_CONCURRENCY)
+CONCURRENCY_MODES = ('adaptive', 'fixed')
+
+# Responses that mean the API is overloaded or throttling us
+CONGESTION_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Latency samples needed before rising latency counts as congestion
+LATENCY_WARMUP_SAMPLES = 20
+
+# Smoothing of the short-term latency average and of the long-term baseline
+FAST_LATENCY_WEIGHT = 0.2
+SLOW_LATENCY_WEIGHT = 0.02
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header
+
+    Args:
+        value: Header value: delay in seconds or an HTTP date
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AimdWindow:
+    """Congestion window shared by the sync and async limiters"""
+
+    def __init__(self, initial: float = None, minimum: float = None, maximum: float = None,
+                 decrease_factor: float = None, latency_factor: float = None):
+        """
+        Initialize the AIMD Window
+
+        Args:
+            initial: Starting window. If not provided, uses config.AIMD_INITIAL_WINDOW
+            minimum: Smallest window. If not provided, uses config.AIMD_MIN_WINDOW
+            maximum: Largest window. If not provided, uses config.AIMD_MAX_WINDOW
+            decrease_factor: Multiplier applied on congestion. If not provided, uses config.AIMD_DECREASE_FACTOR
+            latency_factor: Short-term latency above this multiple of the baseline is congestion.
+                            If not provided, uses config.AIMD_LATENCY_FACTOR
+        """
+        self.minimum = max(1.0, config.AIMD_MIN_WINDOW if minimum is None else minimum)
+        self.maximum = max(self.minimum, config.AIMD_MAX_WINDOW if maximum is None else maximum)
+        self.decrease_factor = config.AIMD_DECREASE_FACTOR if decrease_factor is None else decrease_factor
+        self.latency_factor = config.AIMD_LATENCY_FACTOR if latency_factor is None else latency_factor
+        initial = config.AIMD_INITIAL_WINDOW if initial is None else initial
+        self.window = min(self.maximum, max(self.minimum, initial))
+        # Monotonic time before which no call may start (Retry-After)
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._fast_latency = None
+        self._slow_latency = None
+        self._samples = 0
+        self._lock = threading.Lock()
+        metrics.SERP_CONCURRENCY_WINDOW.set(self.window)
+
+    @property
+    def limit(self) -> int:
+        """Calls allowed in flight right now"""
+        return max(1, int(self.window))
+
+    def _latency_congested(self, latency: float) -> bool:
+        """Track latency and report whether the short-term average rose well above the baseline"""
+        self._samples += 1
+        if self._fast_latency is None:
+            self._fast_latency = self._slow_latency = latency
+            return False
+        self._fast_latency += FAST_LATENCY_WEIGHT * (latency - self._fast_latency)
+        self._slow_latency += SLOW_LATENCY_WEIGHT * (latency - self._slow_latency)
+        return (self._samples >= LATENCY_WARMUP_SAMPLES and
+                self._fast_latency > self._slow_latency * self.latency_factor)
+
+    def on_response(self, started: float, latency: float, status: Optional[int],
+                    retry_after: Optional[float] = None) -> Optional[str]:
+        """
+        Update the window from one finished call
+
+        Args:
+            started: Monotonic time the call started
+            latency: Call duration in seconds
+            status: HTTP status, or None if the call failed without a response (timeout, connection)
+            retry_after: Seconds from a Retry-After header
+
+        Returns:
+            Congestion reason ('throttled', 'server_error', 'transport' or 'latency'), or None if healthy
+        """
+        with self._lock:
+            now = time.monotonic()
+            if status is None:
+                reason = 'transport'
+            elif status == 429:
+                reason = 'throttled'
+            elif status in CONGESTION_STATUSES:
+                reason = 'server_error'
+            elif status >= 400:
+                # Client errors (bad key, bad request) say nothing about capacity
+                return None
+            else:
+                reason = 'latency' if self._latency_congested(latency) else None
+
+            if retry_after and reason:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+            if reason is None:
+                # Additive increase: about +1 per window of healthy responses
+                self.window = min(self.maximum, self.window + 1 / self.window)
+            elif started >= self._last_decrease:
+                # Multiplicative decrease, once per round trip: calls sent before the last cut don't cut again
+                self.window = max(self.minimum, self.window * self.decrease_factor)
+                self._last_decrease = now
+                metrics.SERP_CONGESTION_EVENTS.labels(reason).inc()
+            metrics.SERP_CONCURRENCY_WINDOW.set(self.window)
+            return reason
+
+
+class _Waiter(NamedTuple):
+    """A call waiting for a slot"""
+    rank: int
+    tenant: str
+    order: int
+
+
+class _Admission:
+    """Waiting calls and fair-share tags shared by the sync and async limiters (callers hold their lock)"""
+
+    def __init__(self):
+        self.waiting: List[_Waiter] = []
+        self.fair_share = FairShare()
+        self._order = itertools.count()
+
+    def join(self, priority: Optional[str], tenant: Optional[str]) -> _Waiter:
+        waiter = _Waiter(priority_rank(priority), tenant or '', next(self._order))
+        self.waiting.append(waiter)
+        metrics.SERP_QUEUED_CALLS.labels(priority or 'batch').inc()
+        return waiter
+
+    def leave(self, waiter: _Waiter, priority: Optional[str]):
+        self.waiting.remove(waiter)
+        metrics.SERP_QUEUED_CALLS.labels(priority or 'batch').dec()
+
+    def is_next(self, waiter: _Waiter) -> bool:
+        """Whether the waiter is first in line (highest priority, then smallest fair-share start tag)"""
+        return self.fair_share.pick(self.waiting) is waiter
+
+    def admit(self, waiter: _Waiter):
+        self.fair_share.charge(waiter.rank, waiter.tenant)
+
+
+class AdaptiveLimiter:
+    """Blocks threads while the window is full or a Retry-After pause is in effect"""
+
+    def __init__(self, window: AimdWindow = None):
+        self.window = window or AimdWindow()
+        self.inflight = 0
+        self._condition = threading.Condition()
+        self._admission = _Admission()
+
+    def acquire(self, priority: str = None, tenant: str = None) -> float:
+        """
+        Wait for a free slot
+
+        Args:
+            priority: Priority class (see priority_lanes.PRIORITY_CLASSES). If not provided, batch
+            tenant: Tenant the call is made for (tracked website), for fair sharing within the class
+
+        Returns:
+            Token (monotonic start time) to pass to release()
+        """
+        with self._condition:
+            waiter = self._admission.join(priority, tenant)
+            try:
+                while True:
+                    pause = self.window.paused_until - time.monotonic()
+                    if pause <= 0 and self.inflight < self.window.limit and self._admission.is_next(waiter):
+                        break
+                    self._condition.wait(pause if pause > 0 else None)
+            except BaseException:
+                self._admission.leave(waiter, priority)
+                self._condition.notify_all()
+                raise
+            self._admission.leave(waiter, priority)
+            self._admission.admit(waiter)
+            self.inflight += 1
+            # The next waiter in line may fit as well
+            self._condition.notify_all()
+        metrics.SERP_INFLIGHT.inc()
+        return time.monotonic()
+
+    def release(self, token: float, status: Optional[int], retry_after: Optional[float] = None) -> Optional[str]:
+        """
+        Free a slot and feed the call's outcome to the window
+
+        Args:
+            token: Value returned by acquire()
+            status: HTTP status, or None if the call failed without a response
+            retry_after: Seconds from a Retry-After header
+
+        Returns:
+            Congestion reason, or None if the call was healthy
+        """
+        reason = self.window.on_response(token, time.monotonic() - token, status, retry_after)
+        self.abandon(token)
+        return reason
+
+    def abandon(self, token: float):
+        """Free the slot of a call that was not made, without judging the window by it"""
+        metrics.SERP_INFLIGHT.dec()
+        with self._condition:
+            self.inflight -= 1
+            self._condition.notify_all()
+
+
+class AsyncAdaptiveLimiter:
+    """Suspends coroutines while the window is full or a Retry-After pause is in effect"""
+
+    def __init__(self, window: AimdWindow = None):
+        self.window = window or AimdWindow()
+        self.inflight = 0
+        self._condition = asyncio.Condition()
+        self._admission = _Admission()
+
+    async def acquire(self, priority: str = None, tenant: str = None) -> float:
+        """Wait for a free slot (see AdaptiveLimiter.acquire)"""
+        async with self._condition:
+            waiter = self._admission.join(priority, tenant)
+            try:
+                while True:
+                    pause = self.window.paused_until - time.monotonic()
+                    if pause <= 0 and self.inflight < self.window.limit and self._admission.is_next(waiter):
+                        break
+                    if pause > 0:
+                        try:
+                            await asyncio.wait_for(self._condition.wait(), pause)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self._condition.wait()
+            except BaseException:
+                # Cancelled while waiting: whoever is next in line may now go
+                self._admission.leave(waiter, priority)
+                self._condition.notify_all()
+                raise
+            self._admission.leave(waiter, priority)
+            self._admission.admit(waiter)
+            self.inflight += 1
+            self._condition.notify_all()
+        metrics.SERP_INFLIGHT.inc()
+        return time.monotonic()
+
+    async def release(self, token: float, status: Optional[int], retry_after: Optional[float] = None) -> Optional[str]:
+        """Free a slot and feed the call's outcome to the window (see AdaptiveLimiter.release)"""
+        reason = self.window.on_response(token, time.monotonic() - token, status, retry_after)
+        await self.abandon(token)
+        return reason
+
+    async def abandon(self, token: float):
+        """Free the slot of a call that was cancelled, without judging the window by it"""
+        metrics.SERP_INFLIGHT.dec()
+        async with self._condition:
+            self.inflight -= 1
+            self._condition.notify_all()
+
+
+_limiter: Optional[AdaptiveLimiter] = None
+_async_limiter: Optional[AsyncAdaptiveLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveLimiter:
+    """Return the process-wide limiter, so every RankChecker shares one window"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter()
+        return _limiter
+
+
+def get_async_limiter() -> AsyncAdaptiveLimiter:
+    """Return the process-wide async limiter (same window as get_limiter())"""
+    global _async_limiter
+    window = get_limiter().window
+    with _limiter_lock:
+        if _async_limiter is None:
+            _async_limiter = AsyncAdaptiveLimiter(window)
+        return _async_limiter
@@ -1,18 +1,35 @@
 """
 Flask Web Application for Google Rank Tracking System
 """
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import sys
+import time
 from typing import List
-from main import run_rank_tracking, load_keywords_from_csv
+from main import run_rank_tracking, enqueue_rank_tracking
+from work_queue import WorkQueue
+from upload_parser import UploadError, parse_keyword_upload
+from history_export import EXPORT_FORMATS, export_history, parse_checked_on
+from rank_trends import SeriesTrendCache, TrendCache
+from latest_ranks import format_entry, get_table
+from rank_series import DEFAULT_LOCATION, format_series, get_store, parse_day
 from rank_checker import RankChecker
+import metrics
+import profiling
+import fast_json
 import config
 
 # Import storage manager based on configuration
-if config.STORAGE_TYPE == 'docs':
+if config.STORAGE_TYPE == 'docs' and config.DOCS_SHARDING != 'off':
+    from sharded_docs_manager import ShardedDocsManager
+    StorageManager = ShardedDocsManager
+elif config.STORAGE_TYPE == 'docs':
     from google_docs_manager import GoogleDocsManager
     StorageManager = GoogleDocsManager
+elif config.STORAGE_TYPE == 'sheets' and config.SHEETS_PARTITIONING == 'website':
+    from partitioned_sheets_manager import PartitionedSheetsManager
+    StorageManager = PartitionedSheetsManager
 elif config.STORAGE_TYPE == 'sheets':
     from google_sheets_manager import GoogleSheetsManager
     StorageManager = GoogleSheetsManager
@@ -21,8 +38,44 @@ else:
     from google_docs_manager import GoogleDocsManager
     StorageManager = GoogleDocsManager
 
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Serializes API responses with orjson when it is installed (less CPU for large result lists)
+    
+    The decoded values are the same as with Flask's provider, and datetimes still
+    go through its default (HTTP dates). The text differs: it is compact, and non-ASCII
+    characters are sent as UTF-8 instead of \\u escapes. Values orjson cannot encode, such as
+    integers wider than 64 bits, are serialized by Flask's provider instead.
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        if not fast_json.ORJSON_AVAILABLE or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return fast_json.dumps(obj, default=self.default, sort_keys=self.sort_keys).decode('utf-8')
+        except TypeError:
+            # orjson.JSONEncodeError (e.g. an int over 64 bits)
+            return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return fast_json.loads(s)
+
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
+profiling.init_app(app)
+
+# Columnar history shared across requests; only newly appended rows are parsed per call
+trend_cache = TrendCache()
+series_trend_cache = SeriesTrendCache()
+
+def get_storage_manager():
+    """Create the storage manager for a request (app.config['STORAGE_MANAGER_FACTORY'] overrides the default)"""
+    return app.config.get('STORAGE_MANAGER_FACTORY', StorageManager)()
+
 
 # Suppress Flask output for cleaner API responses
 import logging
@@ -30,37 +83,148 @@ log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
 
 
+@app.before_request
+def start_request_timer():
+    """Record when the request started, for the request duration histogram"""
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe request duration by route, method and status"""
+    started = g.get('request_started')
+    if started is not None and request.url_rule is not None and request.url_rule.rule != '/metrics':
+        metrics.HTTP_REQUEST_SECONDS.labels(
+            request.url_rule.rule, request.method, str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.generate_latest(), mimetype=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.route('/')
 def index():
     """Serve the main frontend page"""
     return render_template('index.html')
 
 
+def format_result(result) -> dict:
+    """Format a RankResult for the frontend"""
+    return {
+        'keyword': result.keyword,
+        'position': str(result.ranking_position),
+        'found_url': result.get('found_url', ''),
+        'status': result.status.value,
+        'checked_on': result.get('checked_on', ''),
+        'serp_title': result.get('serp_title', ''),
+        'serp_snippet': result.get('serp_snippet', ''),
+        'error': result.get('error')
+    }
+
+
 @app.route('/api/check-rankings', methods=['POST'])
 def check_rankings():
     """API endpoint to check website rankings"""
-    try:
-        data = request.json
-        
-        website_url = data.get('website_url', '').strip()
-        keywords = data.get('keywords', [])
-        location = data.get('location', 'United States')
+    with metrics.INFLIGHT_CHECKS.track_inprogress():
+        return _check_rankings()
+
+
+def parse_check_request(data: dict):
+    """
+    Validate a /api/check-rankings request body
+    
+    Args:
+        data: Decoded JSON body
         
-        if not website_url:
-            return jsonify({'error': 'Website URL is required'}), 400
+    Returns:
+        (website_url, keywords, location) tuple
         
-        if not keywords or len(keywords) == 0:
-            return jsonify({'error': 'At least one keyword is required'}), 400
+    Raises:
+        ValueError: With the message returned to the client as a 400 error
+    """
+    website_url = data.get('website_url', '').strip()
+    keywords = data.get('keywords', [])
+    location = data.get('location', 'United States')
+    
+    if not website_url:
+        raise ValueError('Website URL is required')
+    
+    if not keywords or len(keywords) == 0:
+        raise ValueError('At least one keyword is required')
+    
+    # Filter out empty keywords
+    keywords = [k.strip() for k in keywords if k.strip()]
+    
+    if not keywords:
+        raise ValueError('At least one valid keyword is required')
+    
+    return website_url, keywords, location
+
+
+def queued_check_response(website_url: str, keywords: List[str], location: str) -> dict:
+    """Enqueue checks for rank_worker.py processes and build the 202 response body"""
+    job_id = enqueue_rank_tracking(website_url, keywords, location, source='web')
+    return {
+        'success': True,
+        'queued': True,
+        'job_id': job_id,
+        'website_url': website_url,
+        'location': location
+    }
+
+
+def save_check_results(results: List) -> bool:
+    """
+    Save checked results to storage
+    
+    Returns:
+        True if the results were saved (errors are logged, not raised, so the request still succeeds)
+    """
+    try:
+        storage_manager = get_storage_manager()
+        if config.STORAGE_TYPE == 'docs':
+            storage_manager.append_results(results)
+        else:
+            storage_manager.append_results(results, 'Rank Tracking')
+        return True
+    except Exception as e:
+        # Log error but don't fail the request
+        print(f"Error saving results: {e}")
+        return False
+
+
+def check_response(results: List, saved: bool, website_url: str, location: str) -> dict:
+    """Build the /api/check-rankings response body"""
+    return {
+        'success': True,
+        'results': [format_result(result) for result in results],
+        'saved': saved,
+        'website_url': website_url,
+        'location': location
+    }
+
+
+def _check_rankings():
+    """Handle a /api/check-rankings request (see check_rankings)"""
+    try:
+        data = request.json
         
-        # Filter out empty keywords
-        keywords = [k.strip() for k in keywords if k.strip()]
+        try:
+            website_url, keywords, location = parse_check_request(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if not keywords:
-            return jsonify({'error': 'At least one valid keyword is required'}), 400
+        # Hand the checks to rank_worker.py processes; poll /api/jobs/<job_id> for results
+        if data.get('queue', config.USE_WORK_QUEUE):
+            return jsonify(queued_check_response(website_url, keywords, location)), 202
         
         # Initialize rank checker
         try:
-            rank_checker = RankChecker()
+            rank_checker = RankChecker(prefetch_pages=config.WEB_PREFETCH_PAGES, priority='interactive')
         except ValueError as e:
             return jsonify({'error': str(e)}), 500
         
@@ -72,48 +236,25 @@ def check_rankings():
         )
         
         # Save results to storage
-        saved = False
-        try:
-            storage_manager = StorageManager()
-            if config.STORAGE_TYPE == 'docs':
-                storage_manager.append_results(results)
-            else:
-                storage_manager.append_results(results, 'Rank Tracking')
-            saved = True
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Error saving results: {e}")
+        saved = save_check_results(results)
         
-        # Format results for frontend
-        formatted_results = []
-        for result in results:
-            pos = result['ranking_position']
-            status = 'success'
-            
-            if result.get('error'):
-                status = 'error'
-            elif isinstance(pos, str) and pos.startswith('>'):
-                status = 'not_found'
-            
-            formatted_results.append({
-                'keyword': result['keyword'],
-                'position': str(pos),
-                'found_url': result.get('found_url', ''),
-                'status': status,
-                'checked_on': result.get('checked_on', ''),
-                'serp_title': result.get('serp_title', ''),
-                'serp_snippet': result.get('serp_snippet', ''),
-                'error': result.get('error')
-            })
+        return jsonify(check_response(results, saved, website_url, location))
         
-        return jsonify({
-            'success': True,
-            'results': formatted_results,
-            'saved': saved,
-            'website_url': website_url,
-            'location': location
-        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """API endpoint for the progress and results of a queued rank check"""
+    try:
+        queue = WorkQueue()
+        status = queue.job_status(job_id)
+        if status is None:
+            return jsonify({'success': False, 'error': f"Job not found: {job_id}"}), 404
         
+        results = [format_result(result) for result in queue.job_results(job_id)] if status['finished'] else []
+        return jsonify({'success': True, **status, 'results': results})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -121,63 +262,86 @@ def check_rankings():
 @app.route('/api/history', methods=['GET'])
 def get_history():
     """API endpoint to get ranking history"""
+    payload, status = history_payload(request.args)
+    return jsonify(payload), status
+
+
+def history_payload(args) -> tuple:
+    """
+    Build the /api/history response
+    
+    Args:
+        args: Query parameters (website_url, keyword, limit, offset)
+        
+    Returns:
+        (response body, HTTP status) tuple
+    """
     try:
         # History feature reads from Google Docs/Sheets
         try:
-            storage_manager = StorageManager()
+            storage_manager = get_storage_manager()
         except (FileNotFoundError, ValueError) as e:
             # Handle missing token.pickle on cloud platforms
             error_msg = str(e)
             if 'Token file not found on cloud platform' in error_msg or 'Cannot authenticate on cloud platform' in error_msg:
-                return jsonify({
+                return {
                     'success': False,
                     'error': 'Authentication token not found. Please upload token.pickle to Render as a secret file. See deployment guide for instructions.',
                     'details': error_msg,
                     'results': [],
                     'count': 0
-                }), 500
+                }, 500
             else:
-                return jsonify({
+                return {
                     'success': False,
                     'error': str(e),
                     'results': [],
                     'count': 0
-                }), 500
+                }, 500
         
         try:
-            all_results = storage_manager.get_all_results()
+            # Partitioned storage reads only the requested website's rows
+            read_website = getattr(storage_manager, 'get_website_results', None)
+            if read_website and args.get('website_url'):
+                all_results = read_website(args.get('website_url'))
+            else:
+                all_results = storage_manager.get_all_results()
         except Exception as e:
             # Handle authentication errors
             error_str = str(e)
             if 'invalid_grant' in error_str.lower() or 'Bad Request' in error_str:
-                return jsonify({
+                return {
                     'success': False,
                     'error': 'Authentication expired. Please re-authenticate by running a rank check first, or delete token.pickle and try again.',
                     'results': [],
                     'count': 0
-                }), 401
+                }, 401
             elif 'corrupted' in error_str.lower() or 'invalid load key' in error_str.lower() or '\xef' in error_str:
-                return jsonify({
+                return {
                     'success': False,
                     'error': 'The authentication token file is corrupted. This usually happens when token.pickle was uploaded as text instead of binary to Render. See DEPLOYMENT.md for instructions on how to fix this.',
                     'details': str(e),
                     'results': [],
                     'count': 0
-                }), 500
+                }, 500
             raise
         
         # Parse results (skip header row)
         if len(all_results) <= 1:
-            return jsonify({
+            return {
                 'success': True,
                 'results': [],
                 'count': 0
-            })
+            }, 200
         
         # Filter results based on query parameters
-        website_url = request.args.get('website_url', '')
-        keyword = request.args.get('keyword', '')
-        limit = int(request.args.get('limit', 50))
+        website_url = args.get('website_url', '')
+        keyword = args.get('keyword', '')
+        limit = int(args.get('limit', 50))
+        # Matching rows to skip, so the web UI can load long histories page by page
+        offset = max(0, int(args.get('offset', 0)))
+        has_more = False
+        matched = 0
         
         # Parse rows (assuming tab-separated format)
         formatted_results = []
@@ -194,6 +358,13 @@ def get_history():
             if keyword and row_keyword != keyword:
                 continue
             
+            matched += 1
+            if matched <= offset:
+                continue
+            if len(formatted_results) >= limit:
+                has_more = True
+                break
+            
             pos = row[2] if len(row) > 2 else ''
             status = 'success'
             
@@ -213,58 +384,201 @@ def get_history():
                 'serp_snippet': row[6] if len(row) > 6 else '',
                 'timestamp': row[4] if len(row) > 4 else ''
             })
-            
-            if len(formatted_results) >= limit:
-                break
         
-        return jsonify({
+        return {
             'success': True,
             'results': formatted_results,
-            'count': len(formatted_results)
-        })
+            'count': len(formatted_results),
+            'offset': offset,
+            'has_more': has_more
+        }, 200
         
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+
+@app.route('/api/history/series', methods=['GET'])
+def get_history_series():
+    """API endpoint for the daily positions of one keyword (served from the rank series store)"""
+    if not config.RANK_SERIES_ENABLED:
+        return jsonify({'success': False, 'error': 'The rank series store is disabled (RANK_SERIES_ENABLED)'}), 404
+    
+    website_url = request.args.get('website_url')
+    keyword = request.args.get('keyword')
+    if not website_url or not keyword:
+        return jsonify({'success': False, 'error': 'website_url and keyword are required'}), 400
+    
+    since = request.args.get('since')
+    until = request.args.get('until')
+    since_day = parse_day(since) if since else None
+    until_day = parse_day(until) if until else None
+    if (since and since_day is None) or (until and until_day is None):
+        return jsonify({'success': False, 'error': 'Dates must use YYYY-MM-DD format'}), 400
+    
+    location = request.args.get('location') or DEFAULT_LOCATION
+    try:
+        view = get_store().series(website_url, keyword, location, since_day, until_day)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    series = format_series(view) if view is not None else {'dates': [], 'positions': [], 'count': 0}
+    return jsonify({
+        'success': True,
+        'website_url': website_url,
+        'keyword': keyword,
+        'location': location,
+        **series
+    })
+
+
+@app.route('/api/export', methods=['GET'])
+def export_history_file():
+    """API endpoint to download rank history as Parquet, Arrow or gzip CSV"""
+    fmt = request.args.get('format', 'parquet')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    since = request.args.get('since')
+    until = request.args.get('until')
+    since_dt = parse_checked_on(f"{since} 00:00:00") if since else None
+    until_dt = parse_checked_on(f"{until} 00:00:00") if until else None
+    if (since and not since_dt) or (until and not until_dt):
+        return jsonify({'error': 'Dates must use YYYY-MM-DD format'}), 400
+    
+    try:
+        storage_manager = get_storage_manager()
+        blocks = export_history(
+            storage_manager,
+            fmt,
+            request.args.get('website_url') or None,
+            request.args.get('keyword') or None,
+            since_dt,
+            until_dt,
+            request.args.get('location') or None
+        )
+    except ImportError as e:
+        return jsonify({'error': str(e)}), 501
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    mimetypes = {
+        'parquet': 'application/vnd.apache.parquet',
+        'arrow': 'application/vnd.apache.arrow.file',
+        'csv.gz': 'application/gzip'
+    }
+    return Response(
+        blocks,
+        mimetype=mimetypes[fmt],
+        headers={'Content-Disposition': f'attachment; filename=rank_history.{fmt}'}
+    )
+
+
+@app.route('/api/latest', methods=['GET'])
+def get_latest():
+    """API endpoint for the current position of each tracked keyword (served from the latest-rank table)"""
+    try:
+        limit = int(request.args.get('limit', 0)) or None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    
+    try:
+        entries = get_table().query(
+            request.args.get('website_url') or None,
+            request.args.get('keyword') or None,
+            request.args.get('location'),
+            limit
+        )
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    results = [format_entry(entry) for entry in entries]
+    return jsonify({
+        'success': True,
+        'results': results,
+        'count': len(results)
+    })
+
+
+@app.route('/api/trends', methods=['GET'])
+def get_trends():
+    """API endpoint for per-keyword rank trends (deltas, moving averages, visibility)"""
+    try:
+        window = int(request.args.get('window', config.TREND_WINDOW))
+        limit = int(request.args.get('limit', 0)) or None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'window and limit must be integers'}), 400
+    if window < 1:
+        return jsonify({'success': False, 'error': 'window must be at least 1'}), 400
+    
+    try:
+        if config.RANK_SERIES_ENABLED:
+            # Served from the memory-mapped series store, without reading stored history
+            cache = series_trend_cache
+        else:
+            cache = trend_cache
+            cache.update(get_storage_manager().get_all_results())
+        report = cache.report(
+            request.args.get('website_url') or None,
+            request.args.get('keyword') or None,
+            window,
+            limit
+        )
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({'success': True, **report})
 
 
 @app.route('/api/upload-keywords', methods=['POST'])
 def upload_keywords():
-    """API endpoint to upload keywords from file"""
-    try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not file.filename.endswith('.csv'):
-            return jsonify({'error': 'Only CSV files are supported'}), 400
+    """API endpoint to upload keywords from file (parsed from the request stream, never written to disk)"""
+    payload, status = upload_payload(
+        request.stream,
+        request.content_length,
+        request.mimetype,
+        request.mimetype_params.get('boundary')
+    )
+    return jsonify(payload), status
+
+
+def upload_payload(stream, content_length: int, mimetype: str, boundary: str) -> tuple:
+    """
+    Parse a keyword upload and build the /api/upload-keywords response
+    
+    Args:
+        stream: Binary request body stream
+        content_length: Declared body length, if any
+        mimetype: Request content type (without parameters)
+        boundary: Multipart boundary, for multipart/form-data uploads
         
-        # Save file temporarily
-        import tempfile
-        import os
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+    Returns:
+        (response body, HTTP status) tuple
+    """
+    try:
+        # Reject oversized uploads up front when the client declares a length
+        if content_length and content_length > config.UPLOAD_MAX_BYTES + 64 * 1024:
+            return {'error': f'File is too large (limit is {config.UPLOAD_MAX_BYTES} bytes)'}, 413
         
         try:
-            keywords = load_keywords_from_csv(tmp_path)
-        finally:
-            os.unlink(tmp_path)
+            parsed = parse_keyword_upload(stream, mimetype, boundary)
+        except UploadError as e:
+            return {'error': str(e)}, e.status_code
         
+        keywords = parsed['keywords']
         if not keywords:
-            return jsonify({'error': 'No keywords found in file'}), 400
+            return {'error': 'No keywords found in file', 'stats': parsed['stats']}, 400
         
-        return jsonify({
+        return {
             'success': True,
             'keywords': keywords,
-            'count': len(keywords)
-        })
+            'rows': parsed['rows'],
+            'count': len(keywords),
+            'duplicates': parsed['duplicates'],
+            'stats': parsed['stats']
+        }, 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
 
 if __name__ == '__main__':
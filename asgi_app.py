@@ -0,0 +1,192 @@
+"""
+ASGI Web Application for Google Rank Tracking System
+Async serving mode: rank checks, history and uploads run as coroutines, so a
+long check holds no thread while it waits on SerpAPI; all other routes are
+served by the Flask app (app.py) unchanged
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import contextlib
+from typing import Awaitable, Callable
+from app import (app as flask_app, parse_check_request, queued_check_response, save_check_results,
+                 check_response, history_payload, upload_payload)
+from async_rank_checker import AsyncRankChecker
+import metrics
+import fast_json
+import config
+
+try:
+    import httpx
+    from a2wsgi import WSGIMiddleware
+    from starlette.applications import Starlette
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Mount, Route
+    from werkzeug.http import parse_options_header
+except ImportError:
+    raise ImportError("The async serving mode requires starlette, a2wsgi, uvicorn and httpx. "
+                      "Install them with: pip install starlette a2wsgi uvicorn httpx")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with fast_json (orjson when installed)"""
+
+    def render(self, content) -> bytes:
+        return fast_json.dumps(content)
+
+
+def _timed(rule: str, handler: Callable[[Request], Awaitable[Response]]) -> Callable[[Request], Awaitable[Response]]:
+    """Record the request duration histogram for a native async route (Flask routes record their own)"""
+    async def endpoint(request: Request) -> Response:
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.HTTP_REQUEST_SECONDS.labels(rule, request.method, str(status)).observe(
+                time.perf_counter() - started)
+    return endpoint
+
+
+async def check_rankings(request: Request) -> Response:
+    """API endpoint to check website rankings (same contract as app.check_rankings)"""
+    with metrics.INFLIGHT_CHECKS.track_inprogress():
+        try:
+            data = await request.json()
+
+            try:
+                website_url, keywords, location = parse_check_request(data)
+            except ValueError as e:
+                return FastJSONResponse({'error': str(e)}, 400)
+
+            if data.get('queue', config.USE_WORK_QUEUE):
+                body = await asyncio.to_thread(queued_check_response, website_url, keywords, location)
+                return FastJSONResponse(body, 202)
+
+            try:
+                rank_checker = AsyncRankChecker(request.app.state.client, prefetch_pages=config.WEB_PREFETCH_PAGES,
+                                                priority='interactive')
+            except ValueError as e:
+                return FastJSONResponse({'error': str(e)}, 500)
+
+            # Bound concurrent checks; waiting requests cost a coroutine, not a thread
+            async with request.app.state.check_slots:
+                results = await rank_checker.check_multiple_keywords_async(keywords, website_url, location)
+
+            # Google API clients are blocking, so storage calls run on the thread pool
+            saved = await asyncio.to_thread(save_check_results, results)
+            return FastJSONResponse(check_response(results, saved, website_url, location))
+
+        except Exception as e:
+            return FastJSONResponse({'error': str(e)}, 500)
+
+
+async def get_history(request: Request) -> Response:
+    """API endpoint to get ranking history (same contract as app.get_history)"""
+    payload, status = await asyncio.to_thread(history_payload, request.query_params)
+    return FastJSONResponse(payload, status)
+
+
+async def upload_keywords(request: Request) -> Response:
+    """API endpoint to upload keywords from file (same contract as app.upload_keywords)"""
+    content_length = int(request.headers.get('content-length') or 0) or None
+    mimetype, options = parse_options_header(request.headers.get('content-type', ''))
+    limit = config.UPLOAD_MAX_BYTES + 64 * 1024
+
+    # Receive the body without blocking; small uploads stay in memory, large ones spill to a temp file
+    with tempfile.SpooledTemporaryFile(max_size=config.ASYNC_UPLOAD_SPOOL_BYTES) as spool:
+        if not (content_length and content_length > limit):
+            received = 0
+            async for chunk in request.stream():
+                received += len(chunk)
+                spool.write(chunk)
+                if received > limit:
+                    # Enough to trip the parser's size limit; the rest is never read
+                    break
+            spool.seek(0)
+
+        payload, status = await asyncio.to_thread(upload_payload, spool, content_length, mimetype,
+                                                  options.get('boundary'))
+    return FastJSONResponse(payload, status)
+
+
+# Routes served natively; everything else falls through to the Flask app
+NATIVE_ROUTES = {
+    '/api/check-rankings': (check_rankings, ['POST']),
+    '/api/history': (get_history, ['GET']),
+    '/api/upload-keywords': (upload_keywords, ['POST'])
+}
+
+
+class _NativeRouteCors:
+    """Apply CORS headers to native routes only (flask-cors already handles the Flask routes)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.cors = CORSMiddleware(app, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in NATIVE_ROUTES:
+            await self.cors(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    """Create the shared SerpAPI connection pool and check limiter for the server's lifetime"""
+    limits = httpx.Limits(max_connections=config.ASYNC_MAX_CONNECTIONS,
+                          max_keepalive_connections=config.ASYNC_MAX_CONNECTIONS)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        app.state.client = client
+        app.state.check_slots = asyncio.Semaphore(config.ASYNC_MAX_CONCURRENT_CHECKS)
+        yield
+
+
+def create_app() -> Starlette:
+    """
+    Build the ASGI application
+
+    Returns:
+        Starlette application wrapping the Flask app
+    """
+    routes = [Route(path, _timed(path, handler), methods=methods)
+              for path, (handler, methods) in NATIVE_ROUTES.items()]
+    routes.append(Mount('/', app=WSGIMiddleware(flask_app, workers=config.ASYNC_WSGI_THREADS)))
+    starlette_app = Starlette(routes=routes, lifespan=lifespan)
+    starlette_app.add_middleware(_NativeRouteCors)
+    return starlette_app
+
+
+asgi_app = create_app()
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: uvicorn is not installed. Install it with: pip install uvicorn")
+        sys.exit(1)
+
+    # Use PORT from environment (for Render/Heroku) or default to 8080
+    port = int(os.environ.get('PORT', 8080))
+    if len(sys.argv) > 1:
+        try:
+            port = int(sys.argv[1])
+        except ValueError:
+            print(f"Invalid port number: {sys.argv[1]}. Using default port 8080.")
+
+    print("\n" + "="*60)
+    print("Google Rank Tracking System - Web Interface (async)")
+    print("="*60)
+    print(f"Storage Type: {config.STORAGE_TYPE}")
+    print(f"Concurrent checks: up to {config.ASYNC_MAX_CONCURRENT_CHECKS}")
+    print(f"Open your browser and go to: http://localhost:{port}")
+    print("="*60 + "\n")
+    uvicorn.run(asgi_app, host='0.0.0.0', port=port, log_level='warning')
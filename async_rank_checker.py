@@ -0,0 +1,246 @@
+"""
+Async Rank Checker Module
+Non-blocking variant of RankChecker for the ASGI serving mode (asgi_app.py)
+"""
+import time
+import sqlite3
+import asyncio
+from collections import deque
+from typing import AsyncIterator, List, Optional, Tuple
+from rank_checker import RankChecker
+from rank_result import RankResult
+from adaptive_concurrency import CONGESTION_STATUSES, get_async_limiter, parse_retry_after
+from serpapi_keys import RETIRE_REASONS, KeyPoolExhausted
+import metrics
+import fast_json
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+
+class AsyncRankChecker(RankChecker):
+    """RankChecker whose SerpAPI calls are awaited instead of blocking a thread"""
+
+    def __init__(self, client: 'httpx.AsyncClient' = None, api_key: str = None, capture_snippets: bool = None,
+                 archive=None, prefetch_pages: int = 0, priority: str = 'batch'):
+        """
+        Initialize the Async Rank Checker
+
+        Args:
+            client: Shared httpx.AsyncClient (connection pool). A private one is created if not provided
+            api_key: SerpAPI key. If not provided, uses the shared key pool (see RankChecker)
+            capture_snippets: Keep SERP title/snippet of matches. If not provided, uses config.CAPTURE_SERP_SNIPPETS
+            archive: SerpArchive receiving every fetched page (see RankChecker)
+            prefetch_pages: Result pages of one keyword fetched at once (see RankChecker)
+            priority: Priority class of this checker's SerpAPI calls (see RankChecker)
+        """
+        if not HTTPX_AVAILABLE:
+            raise ImportError("The async serving mode requires httpx. Install it with: pip install httpx")
+        super().__init__(api_key, capture_snippets, archive, prefetch_pages, priority)
+        self.client = client or httpx.AsyncClient(timeout=30)
+        self.limiter = get_async_limiter() if self.limiter else None
+
+    async def check_ranking_async(self, keyword: str, website_url: str, location: str = "United States",
+                                  max_results: int = None) -> RankResult:
+        """
+        Check the ranking position of a website for a given keyword (see RankChecker.check_ranking)
+
+        Args:
+            keyword: Search keyword
+            website_url: Website URL to track
+            location: Search location (default: United States)
+            max_results: Search depth for this keyword. If not provided, uses config.MAX_RESULTS_TO_CHECK
+
+        Returns:
+            RankResult
+        """
+        return (await self.check_targets_async(keyword, [website_url], location, max_results))[0]
+
+    async def check_targets_async(self, keyword: str, targets: List[str], location: str = "United States",
+                                  max_results: int = None) -> List[RankResult]:
+        """
+        Check the ranking positions of several websites for one keyword (see RankChecker.check_targets)
+
+        Args:
+            keyword: Search keyword
+            targets: Website URLs to track
+            location: Search location (default: United States)
+            max_results: Search depth for this keyword. If not provided, uses config.MAX_RESULTS_TO_CHECK
+
+        Returns:
+            One RankResult per target, in target order
+        """
+        started = time.perf_counter()
+        results = await self._check_ranking_async(keyword, targets, location, max_results)
+        metrics.KEYWORD_CHECK_SECONDS.observe(time.perf_counter() - started)
+        for result in results:
+            metrics.KEYWORD_CHECKS.labels(result.status.value).inc()
+        return results
+
+    async def _fetch_page_async(self, params: dict, tenant: str = None) -> 'httpx.Response':
+        """Fetch one SerpAPI result page, recording latency and error metrics (see RankChecker._fetch_page)"""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            token = await self.limiter.acquire(self.priority, tenant) if self.limiter else None
+            try:
+                key = self.keys.acquire()
+            except KeyPoolExhausted:
+                if token is not None:
+                    await self.limiter.abandon(token)
+                raise
+            status, retry_after, key_error, cancelled = None, None, None, False
+            try:
+                response = await self.client.get(self.base_url, params=dict(params, api_key=key.key))
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                key_error = self.keys.release(key, status, response.text if status >= 400 else '', retry_after)
+                key = None
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                if isinstance(e, httpx.HTTPStatusError):
+                    metrics.CHECK_ERRORS.labels(f"http_{e.response.status_code}").inc()
+                elif isinstance(e, httpx.TimeoutException):
+                    metrics.CHECK_ERRORS.labels('timeout').inc()
+                else:
+                    metrics.CHECK_ERRORS.labels('connection' if isinstance(e, httpx.TransportError)
+                                                else type(e).__name__).inc()
+                if key_error in RETIRE_REASONS and self.keys.available():
+                    continue
+                if attempt >= self.max_retries or (status is not None and status not in CONGESTION_STATUSES):
+                    raise
+                attempt += 1
+                metrics.SERP_RETRIES.inc()
+            except asyncio.CancelledError:
+                # A prefetched page that is no longer needed says nothing about the API
+                cancelled = True
+                raise
+            finally:
+                if key is not None and cancelled:
+                    self.keys.abandon(key)
+                elif key is not None:
+                    self.keys.release(key, None)
+                if token is not None and (cancelled or key_error in RETIRE_REASONS):
+                    await self.limiter.abandon(token)
+                elif token is not None:
+                    await self.limiter.release(token, status, retry_after)
+                metrics.SERP_PAGE_SECONDS.observe(time.perf_counter() - started)
+
+    async def _iter_pages_async(self, keyword: str, location: str, max_pages: int,
+                                tenant: str = None) -> AsyncIterator[Tuple[int, 'httpx.Response']]:
+        """Fetch the result pages of one keyword in page order (see RankChecker._iter_pages)"""
+        if self.prefetch_pages <= 1:
+            for page in range(max_pages):
+                # Rate limiting - be respectful to API (without holding a thread)
+                if page:
+                    await asyncio.sleep(self.page_delay)
+                start = page * self.results_per_page
+                yield start, await self._fetch_page_async(self._page_params(keyword, location, start), tenant)
+            return
+
+        pending = deque()
+        try:
+            for page in range(max_pages):
+                start = page * self.results_per_page
+                task = asyncio.ensure_future(self._fetch_page_async(self._page_params(keyword, location, start),
+                                                                    tenant))
+                pending.append((start, task))
+                if len(pending) >= self.prefetch_pages:
+                    start, task = pending.popleft()
+                    yield start, await task
+            while pending:
+                start, task = pending.popleft()
+                yield start, await task
+        finally:
+            for _, task in pending:
+                metrics.SERP_PREFETCH_WASTED.inc()
+                if task.done():
+                    if not task.cancelled():
+                        task.exception()  # Retrieved so asyncio does not log it
+                else:
+                    task.cancel()
+
+    async def _check_ranking_async(self, keyword: str, targets: List[str], location: str,
+                                   max_results: Optional[int]) -> List[RankResult]:
+        """Search result pages for each target website (same page logic as RankChecker._check_ranking)"""
+        max_results = max_results or self.max_results
+        target_domains = [self.extract_domain(url) for url in targets]
+        matches = {}
+
+        max_pages = (max_results // self.results_per_page) + 1
+        check_id = self.archive.new_check_id() if self.archive else None
+        pages_fetched = 0
+
+        pages = self._iter_pages_async(keyword, location, max_pages, targets[0] if targets else None)
+        try:
+            async for start, response in pages:
+                pages_fetched += 1
+
+                if self.archive:
+                    try:
+                        await asyncio.to_thread(self.archive.store, check_id, keyword, location, start,
+                                                response.content)
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"Warning: could not archive SERP page: {e}")
+
+                data = fast_json.extract_serp(response.content)
+
+                if 'error' in data:
+                    metrics.CHECK_ERRORS.labels('api').inc()
+                    return [RankResult.failed(keyword, url, data['error'], location=location) for url in targets]
+
+                organic_results = data.get('organic_results', [])
+                if not organic_results:
+                    break
+
+                self._match_page(organic_results, start, target_domains, matches)
+                if len(matches) == len(targets):
+                    break
+
+        except (httpx.HTTPError, KeyPoolExhausted) as e:
+            return [RankResult.failed(keyword, url, str(e), location=location) for url in targets]
+        except ValueError as e:
+            metrics.CHECK_ERRORS.labels('invalid_json').inc()
+            return [RankResult.failed(keyword, url, f"Invalid JSON from SerpAPI: {e}", location=location)
+                    for url in targets]
+        finally:
+            # Cancels prefetched pages that are no longer needed
+            await pages.aclose()
+            metrics.SERP_PAGES_PER_KEYWORD.observe(pages_fetched)
+
+        return self._build_results(keyword, targets, location, max_results, matches)
+
+    async def check_multiple_keywords_async(self, keywords: List[str], website_url: str,
+                                            location: str = "United States") -> List[RankResult]:
+        """
+        Check rankings for multiple keywords
+
+        In adaptive mode all keywords are checked concurrently and the limiter decides
+        how many SerpAPI calls run at once; otherwise one after another with the
+        configured keyword delay.
+
+        Args:
+            keywords: List of keywords to check
+            website_url: Website URL to track
+            location: Search location
+
+        Returns:
+            List of RankResults, in keyword order
+        """
+        if self.limiter:
+            async def check(keyword: str) -> RankResult:
+                print(f"Checking keyword: {keyword}")
+                return await self.check_ranking_async(keyword, website_url, location)
+            return list(await asyncio.gather(*(check(keyword) for keyword in keywords)))
+
+        results = []
+        for index, keyword in enumerate(keywords):
+            if index:
+                await asyncio.sleep(self.keyword_delay)
+            print(f"Checking keyword: {keyword}")
+            results.append(await self.check_ranking_async(keyword, website_url, location))
+        return results
@@ -0,0 +1,371 @@
+"""
+Benchmark Script
+Measures rank-checking throughput and latency against a local fake SerpAPI server
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import contextlib
+from typing import Callable, Dict, List
+import config
+from adaptive_concurrency import CONCURRENCY_MODES
+from fake_serpapi import FakeSerpApi, add_server_arguments, settings_from_args
+from memory_storage import MemoryStorageManager
+
+SCENARIOS = ('engine', 'pipeline', 'flask', 'decode')
+
+# Repetitions of the page set in the decode scenario (CPU timings need a larger sample)
+DECODE_ROUNDS = 5
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Linear-interpolated percentile
+
+    Args:
+        values: Sample values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        Percentile value (0.0 for an empty sample)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict:
+    """Return p50/p95/p99/mean/max of a latency sample in milliseconds"""
+    return {
+        'p50': round(percentile(latencies_ms, 50), 2),
+        'p95': round(percentile(latencies_ms, 95), 2),
+        'p99': round(percentile(latencies_ms, 99), 2),
+        'mean': round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+        'max': round(max(latencies_ms), 2) if latencies_ms else 0.0
+    }
+
+
+def _keywords(count: int) -> List[str]:
+    """Generate distinct benchmark keywords"""
+    return [f"benchmark keyword {i}" for i in range(count)]
+
+
+def bench_engine(server: FakeSerpApi, keywords: List[str], website_url: str) -> Dict:
+    """Drive RankChecker.check_multiple_keywords and time each keyword"""
+    from rank_checker import RankChecker
+
+    checker = RankChecker()
+    latencies = []
+    check_ranking = checker.check_ranking
+
+    # Timed where each keyword is checked: in adaptive mode keywords run on a thread
+    # pool and results reach the caller in bursts, so gaps between them mean nothing
+    def timed_check_ranking(*args, **kwargs):
+        keyword_started = time.perf_counter()
+        try:
+            return check_ranking(*args, **kwargs)
+        finally:
+            latencies.append((time.perf_counter() - keyword_started) * 1000)
+
+    checker.check_ranking = timed_check_ranking
+    started = time.perf_counter()
+    checker.check_multiple_keywords(keywords, website_url, 'United States')
+    elapsed = time.perf_counter() - started
+    return {'keywords': len(keywords), 'seconds': elapsed, 'latencies_ms': latencies}
+
+
+def bench_pipeline(server: FakeSerpApi, keywords: List[str], website_url: str) -> Dict:
+    """Drive main.run_rank_tracking end to end with in-memory storage"""
+    from main import run_rank_tracking
+
+    storage = MemoryStorageManager()
+    started = time.perf_counter()
+    results = run_rank_tracking(website_url, keywords, 'United States', storage_manager=storage)
+    elapsed = time.perf_counter() - started
+
+    # Per-keyword latency is not observable from outside the pipeline; report the mean
+    per_keyword = elapsed * 1000 / max(len(results), 1)
+    return {
+        'keywords': len(results),
+        'seconds': elapsed,
+        'latencies_ms': [per_keyword] * len(results),
+        'storage_appends': storage.append_calls
+    }
+
+
+def bench_flask(server: FakeSerpApi, keywords: List[str], website_url: str, batch_size: int = 10) -> Dict:
+    """Drive the Flask endpoints through the test client with in-memory storage"""
+    from app import app
+
+    storage = MemoryStorageManager()
+    app.config['STORAGE_MANAGER_FACTORY'] = lambda: storage
+    client = app.test_client()
+
+    latencies = []
+    endpoint_latencies = {'check-rankings': [], 'history': [], 'upload-keywords': []}
+    started = time.perf_counter()
+
+    for index in range(0, len(keywords), batch_size):
+        batch = keywords[index:index + batch_size]
+        request_started = time.perf_counter()
+        response = client.post('/api/check-rankings', json={
+            'website_url': website_url,
+            'keywords': batch,
+            'location': 'United States'
+        })
+        request_ms = (time.perf_counter() - request_started) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/check-rankings returned {response.status_code}: {response.get_data(as_text=True)}")
+        endpoint_latencies['check-rankings'].append(request_ms)
+        latencies.extend([request_ms / len(batch)] * len(batch))
+
+        request_started = time.perf_counter()
+        client.get('/api/history', query_string={'website_url': website_url, 'limit': 50})
+        endpoint_latencies['history'].append((time.perf_counter() - request_started) * 1000)
+
+    upload = ('\n'.join(keywords) + '\n').encode('utf-8')
+    request_started = time.perf_counter()
+    client.post('/api/upload-keywords', data={'file': (io.BytesIO(upload), 'keywords.csv')},
+                content_type='multipart/form-data')
+    endpoint_latencies['upload-keywords'].append((time.perf_counter() - request_started) * 1000)
+
+    elapsed = time.perf_counter() - started
+    app.config.pop('STORAGE_MANAGER_FACTORY', None)
+    return {
+        'keywords': len(keywords),
+        'seconds': elapsed,
+        'latencies_ms': latencies,
+        'endpoints': {name: summarize_latencies(values) for name, values in endpoint_latencies.items()}
+    }
+
+
+def bench_decode(server: FakeSerpApi, keywords: List[str], website_url: str) -> Dict:
+    """Measure CPU time per SERP page for each JSON decoding path (no network involved)"""
+    import fast_json
+    from fake_serpapi import build_page
+
+    pages = [json.dumps(build_page(server.settings, keyword, 0, config.RESULTS_PER_PAGE)).encode('utf-8')
+             for keyword in keywords]
+    decoders = {'json_full': json.loads, 'partial': fast_json.extract_partial}
+    if fast_json.ORJSON_AVAILABLE:
+        decoders['orjson_full'] = fast_json.loads
+    decoders['configured'] = fast_json.extract_serp
+
+    cpu_us = {}
+    latencies = []
+    elapsed = 0.0
+    for name, decode in decoders.items():
+        cpu_started = time.process_time()
+        for _ in range(DECODE_ROUNDS):
+            for page in pages:
+                started = time.perf_counter()
+                decode(page)
+                if name == 'configured':
+                    latencies.append((time.perf_counter() - started) * 1000)
+        cpu_us[name] = round((time.process_time() - cpu_started) * 1e6 / (DECODE_ROUNDS * len(pages)), 2)
+        if name == 'configured':
+            elapsed = sum(latencies) / 1000
+
+    return {
+        'keywords': len(pages) * DECODE_ROUNDS,
+        'seconds': elapsed,
+        'latencies_ms': latencies,
+        'decode': {
+            'backend': fast_json.BACKEND,
+            'mode': config.SERP_JSON_MODE,
+            'page_bytes': sum(len(page) for page in pages) // len(pages),
+            'cpu_us_per_page': cpu_us,
+            'cpu_saved_us_per_page': round(cpu_us['json_full'] - cpu_us['configured'], 2)
+        }
+    }
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'engine': bench_engine,
+    'pipeline': bench_pipeline,
+    'flask': bench_flask,
+    'decode': bench_decode,
+}
+
+
+def run_scenario(name: str, server: FakeSerpApi, keywords: List[str], website_url: str, quiet: bool = True) -> Dict:
+    """
+    Run one benchmark scenario and compute its report
+
+    Args:
+        name: Scenario name (see SCENARIOS)
+        server: Running fake SerpAPI server
+        keywords: Keywords to check
+        website_url: Website to track
+        quiet: Suppress console output from the code under test
+
+    Returns:
+        Report dictionary
+    """
+    server.reset_stats()
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        raw = BENCHMARKS[name](server, keywords, website_url)
+
+    api_calls = server.stats['requests']
+    report = {
+        'keywords': raw['keywords'],
+        'seconds': round(raw['seconds'], 3),
+        'keywords_per_sec': round(raw['keywords'] / raw['seconds'], 2) if raw['seconds'] else 0.0,
+        'api_calls': api_calls,
+        'api_calls_per_keyword': round(api_calls / raw['keywords'], 2) if raw['keywords'] else 0.0,
+        'api_status': server.stats['by_status'],
+        'latency_ms': summarize_latencies(raw['latencies_ms'])
+    }
+    for key in ('storage_appends', 'endpoints', 'decode'):
+        if key in raw:
+            report[key] = raw[key]
+    return report
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """
+    Compare a benchmark report with a stored baseline
+
+    Args:
+        report: Current report
+        baseline: Baseline report
+        max_regression: Allowed slowdown in percent before a scenario counts as regressed
+
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    print(f"\n{'='*60}")
+    print("Comparison with baseline")
+    print(f"{'='*60}")
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            print(f"{name}: no baseline")
+            continue
+
+        old_rate, new_rate = previous['keywords_per_sec'], current['keywords_per_sec']
+        old_p95, new_p95 = previous['latency_ms']['p95'], current['latency_ms']['p95']
+        rate_change = (new_rate - old_rate) / old_rate * 100 if old_rate else 0.0
+        p95_change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+        print(f"{name}: keywords/sec {old_rate} -> {new_rate} ({rate_change:+.1f}%), "
+              f"p95 {old_p95} -> {new_p95} ms ({p95_change:+.1f}%)")
+
+        if rate_change < -max_regression:
+            regressions.append(f"{name}: throughput dropped {-rate_change:.1f}%")
+        if p95_change > max_regression:
+            regressions.append(f"{name}: p95 latency rose {p95_change:.1f}%")
+    return regressions
+
+
+def main():
+    """Run benchmarks via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark rank checking against a local fake SerpAPI server',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # All scenarios, 200 keywords, results saved as a baseline
+  python benchmark.py -n 200 -o baseline.json
+
+  # CPU cost of SERP decoding for realistic 80 KB pages
+  python benchmark.py --scenario decode --payload-kb 80
+
+  # Adaptive concurrency against the old sequential pacing, under throttling
+  python benchmark.py --scenario engine --throttle-rate 0.05 --concurrency fixed
+  python benchmark.py --scenario engine --throttle-rate 0.05 --concurrency adaptive
+
+  # Engine only, with throttling, compared against the baseline
+  python benchmark.py --scenario engine --throttle-rate 0.05 --baseline baseline.json
+        """
+    )
+    parser.add_argument('-n', '--keywords', type=int, default=100, help='Keywords per scenario (default: 100)')
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                        help='Scenario to run (repeatable, default: all)')
+    parser.add_argument('--website-url', default='https://www.example.com', help='Website to track')
+    parser.add_argument('--keep-delays', action='store_true',
+                        help='Keep the configured page/keyword delays (default: disable them)')
+    parser.add_argument('--concurrency', choices=CONCURRENCY_MODES, default=config.SERP_CONCURRENCY,
+                        help=f'SerpAPI call pacing (default: {config.SERP_CONCURRENCY})')
+    parser.add_argument('-o', '--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Baseline JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='Allowed regression vs baseline in percent (default: 10)')
+    parser.add_argument('--verbose', action='store_true', help='Show output from the code under test')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    settings = settings_from_args(args)
+    journal_dir = tempfile.mkdtemp(prefix='rank-bench-')
+
+    # Point the app at the fake server; everything reads these at call time
+    config.SERPAPI_KEY = 'benchmark'
+    config.RUN_JOURNAL_DIR = journal_dir
+    config.LATEST_RANKS_DB = os.path.join(journal_dir, 'latest_ranks.db')
+    config.DELTA_STATE_DB = os.path.join(journal_dir, 'delta_state.db')
+    config.RANK_SERIES_DIR = os.path.join(journal_dir, 'rank_series')
+    config.SERP_ARCHIVE_ENABLED = False
+    config.SERP_CONCURRENCY = args.concurrency
+    if not args.keep_delays:
+        config.PAGE_DELAY_SECONDS = 0
+        config.KEYWORD_DELAY_SECONDS = 0
+
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'keywords': args.keywords,
+        'server': vars(settings),
+        'delays': {'page': config.PAGE_DELAY_SECONDS, 'keyword': config.KEYWORD_DELAY_SECONDS},
+        'concurrency': args.concurrency,
+        'scenarios': {}
+    }
+
+    try:
+        with FakeSerpApi(settings) as server:
+            config.SERPAPI_URL = server.url
+            for name in scenarios:
+                print(f"Running {name} benchmark ({args.keywords} keywords)...")
+                result = run_scenario(name, server, _keywords(args.keywords), args.website_url, not args.verbose)
+                report['scenarios'][name] = result
+                latency = result['latency_ms']
+                print(f"  {result['keywords_per_sec']} keywords/sec, {result['api_calls_per_keyword']} API calls/keyword, "
+                      f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms")
+                if 'decode' in result:
+                    decode = result['decode']
+                    timings = ', '.join(f"{path} {us} us" for path, us in decode['cpu_us_per_page'].items())
+                    print(f"  CPU per {decode['page_bytes']} byte page: {timings} "
+                          f"(saved {decode['cpu_saved_us_per_page']} us/page vs json_full)")
+    finally:
+        shutil.rmtree(journal_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.max_regression)
+        if regressions:
+            print("\n❌ Regressions detected:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions beyond the allowed threshold")
+
+
+if __name__ == '__main__':
+    main()
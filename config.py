@@ -9,20 +9,109 @@ load_dotenv()
 
 # SerpAPI Configuration
 SERPAPI_KEY = os.getenv('SERPAPI_KEY')
-SERPAPI_URL = 'https://serpapi.com/search.json'
+SERPAPI_URL = os.getenv('SERPAPI_URL', 'https://serpapi.com/search.json')
+
+# SerpAPI Key Pool Configuration (see serpapi_keys.py)
+SERPAPI_KEYS = os.getenv('SERPAPI_KEYS', '')  # More keys, comma-separated: key, key:hourly_limit or key:hourly_limit:searches_left
+SERPAPI_KEY_RETIRE_MINUTES = float(os.getenv('SERPAPI_KEY_RETIRE_MINUTES', '60'))  # Rest a key after auth/quota errors
+SERPAPI_KEY_COOLDOWN_SECONDS = float(os.getenv('SERPAPI_KEY_COOLDOWN_SECONDS', '30'))  # Prefer other keys after a 429
+SERPAPI_ACCOUNT_CHECK = os.getenv('SERPAPI_ACCOUNT_CHECK', 'false').lower() == 'true'  # Read limits from the Account API at startup
+SERPAPI_ACCOUNT_URL = os.getenv('SERPAPI_ACCOUNT_URL', 'https://serpapi.com/account.json')
 
 # Google Sheets Configuration (optional)
 GOOGLE_SHEETS_CREDENTIALS_FILE = os.getenv('GOOGLE_SHEETS_CREDENTIALS_FILE', 'credentials.json')
 GOOGLE_SHEETS_SPREADSHEET_ID = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID')
+SHEETS_PARTITIONING = os.getenv('SHEETS_PARTITIONING', 'off').lower()  # Options: 'off' or 'website' (see partitioned_sheets_manager.py)
+SHEETS_DIRECTORY_SHEET = os.getenv('SHEETS_DIRECTORY_SHEET', 'Directory')  # Maps each website to its sheet
 
 # Google Docs Configuration
 GOOGLE_DOCS_DOCUMENT_ID = os.getenv('GOOGLE_DOCS_DOCUMENT_ID')
+DOCS_SHARDING = os.getenv('DOCS_SHARDING', 'off').lower()  # Options: 'off', 'monthly' or 'rows' (see sharded_docs_manager.py)
+DOCS_SHARD_MAX_ROWS = int(os.getenv('DOCS_SHARD_MAX_ROWS', '2000'))  # Roll to a new document after this many rows (0 = no limit)
+DOCS_SHARD_MANIFEST = os.getenv('DOCS_SHARD_MANIFEST', 'docs_shards.db')
+GOOGLE_DOCS_INDEX_DOCUMENT_ID = os.getenv('GOOGLE_DOCS_INDEX_DOCUMENT_ID')  # Optional durable shard list (rebuilds a lost manifest)
 
 # Search Configuration
 MAX_RESULTS_TO_CHECK = 100  # Check top 100 results (10 pages)
 RESULTS_PER_PAGE = 10
+PAGE_DELAY_SECONDS = float(os.getenv('PAGE_DELAY_SECONDS', '1'))  # Pause between result pages of one keyword (fixed mode)
+KEYWORD_DELAY_SECONDS = float(os.getenv('KEYWORD_DELAY_SECONDS', '2'))  # Pause between keywords (fixed mode)
+WEB_PREFETCH_PAGES = int(os.getenv('WEB_PREFETCH_PAGES', '0'))  # Result pages fetched at once per keyword on web checks (0 = one by one)
+
+# Adaptive Concurrency Configuration (see adaptive_concurrency.py)
+SERP_CONCURRENCY = os.getenv('SERP_CONCURRENCY', 'adaptive').lower()  # 'adaptive' (AIMD) or 'fixed' (sequential, delays above)
+AIMD_INITIAL_WINDOW = float(os.getenv('AIMD_INITIAL_WINDOW', '2'))  # Concurrent SerpAPI calls at start
+AIMD_MIN_WINDOW = float(os.getenv('AIMD_MIN_WINDOW', '1'))
+AIMD_MAX_WINDOW = float(os.getenv('AIMD_MAX_WINDOW', '16'))  # Also the number of keyword checks run in parallel
+AIMD_DECREASE_FACTOR = float(os.getenv('AIMD_DECREASE_FACTOR', '0.5'))  # Window multiplier on 429/5xx/timeouts
+AIMD_LATENCY_FACTOR = float(os.getenv('AIMD_LATENCY_FACTOR', '2'))  # Latency above this multiple of normal is congestion
+SERP_MAX_RETRIES = int(os.getenv('SERP_MAX_RETRIES', '3'))  # Retries of throttled/failed pages in adaptive mode
+
+# Priority Lanes Configuration (see priority_lanes.py)
+TENANT_WEIGHTS = os.getenv('TENANT_WEIGHTS', '')  # Share of SerpAPI calls per website, e.g. https://a.com=3,https://b.com=1 (default 1)
 
 # Output Configuration
 STORAGE_TYPE = os.getenv('STORAGE_TYPE', 'docs').lower()  # Options: 'docs' or 'sheets'
 USE_GOOGLE_SHEETS = (STORAGE_TYPE == 'sheets')  # For backward compatibility
 
+
+# Run Journal Configuration (checkpoint/resume for long runs)
+RUN_JOURNAL_DIR = os.getenv('RUN_JOURNAL_DIR', 'runs')
+FLUSH_BATCH_SIZE = int(os.getenv('FLUSH_BATCH_SIZE', '25'))  # Results saved to storage per flush
+FLUSH_INTERVAL_SECONDS = float(os.getenv('FLUSH_INTERVAL_SECONDS', '30'))  # Save a partial batch once its oldest result waited this long
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))  # Checked results waiting for storage before checks pause
+
+# Keyword Upload Limits (/api/upload-keywords)
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(20 * 1024 * 1024)))  # 20 MB
+UPLOAD_MAX_ROWS = int(os.getenv('UPLOAD_MAX_ROWS', '100000'))
+
+# History Export Configuration
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '50000'))  # Rows per Parquet row group / CSV block
+
+# Result Capture Configuration
+CAPTURE_SERP_SNIPPETS = os.getenv('CAPTURE_SERP_SNIPPETS', 'true').lower() == 'true'  # Keep title/snippet of matches
+
+# Raw SERP Archive Configuration (offline re-scoring, see serp_archive.py)
+SERP_ARCHIVE_ENABLED = os.getenv('SERP_ARCHIVE_ENABLED', 'false').lower() == 'true'
+SERP_ARCHIVE_DIR = os.getenv('SERP_ARCHIVE_DIR', 'serp_archive')
+
+# Trend Analytics Configuration (see rank_trends.py)
+TREND_WINDOW = int(os.getenv('TREND_WINDOW', '7'))  # Checks in the moving average
+
+# Latest Rank Table Configuration (see latest_ranks.py, /api/latest)
+LATEST_RANKS_ENABLED = os.getenv('LATEST_RANKS_ENABLED', 'true').lower() == 'true'
+LATEST_RANKS_DB = os.getenv('LATEST_RANKS_DB', 'latest_ranks.db')
+
+# Delta Storage Configuration (see delta_storage.py)
+DELTA_STORAGE_ENABLED = os.getenv('DELTA_STORAGE_ENABLED', 'false').lower() == 'true'  # Store changes and heartbeats only
+DELTA_STATE_DB = os.getenv('DELTA_STATE_DB', 'delta_state.db')
+DELTA_HEARTBEAT_HOURS = float(os.getenv('DELTA_HEARTBEAT_HOURS', '168'))  # Longest gap between stored rows of a keyword
+
+# Rank Series Store Configuration (see rank_series.py, /api/trends, /api/history/series)
+RANK_SERIES_ENABLED = os.getenv('RANK_SERIES_ENABLED', 'false').lower() == 'true'  # Memory-mapped daily positions
+RANK_SERIES_DIR = os.getenv('RANK_SERIES_DIR', 'rank_series')
+
+# Work Queue Configuration (see work_queue.py, rank_worker.py)
+WORK_QUEUE_DB = os.getenv('WORK_QUEUE_DB', 'work_queue.db')
+USE_WORK_QUEUE = os.getenv('USE_WORK_QUEUE', 'false').lower() == 'true'  # Web app enqueues checks by default
+QUEUE_LEASE_SECONDS = float(os.getenv('QUEUE_LEASE_SECONDS', '300'))  # Tasks not acknowledged in time are retried
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', '3'))
+QUEUE_RETRY_DELAY_SECONDS = float(os.getenv('QUEUE_RETRY_DELAY_SECONDS', '30'))  # Doubles on every retry
+QUEUE_POLL_SECONDS = float(os.getenv('QUEUE_POLL_SECONDS', '2'))
+
+# Async Serving Configuration (asgi_app.py)
+ASYNC_MAX_CONCURRENT_CHECKS = int(os.getenv('ASYNC_MAX_CONCURRENT_CHECKS', '500'))  # Further check requests wait
+ASYNC_MAX_CONNECTIONS = int(os.getenv('ASYNC_MAX_CONNECTIONS', '100'))  # SerpAPI connection pool size
+ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '10'))  # Threads serving the remaining Flask routes
+ASYNC_UPLOAD_SPOOL_BYTES = int(os.getenv('ASYNC_UPLOAD_SPOOL_BYTES', str(1024 * 1024)))  # Larger uploads spill to disk
+
+# JSON Decoding Configuration (see fast_json.py)
+SERP_JSON_MODE = os.getenv('SERP_JSON_MODE', 'auto').lower()  # Options: 'auto', 'full' or 'partial'
+
+# Metrics Configuration
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # Scheduler Prometheus port (0 = disabled)
+
+# Profiling Configuration (see profiling.py)
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'off').lower()  # Options: 'off', 'cprofile' or 'sampling'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_THRESHOLD_MS = float(os.getenv('PROFILE_THRESHOLD_MS', '1000'))  # Only keep profiles slower than this
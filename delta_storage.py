@@ -0,0 +1,383 @@
+"""
+Delta Storage Module
+Change-only rank storage: a full row is written only when a keyword's position or
+found URL changes, plus compact "unchanged since" heartbeats; readers expand the
+stored rows back into the full daily series
+"""
+import time
+import sqlite3
+import functools
+import threading
+import contextlib
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from rank_result import RankResult, RankStatus, TIMESTAMP_FORMAT
+from rank_series import DEFAULT_LOCATION
+import config
+
+# Notes value marking a heartbeat row (followed by when the current position was first seen)
+HEARTBEAT_PREFIX = 'unchanged since '
+
+# Spacing of the reconstructed points between stored rows
+FILL_SECONDS = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS delta_state (
+    website_url TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    location TEXT NOT NULL,
+    ranking_position TEXT NOT NULL,
+    found_url TEXT NOT NULL,
+    since_on TEXT NOT NULL,
+    written_at REAL NOT NULL,
+    checked_at REAL,
+    PRIMARY KEY (website_url, keyword, location)
+);
+"""
+
+UPSERT = """
+INSERT INTO delta_state (website_url, keyword, location, ranking_position, found_url, since_on, written_at,
+                         checked_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (website_url, keyword, location) DO UPDATE SET
+    ranking_position = excluded.ranking_position,
+    found_url = excluded.found_url,
+    since_on = excluded.since_on,
+    written_at = excluded.written_at,
+    checked_at = excluded.checked_at
+"""
+
+# The encoder compares each check with the last one of the same (website URL, keyword, location)
+_Key = Tuple[str, str, str]
+
+# Stored rows carry no location, so readers key series by what they can see: (website URL, keyword)
+_RowKey = Tuple[str, str]
+
+
+class _Written(NamedTuple):
+    """Last row stored for a key"""
+    ranking_position: str
+    found_url: str
+    since_on: str
+    written_at: float
+    # Last check of the key, stored or dropped
+    checked_at: float
+
+
+class DeltaState:
+    """SQLite record of the last row written for each (website, keyword, location), used to decide what to store"""
+
+    def __init__(self, path: str = None):
+        """
+        Initialize the Delta State
+
+        Args:
+            path: SQLite database file. If not provided, uses config.DELTA_STATE_DB
+        """
+        self.path = path or config.DELTA_STATE_DB
+        self._local = threading.local()
+        connection = self._connection()
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(delta_state)')}
+        if columns and 'checked_at' not in columns:
+            connection.execute('ALTER TABLE delta_state ADD COLUMN checked_at REAL')
+        if columns and 'location' not in columns:
+            # The primary key gained location: copy the old state over as the default location
+            with connection:
+                connection.execute('ALTER TABLE delta_state RENAME TO delta_state_old')
+                connection.execute(SCHEMA)
+                connection.execute(
+                    'INSERT INTO delta_state SELECT website_url, keyword, ?, ranking_position, found_url, '
+                    'since_on, written_at, checked_at FROM delta_state_old', (DEFAULT_LOCATION,))
+                connection.execute('DROP TABLE delta_state_old')
+        connection.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (web requests run on several threads)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Hold the state's write lock from lookup() to save()
+
+        Appenders (the storage sink, web requests, queue workers) would otherwise
+        decide against the same state and store or drop the same change twice.
+        The transaction is rolled back if the block raises, so a failed append
+        leaves the state untouched.
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def lookup(self, keys: List[_Key]) -> Dict[_Key, _Written]:
+        """Return the last written state of each key that has one"""
+        found = {}
+        connection = self._connection()
+        for key in set(keys):
+            row = connection.execute(
+                'SELECT ranking_position, found_url, since_on, written_at, COALESCE(checked_at, written_at) '
+                'FROM delta_state '
+                'WHERE website_url = ? AND keyword = ? AND location = ?',
+                key
+            ).fetchone()
+            if row:
+                found[key] = _Written(*row)
+        return found
+
+    def save(self, states: Dict[_Key, _Written]):
+        """Record the rows that were just stored and the checks that were dropped"""
+        if not states:
+            return
+        connection = self._connection()
+        params = [key + tuple(state) for key, state in states.items()]
+        if connection.in_transaction:
+            # Committed by the enclosing transaction()
+            connection.executemany(UPSERT, params)
+            return
+        with connection:
+            connection.executemany(UPSERT, params)
+
+    def last_checked(self) -> Dict[_RowKey, float]:
+        """Return when each (website, keyword) was last checked, in any location"""
+        return {
+            (website_url, keyword): checked_at
+            for website_url, keyword, checked_at in self._connection().execute(
+                'SELECT website_url, keyword, MAX(COALESCE(checked_at, written_at)) FROM delta_state '
+                'GROUP BY website_url, keyword')
+        }
+
+    def clear(self):
+        """Forget all state (the next check of every keyword writes a full row)"""
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM delta_state')
+
+
+def encode_results(results: List[Dict], state: DeltaState, heartbeat_seconds: float = None) -> Tuple[List[Dict], Dict]:
+    """
+    Decide which results to store
+
+    A result is stored in full when it is the first of its keyword or its position or
+    found URL changed. An unchanged result is dropped, unless nothing was stored for
+    the keyword for heartbeat_seconds; then a heartbeat is stored: the same position
+    and found URL without title and snippet, with Notes "unchanged since <time>".
+    When a change follows dropped checks, a heartbeat dated at the last dropped
+    check is stored first, so readers know how long the old position lasted.
+    Failed checks are always stored and never change the state.
+
+    Args:
+        results: RankResult records or legacy result dictionaries
+        state: Last written state
+        heartbeat_seconds: Maximum time between stored rows of an unchanged keyword.
+                           If not provided, uses config.DELTA_HEARTBEAT_HOURS
+
+    Returns:
+        Tuple of (result dictionaries to store, state to save once they are stored)
+    """
+    if heartbeat_seconds is None:
+        heartbeat_seconds = config.DELTA_HEARTBEAT_HOURS * 3600
+    records = [RankResult.from_dict(result) for result in results]
+    written = state.lookup([_key(record) for record in records])
+    updates = {}
+    stored = []
+
+    for result, record in zip(results, records):
+        if record.status is RankStatus.ERROR:
+            stored.append(result)
+            continue
+
+        key = _key(record)
+        position = str(record.ranking_position)
+        found_url = record.found_url or 'Not Found'
+        checked_at = record.checked_at or time.time()
+        last = written.get(key)
+
+        if last is None or last.ranking_position != position or last.found_url != found_url:
+            if last is not None and last.checked_at > last.written_at:
+                stored.append(_heartbeat(record, last.ranking_position, last.found_url, last.since_on,
+                                         time.strftime(TIMESTAMP_FORMAT, time.localtime(last.checked_at))))
+            current = _Written(position, found_url, record.checked_on, checked_at, checked_at)
+            stored.append(result)
+        elif checked_at - last.written_at >= heartbeat_seconds:
+            current = _Written(position, found_url, last.since_on, checked_at, checked_at)
+            stored.append(_heartbeat(record, position, found_url, last.since_on, record.checked_on))
+        else:
+            # Dropped; only the time of the check is recorded
+            current = last._replace(checked_at=max(last.checked_at, checked_at))
+        written[key] = updates[key] = current
+
+    return stored, updates
+
+
+def _key(record: RankResult) -> _Key:
+    """Return the state key of a result (results without a location use the default one)"""
+    return (record.website_url or '', record.keyword, record.location or DEFAULT_LOCATION)
+
+
+def _heartbeat(record: RankResult, position: str, found_url: str, since_on: str, checked_on: str) -> Dict:
+    """Build a heartbeat result: a position without title and snippet, marked in Notes"""
+    return {
+        'keyword': record.keyword,
+        'website_url': record.website_url,
+        'ranking_position': position,
+        'found_url': found_url,
+        'checked_on': checked_on,
+        'serp_title': '',
+        'serp_snippet': '',
+        'error': f"{HEARTBEAT_PREFIX}{since_on}"
+    }
+
+
+def _is_heartbeat(row: List) -> bool:
+    """Whether a stored row is a heartbeat"""
+    return len(row) > 7 and row[7].startswith(HEARTBEAT_PREFIX)
+
+
+def _checked_at(row: List) -> Optional[float]:
+    """Epoch seconds of a stored row's 'Checked On' column, or None"""
+    try:
+        return time.mktime(time.strptime(row[4].strip(), TIMESTAMP_FORMAT))
+    except ValueError:
+        return None
+
+
+def expand_rows(rows: List[List], fill: bool = None, heartbeat_seconds: float = None,
+                last_checked: Dict[_RowKey, float] = None) -> List[List]:
+    """
+    Reconstruct the full daily series from change-only rows
+
+    Heartbeats become full rows again (title and snippet come from the row that
+    set the position). With fill, the days between a stored row and the heartbeat
+    that follows it are filled with copies of the earlier row, one per FILL_SECONDS:
+    the heartbeat says the keyword was checked and unchanged all along. Gaps longer
+    than the heartbeat interval plus a day stay empty, and gaps before a full row
+    are never filled, since full rows are real checks at whatever cadence they ran.
+    Reconstructed points are emitted just before the heartbeat that implies them.
+    Checks dropped after a keyword's newest stored row have no heartbeat yet: with
+    last_checked, that row is carried forward the same way up to the keyword's last
+    check, and these points come after all stored rows.
+
+    Args:
+        rows: Rows as returned by get_all_results (header row included)
+        fill: Fill unchanged days. If not provided, uses config.DELTA_STORAGE_ENABLED
+        heartbeat_seconds: Heartbeat interval. If not provided, uses config.DELTA_HEARTBEAT_HOURS
+        last_checked: Last check per (website URL, keyword), see DeltaState.last_checked
+
+    Returns:
+        Rows in the stored format, without heartbeat markers
+    """
+    fill = config.DELTA_STORAGE_ENABLED if fill is None else fill
+    if not fill and not any(_is_heartbeat(row) for row in rows):
+        return rows
+    if heartbeat_seconds is None:
+        heartbeat_seconds = config.DELTA_HEARTBEAT_HOURS * 3600
+    max_gap = heartbeat_seconds + FILL_SECONDS
+
+    expanded = []
+    series: Dict[_RowKey, Tuple[List, float]] = {}
+    for row in rows:
+        if len(row) < 5 or row[0] == 'Keyword':
+            expanded.append(row)
+            continue
+        row = list(row) + [''] * (8 - len(row))
+        heartbeat = _is_heartbeat(row)
+        if row[2] == 'Error' or (row[7] and not heartbeat):
+            expanded.append(row)
+            continue
+
+        key = (row[1], row[0])
+        checked_at = _checked_at(row)
+        previous = series.get(key)
+        if fill and heartbeat and previous and checked_at is not None and 0 < checked_at - previous[1] <= max_gap:
+            expanded.extend(_fill(previous[0], previous[1], checked_at))
+
+        if heartbeat:
+            if previous and previous[0][2] == row[2] and previous[0][3] == row[3]:
+                row = row[:5] + previous[0][5:7] + ['']
+            else:
+                row = row[:7] + ['']
+        expanded.append(row)
+        if checked_at is not None:
+            series[key] = (row, checked_at)
+
+    if fill and last_checked:
+        for key, (row, checked_at) in series.items():
+            last = last_checked.get(key)
+            if last is not None and last - checked_at >= 1:
+                expanded.extend(_fill(row, checked_at, last))
+                expanded.append(row[:4] + [time.strftime(TIMESTAMP_FORMAT, time.localtime(last))] + row[5:])
+    return expanded
+
+
+def _fill(row: List, start: float, end: float) -> List[List]:
+    """Copies of a row dated one FILL_SECONDS apart, strictly between start and end"""
+    points = []
+    point = start + FILL_SECONDS
+    while point < end - FILL_SECONDS / 2:
+        points.append(row[:4] + [time.strftime(TIMESTAMP_FORMAT, time.localtime(point))] + row[5:])
+        point += FILL_SECONDS
+    return points
+
+
+_states: Dict[str, DeltaState] = {}
+_states_lock = threading.Lock()
+
+
+def get_state(path: str = None) -> DeltaState:
+    """Return the shared state for a database path (created on first use)"""
+    path = path or config.DELTA_STATE_DB
+    with _states_lock:
+        state = _states.get(path)
+        if state is None:
+            state = _states[path] = DeltaState(path)
+        return state
+
+
+def delta_encoded(method: Callable) -> Callable:
+    """
+    Decorator for storage manager append methods that stores only changes and
+    heartbeats when config.DELTA_STORAGE_ENABLED is set
+
+    The state is read and saved in one transaction around the append, so appenders
+    take turns and a failed append never hides a change. Apply it inside @maintains_latest and @maintains_series, which still see
+    every result.
+    """
+    @functools.wraps(method)
+    def wrapper(self, results, *args, **kwargs):
+        if not results or not config.DELTA_STORAGE_ENABLED:
+            return method(self, results, *args, **kwargs)
+        state = get_state()
+        with state.transaction():
+            stored, updates = encode_results(results, state)
+            outcome = method(self, stored, *args, **kwargs) if stored else None
+            try:
+                state.save(updates)
+            except sqlite3.Error as e:
+                # The next check of these keywords writes full rows again
+                print(f"Warning: could not update delta storage state: {e}")
+        return outcome
+    return wrapper
+
+
+def delta_decoded(method: Callable) -> Callable:
+    """Decorator for storage manager read methods that returns the reconstructed series (see expand_rows)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        rows = method(self, *args, **kwargs)
+        last_checked = None
+        if config.DELTA_STORAGE_ENABLED:
+            try:
+                last_checked = get_state().last_checked()
+            except sqlite3.Error as e:
+                print(f"Warning: could not read delta storage state: {e}")
+        return expand_rows(rows, last_checked=last_checked)
+    return wrapper
@@ -0,0 +1,298 @@
+"""
+Fake SerpAPI Server
+Local stand-in for the SerpAPI search endpoint, used by benchmarks and load tests
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Optional
+
+# Result distributions for where the target domain ranks
+DISTRIBUTIONS = ('uniform', 'top-heavy', 'absent')
+
+
+class FakeSerpApiConfig:
+    """Behaviour knobs for the fake server"""
+
+    def __init__(self, target_domain: str = 'example.com', latency_ms: float = 50.0, jitter_ms: float = 20.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: int = 1,
+                 api_error_rate: float = 0.0, distribution: str = 'uniform', not_found_rate: float = 0.2,
+                 max_position: int = 100, payload_kb: int = 40, seed: int = 0):
+        """
+        Args:
+            target_domain: Domain placed in the results
+            latency_ms: Base response latency
+            jitter_ms: Maximum extra random latency
+            error_rate: Fraction of requests answered with HTTP 500
+            throttle_rate: Fraction of requests answered with HTTP 429
+            retry_after: Retry-After seconds sent with 429 responses
+            api_error_rate: Fraction of requests answered with a SerpAPI {"error": ...} body
+            distribution: How target positions are drawn (see DISTRIBUTIONS)
+            not_found_rate: Fraction of queries where the target is absent
+            max_position: Highest position the target can take
+            payload_kb: Approximate size of unrelated SERP sections per page, to mimic real payloads
+            seed: Seed making positions deterministic per query
+        """
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}'. Use one of: {', '.join(DISTRIBUTIONS)}")
+        self.target_domain = target_domain
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.api_error_rate = api_error_rate
+        self.distribution = distribution
+        self.not_found_rate = not_found_rate
+        self.max_position = max_position
+        self.payload_kb = payload_kb
+        self.seed = seed
+
+    def target_position(self, query: str) -> Optional[int]:
+        """Deterministically pick where the target ranks for a query (None if absent)"""
+        digest = hashlib.sha256(f"{self.seed}:{query}".encode('utf-8')).digest()
+        rng = random.Random(digest)
+        if self.distribution == 'absent' or rng.random() < self.not_found_rate:
+            return None
+        if self.distribution == 'top-heavy':
+            return min(self.max_position, int(rng.expovariate(1 / 8)) + 1)
+        return rng.randint(1, self.max_position)
+
+
+class _Stats:
+    """Thread-safe request counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.by_status = {}
+        self.queries = set()
+
+    def record(self, status: int, query: str):
+        with self.lock:
+            self.requests += 1
+            self.by_status[status] = self.by_status.get(status, 0) + 1
+            self.queries.add(query)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'by_status': {str(status): count for status, count in sorted(self.by_status.items())},
+                'distinct_queries': len(self.queries)
+            }
+
+
+def build_page(settings: FakeSerpApiConfig, query: str, start: int, num: int) -> Dict:
+    """
+    Build a SerpAPI-like response page
+
+    Args:
+        settings: Server configuration
+        query: Search keyword
+        start: Result offset
+        num: Results per page
+
+    Returns:
+        Response dictionary
+    """
+    target = settings.target_position(query)
+    organic_results = []
+    for offset in range(num):
+        position = start + offset + 1
+        if position > settings.max_position:
+            break
+        if position == target:
+            link = f"https://www.{settings.target_domain}/{query.replace(' ', '-')}"
+        else:
+            link = f"https://site{position}.example.org/{query.replace(' ', '-')}"
+        organic_results.append({
+            'position': position,
+            'title': f"Result {position} for {query}",
+            'link': link,
+            'snippet': f"Snippet text for result {position} about {query}. " * 3
+        })
+
+    # Unused sections that make payloads as large as real SERPs
+    filler = 'x' * 200
+    related = [{'question': f"{query} question {i}", 'snippet': filler} for i in range(settings.payload_kb * 1024 // 260)]
+
+    return {
+        'search_metadata': {'status': 'Success', 'id': hashlib.md5(f"{query}{start}".encode()).hexdigest()},
+        'search_parameters': {'q': query, 'start': start, 'num': num, 'engine': 'google'},
+        'search_information': {'total_results': 1000000},
+        'related_questions': related,
+        'organic_results': organic_results
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler answering /search.json"""
+
+    server_version = 'FakeSerpApi/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict, headers: Dict = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the page (e.g. a cancelled prefetch)
+            pass
+
+    def do_GET(self):
+        settings = self.server.settings
+        parsed = urlparse(self.path)
+        if parsed.path != '/search.json':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        params = parse_qs(parsed.query)
+        query = params.get('q', [''])[0]
+        start = int(params.get('start', ['0'])[0])
+        num = int(params.get('num', ['10'])[0])
+
+        rng = random.Random()
+        delay = settings.latency_ms + rng.random() * settings.jitter_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = rng.random()
+        if roll < settings.throttle_rate:
+            status = 429
+            self._send_json(429, {'error': 'Too many requests'}, {'Retry-After': str(settings.retry_after)})
+        elif roll < settings.throttle_rate + settings.error_rate:
+            status = 500
+            self._send_json(500, {'error': 'Internal server error'})
+        elif roll < settings.throttle_rate + settings.error_rate + settings.api_error_rate:
+            status = 200
+            self._send_json(200, {'error': "Google hasn't returned any results for this query."})
+        else:
+            status = 200
+            self._send_json(200, build_page(settings, query, start, num))
+
+        self.server.stats.record(status, query)
+
+
+class _Server(ThreadingHTTPServer):
+    """Threaded server with a listen backlog large enough for hundreds of concurrent clients"""
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class FakeSerpApi:
+    """Runs the fake SerpAPI server on a background thread"""
+
+    def __init__(self, settings: FakeSerpApiConfig = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            settings: Server behaviour. Defaults to FakeSerpApiConfig()
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.settings = settings or FakeSerpApiConfig()
+        self.server = _Server((host, port), _Handler)
+        self.server.settings = self.settings
+        self.server.stats = _Stats()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """SerpAPI-compatible endpoint URL (use as config.SERPAPI_URL)"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/search.json"
+
+    @property
+    def stats(self) -> Dict:
+        """Request counters since start or the last reset_stats()"""
+        return self.server.stats.snapshot()
+
+    def reset_stats(self):
+        """Clear request counters"""
+        self.server.stats.reset()
+
+    def start(self) -> 'FakeSerpApi':
+        """Start serving in a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'FakeSerpApi':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """Add fake server options to an argument parser"""
+    group = parser.add_argument_group('fake SerpAPI server')
+    group.add_argument('--latency-ms', type=float, default=50.0, help='Base response latency (default: 50)')
+    group.add_argument('--jitter-ms', type=float, default=20.0, help='Extra random latency (default: 20)')
+    group.add_argument('--error-rate', type=float, default=0.0, help='Fraction of HTTP 500 responses')
+    group.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of HTTP 429 responses')
+    group.add_argument('--api-error-rate', type=float, default=0.0, help='Fraction of SerpAPI error bodies')
+    group.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform',
+                       help='Target position distribution (default: uniform)')
+    group.add_argument('--not-found-rate', type=float, default=0.2,
+                       help='Fraction of queries without the target (default: 0.2)')
+    group.add_argument('--payload-kb', type=int, default=40, help='Extra SERP payload size per page (default: 40)')
+    group.add_argument('--target-domain', default='example.com', help='Domain placed in results')
+    group.add_argument('--seed', type=int, default=0, help='Seed for deterministic positions')
+
+
+def settings_from_args(args) -> FakeSerpApiConfig:
+    """Build server settings from parsed add_server_arguments() options"""
+    return FakeSerpApiConfig(
+        target_domain=args.target_domain,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        api_error_rate=args.api_error_rate,
+        distribution=args.distribution,
+        not_found_rate=args.not_found_rate,
+        payload_kb=args.payload_kb,
+        seed=args.seed
+    )
+
+
+def main():
+    """Run the fake server in the foreground"""
+    parser = argparse.ArgumentParser(description='Local fake SerpAPI server')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeSerpApi(settings_from_args(args), port=args.port)
+    print(f"Fake SerpAPI listening on {server.url}")
+    print(f"Point the app at it with: SERPAPI_URL={server.url} SERPAPI_KEY=fake")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Fast JSON Module
+JSON codec used for SerpAPI pages and API responses: orjson when installed, the
+standard library otherwise, plus partial SERP decoding that skips unused sections
+"""
+import json
+from typing import Any, Callable, Dict, Optional
+import config
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# SERP decoding modes (config.SERP_JSON_MODE)
+SERP_JSON_MODES = ('auto', 'full', 'partial')
+
+BACKEND = 'orjson' if ORJSON_AVAILABLE else 'json'
+
+# Below this size a full orjson decode is cheaper than locating and decoding organic_results alone
+PARTIAL_MIN_BYTES = 8 * 1024
+
+_ORGANIC_KEY = b'"organic_results"'
+_decoder = json.JSONDecoder()
+
+
+def loads(data):
+    """
+    Decode a JSON document
+
+    Args:
+        data: bytes or str
+
+    Returns:
+        Decoded value
+
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any, default: Optional[Callable] = None, sort_keys: bool = False) -> bytes:
+    """
+    Encode a value as compact UTF-8 JSON
+
+    Args:
+        value: Value to encode
+        default: Called for objects the codec cannot serialize natively, and for
+                 datetimes, so both codecs format them the same way
+        sort_keys: Sort dictionary keys
+
+    Returns:
+        Encoded bytes
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(value, default=default, option=option)
+    return json.dumps(value, default=default, sort_keys=sort_keys, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def _find_organic_results(payload: bytes) -> int:
+    """Return the offset of the organic_results value, or -1 if the key is absent"""
+    index = payload.find(_ORGANIC_KEY)
+    while index >= 0:
+        position = index + len(_ORGANIC_KEY)
+        while position < len(payload) and payload[position] in b' \t\r\n':
+            position += 1
+        if position < len(payload) and payload[position:position + 1] == b':':
+            return position + 1
+        index = payload.find(_ORGANIC_KEY, position)
+    return -1
+
+
+def extract_partial(payload: bytes) -> Dict:
+    """
+    Decode only the parts of a SerpAPI page the rank checker uses
+
+    The organic_results array is located by its key and decoded on its own, so
+    large unused sections (ads, related questions, knowledge graph) are never
+    turned into Python objects. A quoted key cannot occur inside a JSON string
+    unescaped, so the match is always a real key. Pages without organic results
+    (errors, empty pages) are small and decoded in full.
+
+    Args:
+        payload: Raw response body
+
+    Returns:
+        {'organic_results': [...]} or the fully decoded page
+
+    Raises:
+        ValueError: If the page is not valid JSON
+    """
+    offset = _find_organic_results(payload)
+    if offset < 0:
+        return loads(payload)
+
+    text = payload[offset:].decode('utf-8')
+    stripped = text.lstrip()
+    organic_results, _ = _decoder.raw_decode(stripped)
+    if not isinstance(organic_results, list):
+        return loads(payload)
+    return {'organic_results': organic_results}
+
+
+def extract_serp(payload: bytes, mode: str = None) -> Dict:
+    """
+    Decode a SerpAPI page for rank checking
+
+    Args:
+        payload: Raw response body
+        mode: 'full' (decode everything with the fastest codec), 'partial' (organic
+              results only) or 'auto' (partial, except full orjson decoding for pages
+              under PARTIAL_MIN_BYTES). If not provided, uses config.SERP_JSON_MODE
+
+    Returns:
+        Dictionary with at least 'organic_results' or 'error' when present
+
+    Raises:
+        ValueError: If the page is not valid JSON
+    """
+    mode = mode or config.SERP_JSON_MODE
+    if mode == 'full' or (mode == 'auto' and ORJSON_AVAILABLE and len(payload) < PARTIAL_MIN_BYTES):
+        return loads(payload)
+    return extract_partial(payload)
@@ -3,7 +3,7 @@ Google Docs Manager Module
 Handles reading from and writing to Google Docs
 """
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -11,12 +11,20 @@ from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import pickle
+from metrics import instrument_storage
+from latest_ranks import maintains_latest
+from rank_series import maintains_series
+from delta_storage import delta_decoded, delta_encoded
+from profiling import profiled
 import config
 
+HEADER_LINE = 'Keyword\tWebsite URL\tRanking Position\tFound URL\tChecked On\tSERP Title\tSERP Snippet\tNotes\n'
+
 
 class GoogleDocsManager:
     """Manages Google Docs operations for storing ranking data"""
     
+    BACKEND = 'docs'
     SCOPES = ['https://www.googleapis.com/auth/documents']
     
     def __init__(self, credentials_file: str = None, document_id: str = None):
@@ -204,37 +212,114 @@ class GoogleDocsManager:
         
         return build('docs', 'v1', credentials=creds)
     
-    def _ensure_headers(self):
-        """Ensure headers exist in the document"""
-        try:
-            doc = self.service.documents().get(documentId=self.document_id).execute()
-            content = doc.get('body', {}).get('content', [])
+    def _read_document(self, document_id: str) -> Tuple[str, int]:
+        """
+        Read the text of a document
+        
+        Args:
+            document_id: Google Docs document ID
             
-            # Extract text from document to check if it's empty
-            text = ""
-            for element in content:
-                if 'paragraph' in element:
-                    for para_element in element['paragraph'].get('elements', []):
-                        if 'textRun' in para_element:
-                            text += para_element['textRun'].get('content', '')
+        Returns:
+            Tuple of (document text, index where appended text is inserted)
+        """
+        doc = self.service.documents().get(documentId=document_id).execute()
+        content = doc.get('body', {}).get('content', [])
+        
+        # Extract text from document
+        text = ""
+        for element in content:
+            if 'paragraph' in element:
+                for para_element in element['paragraph'].get('elements', []):
+                    if 'textRun' in para_element:
+                        text += para_element['textRun'].get('content', '')
+        
+        # Find the end of the document
+        # Google Docs indices: 1 = start, endIndex is exclusive, so insert at endIndex-1
+        end_index = 1
+        if content:
+            # Get the last element's end index
+            for element in reversed(content):
+                if 'endIndex' in element:
+                    end_index = element['endIndex']
+                    break
+        
+        # If end_index is 2 or less (empty doc with just paragraph structure), use 1
+        # Otherwise, we need to insert before the end, so use end_index - 1
+        if end_index <= 2 or not text.strip():
+            insert_index = 1
+        else:
+            # Insert at the end (but before any final empty paragraph)
+            insert_index = end_index - 1
+        
+        return text, insert_index
+    
+    def _append_rows(self, document_id: str, results: List[Dict]):
+        """
+        Append ranking results to one document, writing the header row first if it is empty
+        
+        Args:
+            document_id: Google Docs document ID
+            results: List of ranking result dictionaries
+        """
+        text, insert_index = self._read_document(document_id)
+        
+        # Prepare text to append
+        text_to_append = ""
+        if not text.strip():
+            text_to_append = HEADER_LINE
+            print("Headers initialized in Google Docs")
+        for result in results:
+            row = [
+                result.get('keyword', ''),
+                result.get('website_url', ''),
+                str(result.get('ranking_position', '')),
+                result.get('found_url', ''),
+                result.get('checked_on', ''),
+                result.get('serp_title', ''),
+                result.get('serp_snippet', ''),
+                result.get('error', '') or ''
+            ]
+            # Join with tabs and add newline
+            text_to_append += '\t'.join(row) + '\n'
+        
+        # Insert text at the calculated index
+        requests = [{
+            'insertText': {
+                'location': {'index': insert_index},
+                'text': text_to_append
+            }
+        }]
+        
+        self.service.documents().batchUpdate(
+            documentId=document_id,
+            body={'requests': requests}
+        ).execute()
+    
+    def _read_rows(self, document_id: str) -> List[List]:
+        """
+        Read one document as tab-separated rows
+        
+        Args:
+            document_id: Google Docs document ID
             
-            # Check if document is empty or doesn't have headers
-            if not text.strip():
-                # Create headers at index 1 (right after document start)
-                requests = [{
-                    'insertText': {
-                        'location': {'index': 1},
-                        'text': 'Keyword\tWebsite URL\tRanking Position\tFound URL\tChecked On\tSERP Title\tSERP Snippet\tNotes\n'
-                    }
-                }]
-                self.service.documents().batchUpdate(
-                    documentId=self.document_id,
-                    body={'requests': requests}
-                ).execute()
-                print("Headers initialized in Google Docs")
-        except HttpError as error:
-            print(f"Error ensuring headers: {error}")
+        Returns:
+            List of rows (header row first)
+        """
+        text, _ = self._read_document(document_id)
+        
+        # Parse tab-separated values
+        rows = []
+        for line in text.strip().split('\n'):
+            if line.strip():
+                rows.append(line.split('\t'))
+        
+        return rows
     
+    @maintains_latest
+    @maintains_series
+    @delta_encoded
+    @instrument_storage('append')
+    @profiled()
     def append_results(self, results: List[Dict], document_name: str = None):
         """
         Append ranking results to Google Docs
@@ -247,60 +332,8 @@ class GoogleDocsManager:
             return
         
         try:
-            # Ensure headers exist
-            self._ensure_headers()
-            
-            # Get document to find end index
-            doc = self.service.documents().get(documentId=self.document_id).execute()
-            content = doc.get('body', {}).get('content', [])
-            
-            # Find the end of the document
-            # Google Docs indices: 1 = start, endIndex is exclusive, so insert at endIndex-1
-            end_index = 1
-            if content:
-                # Get the last element's end index
-                for element in reversed(content):
-                    if 'endIndex' in element:
-                        end_index = element['endIndex']
-                        break
-            
-            # If end_index is 2 or less (empty doc with just paragraph structure), use 1
-            # Otherwise, we need to insert before the end, so use end_index - 1
-            if end_index <= 2:
-                insert_index = 1
-            else:
-                # Insert at the end (but before any final empty paragraph)
-                insert_index = end_index - 1
-            
-            # Prepare text to append
-            text_to_append = ""
-            for result in results:
-                row = [
-                    result.get('keyword', ''),
-                    result.get('website_url', ''),
-                    str(result.get('ranking_position', '')),
-                    result.get('found_url', ''),
-                    result.get('checked_on', ''),
-                    result.get('serp_title', ''),
-                    result.get('serp_snippet', ''),
-                    result.get('error', '') or ''
-                ]
-                # Join with tabs and add newline
-                text_to_append += '\t'.join(row) + '\n'
-            
-            # Insert text at the calculated index
-            requests = [{
-                'insertText': {
-                    'location': {'index': insert_index},
-                    'text': text_to_append
-                }
-            }]
-            
-            self.service.documents().batchUpdate(
-                documentId=self.document_id,
-                body={'requests': requests}
-            ).execute()
-            
+            # One read (end index and header check) and one write per append
+            self._append_rows(self.document_id, results)
             print(f"Successfully appended {len(results)} results to Google Docs")
         except HttpError as error:
             print(f"Error appending results to Google Docs: {error}")
@@ -332,6 +365,9 @@ class GoogleDocsManager:
         self.append_results(results)
         return [self.document_id]
     
+    @delta_decoded
+    @instrument_storage('read')
+    @profiled()
     def get_all_results(self) -> List[List]:
         """
         Get all results from the document (reads as tab-separated text)
@@ -340,24 +376,7 @@ class GoogleDocsManager:
             List of rows from the document
         """
         try:
-            doc = self.service.documents().get(documentId=self.document_id).execute()
-            content = doc.get('body', {}).get('content', [])
-            
-            # Extract text from document
-            text = ""
-            for element in content:
-                if 'paragraph' in element:
-                    for para_element in element['paragraph'].get('elements', []):
-                        if 'textRun' in para_element:
-                            text += para_element['textRun'].get('content', '')
-            
-            # Parse tab-separated values
-            rows = []
-            for line in text.strip().split('\n'):
-                if line.strip():
-                    rows.append(line.split('\t'))
-            
-            return rows
+            return self._read_rows(self.document_id)
         except HttpError as error:
             print(f"Error reading results from Google Docs: {error}")
             return []
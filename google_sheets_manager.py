@@ -10,12 +10,18 @@ from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import pickle
+from metrics import instrument_storage
+from latest_ranks import maintains_latest
+from rank_series import maintains_series
+from delta_storage import delta_decoded, delta_encoded
+from profiling import profiled
 import config
 
 
 class GoogleSheetsManager:
     """Manages Google Sheets operations for storing ranking data"""
     
+    BACKEND = 'sheets'
     SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
     
     def __init__(self, credentials_file: str = None, spreadsheet_id: str = None):
@@ -133,6 +139,11 @@ class GoogleSheetsManager:
         except HttpError as error:
             print(f"Error initializing headers: {error}")
     
+    @maintains_latest
+    @maintains_series
+    @delta_encoded
+    @instrument_storage('append')
+    @profiled()
     def append_results(self, results: List[Dict], sheet_name: str = "Rank Tracking"):
         """
         Append ranking results to Google Sheets
@@ -140,6 +151,9 @@ class GoogleSheetsManager:
         Args:
             results: List of ranking result dictionaries
             sheet_name: Name of the sheet to write to
+            
+        Raises:
+            HttpError: If the rows could not be appended
         """
         if not results:
             return
@@ -183,7 +197,12 @@ class GoogleSheetsManager:
             print(f"Successfully appended {len(results)} results to {sheet_name}")
         except HttpError as error:
             print(f"Error appending results: {error}")
+            # Callers (delta state, run journal, work queue) must not treat the results as saved
+            raise
     
+    @delta_decoded
+    @instrument_storage('read')
+    @profiled()
     def get_all_results(self, sheet_name: str = "Rank Tracking") -> List[List]:
         """
         Get all results from the sheet
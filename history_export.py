@@ -0,0 +1,401 @@
+"""
+History Export Module
+Streams rank history from Google Docs/Sheets into typed Parquet/Arrow files or gzip CSV
+"""
+import io
+import csv
+import sys
+import zlib
+import argparse
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from rank_result import TIMESTAMP_FORMAT
+from rank_series import DEFAULT_LOCATION
+import config
+
+# Column order of typed history records
+EXPORT_COLUMNS = ['keyword', 'website_url', 'location', 'position', 'not_found', 'is_error',
+                  'found_url', 'checked_on', 'serp_title', 'serp_snippet', 'notes']
+
+EXPORT_FORMATS = ('parquet', 'arrow', 'csv.gz')
+
+
+def parse_position(value) -> Dict:
+    """
+    Split a stored ranking position into typed fields
+
+    Args:
+        value: Stored position (e.g. 4, '4', '> 100', 'Error', '')
+
+    Returns:
+        Dictionary with 'position' (int or None), 'not_found' and 'is_error' flags
+    """
+    if isinstance(value, int):
+        return {'position': value, 'not_found': False, 'is_error': False}
+
+    text = str(value or '').strip()
+    if text.isdigit():
+        return {'position': int(text), 'not_found': False, 'is_error': False}
+    if text.startswith('>'):
+        return {'position': None, 'not_found': True, 'is_error': False}
+    return {'position': None, 'not_found': False, 'is_error': True}
+
+
+def parse_checked_on(value: str) -> Optional[datetime]:
+    """Parse a stored 'checked on' string, returning None if it is malformed"""
+    try:
+        return datetime.strptime(value.strip(), TIMESTAMP_FORMAT)
+    except (ValueError, AttributeError):
+        return None
+
+
+def iter_history_records(rows: Iterable[List], website_url: str = None, keyword: str = None,
+                         since: datetime = None, until: datetime = None, location: str = None) -> Iterator[Dict]:
+    """
+    Convert raw storage rows into typed history records
+
+    Stored rows have no location column, so every record gets one location, the
+    same one the latest-rank table and rank series use for them.
+
+    Args:
+        rows: Rows as returned by get_all_results (header row included)
+        website_url: Only include rows for this website
+        keyword: Only include rows for this keyword
+        since: Only include rows checked on or after this time
+        until: Only include rows checked before this time
+        location: Location of the records. If not provided, rank_series.DEFAULT_LOCATION
+
+    Yields:
+        Dictionary per row keyed by EXPORT_COLUMNS
+    """
+    location = location or DEFAULT_LOCATION
+    for index, row in enumerate(rows):
+        # Skip the header row
+        if index == 0 and row and row[0] == 'Keyword':
+            continue
+        if len(row) < 5:
+            continue
+
+        row = list(row) + [''] * (8 - len(row))
+        if website_url and row[1] != website_url:
+            continue
+        if keyword and row[0] != keyword:
+            continue
+
+        checked_on = parse_checked_on(row[4])
+        if since and (checked_on is None or checked_on < since):
+            continue
+        if until and (checked_on is None or checked_on >= until):
+            continue
+
+        record = {
+            'keyword': row[0],
+            'website_url': row[1],
+            'location': location,
+            'found_url': '' if row[3] == 'Not Found' else row[3],
+            'checked_on': checked_on,
+            'serp_title': row[5],
+            'serp_snippet': row[6],
+            'notes': row[7]
+        }
+        record.update(parse_position(row[2]))
+        yield record
+
+
+def _chunks(records: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    """Group records into lists of at most chunk_size"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _import_pyarrow():
+    """Import pyarrow, raising a helpful error if it is not installed"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet/Arrow export requires pyarrow. Install it with: pip install pyarrow")
+
+
+def arrow_schema():
+    """Return the Arrow schema used for exported history"""
+    pa = _import_pyarrow()
+    return pa.schema([
+        ('keyword', pa.string()),
+        ('website_url', pa.string()),
+        ('location', pa.string()),
+        ('position', pa.int16()),
+        ('not_found', pa.bool_()),
+        ('is_error', pa.bool_()),
+        ('found_url', pa.string()),
+        ('checked_on', pa.timestamp('s')),
+        ('serp_title', pa.string()),
+        ('serp_snippet', pa.string()),
+        ('notes', pa.string()),
+    ])
+
+
+def _open_writer(sink, fmt: str):
+    """Open a Parquet or Arrow IPC writer on a path or binary file object"""
+    pa = _import_pyarrow()
+    schema = arrow_schema()
+    if fmt == 'parquet':
+        return pa.parquet.ParquetWriter(sink, schema, compression='zstd')
+    if fmt == 'arrow':
+        return pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+    raise ValueError(f"Unsupported columnar format: {fmt}")
+
+
+def _iter_tables(records: Iterable[Dict], chunk_size: int):
+    """Convert records into Arrow tables of at most chunk_size rows"""
+    pa = _import_pyarrow()
+    schema = arrow_schema()
+    for chunk in _chunks(records, chunk_size):
+        columns = {name: [record[name] for record in chunk] for name in EXPORT_COLUMNS}
+        yield pa.Table.from_pydict(columns, schema=schema)
+
+
+def write_columnar(records: Iterable[Dict], sink, fmt: str = 'parquet', chunk_size: int = None) -> int:
+    """
+    Write records to a Parquet or Arrow IPC file in fixed-size chunks
+
+    Each chunk becomes one Parquet row group / Arrow record batch, so memory
+    stays bounded by chunk_size regardless of history length.
+
+    Args:
+        records: Typed history records
+        sink: Output path or writable binary file object
+        fmt: 'parquet' or 'arrow'
+        chunk_size: Records per row group. If not provided, uses config.EXPORT_CHUNK_ROWS
+
+    Returns:
+        Number of records written
+    """
+    writer = _open_writer(sink, fmt)
+    count = 0
+    try:
+        for table in _iter_tables(records, chunk_size or config.EXPORT_CHUNK_ROWS):
+            writer.write_table(table)
+            count += table.num_rows
+    finally:
+        writer.close()
+    return count
+
+
+def _csv_values(record: Dict) -> List:
+    """Format a typed record as a list of CSV cell values"""
+    checked_on = record['checked_on']
+    position = record['position']
+    return [
+        record['keyword'],
+        record['website_url'],
+        record['location'],
+        '' if position is None else position,
+        int(record['not_found']),
+        int(record['is_error']),
+        record['found_url'],
+        checked_on.strftime(TIMESTAMP_FORMAT) if checked_on else '',
+        record['serp_title'],
+        record['serp_snippet'],
+        record['notes']
+    ]
+
+
+def iter_csv_gz(records: Iterable[Dict], chunk_size: int = None) -> Iterator[bytes]:
+    """
+    Stream records as gzip-compressed CSV bytes
+
+    Args:
+        records: Typed history records
+        chunk_size: Records compressed per yielded block. If not provided, uses config.EXPORT_CHUNK_ROWS
+
+    Yields:
+        Gzip-compressed byte blocks; concatenated they form a valid .csv.gz file
+    """
+    chunk_size = chunk_size or config.EXPORT_CHUNK_ROWS
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for chunk in _chunks(records, chunk_size):
+        writer.writerows(_csv_values(record) for record in chunk)
+        data = compressor.compress(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
+        if data:
+            yield data
+
+    yield compressor.compress(buffer.getvalue().encode('utf-8')) + compressor.flush()
+
+
+class StreamBuffer:
+    """Minimal write-only file object that lets a writer's output be drained incrementally"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        """Return and discard everything written since the last drain"""
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_columnar(records: Iterable[Dict], fmt: str = 'parquet', chunk_size: int = None) -> Iterator[bytes]:
+    """
+    Stream a Parquet/Arrow file as bytes, one row group at a time
+
+    Args:
+        records: Typed history records
+        fmt: 'parquet' or 'arrow'
+        chunk_size: Records per row group. If not provided, uses config.EXPORT_CHUNK_ROWS
+
+    Yields:
+        Byte blocks; concatenated they form a valid file
+    """
+    buffer = StreamBuffer()
+    writer = _open_writer(buffer, fmt)
+    try:
+        for table in _iter_tables(records, chunk_size or config.EXPORT_CHUNK_ROWS):
+            writer.write_table(table)
+            data = buffer.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield buffer.drain()
+
+
+def export_history(storage_manager, fmt: str, website_url: str = None, keyword: str = None,
+                   since: datetime = None, until: datetime = None, location: str = None) -> Iterator[bytes]:
+    """
+    Read history from a storage manager and stream it in the requested format
+
+    Args:
+        storage_manager: GoogleDocsManager or GoogleSheetsManager instance
+        fmt: One of EXPORT_FORMATS
+        website_url: Only include rows for this website
+        keyword: Only include rows for this keyword
+        since: Only include rows checked on or after this time
+        until: Only include rows checked before this time
+        location: Location of the records (see iter_history_records)
+
+    Yields:
+        Encoded byte blocks
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt != 'csv.gz':
+        # Fail before any bytes are streamed if pyarrow is missing
+        _import_pyarrow()
+
+    # Sharded storage reads only the documents overlapping the window; partitioned storage only the website's sheet
+    read_window = getattr(storage_manager, 'get_results_between', None)
+    read_website = getattr(storage_manager, 'get_website_results', None)
+    if read_window and (since or until):
+        rows = read_window(since, until)
+    elif read_website and website_url:
+        rows = read_website(website_url)
+    else:
+        rows = storage_manager.get_all_results()
+    records = iter_history_records(rows, website_url, keyword, since, until, location)
+    if fmt == 'csv.gz':
+        return iter_csv_gz(records)
+    return iter_columnar(records, fmt)
+
+
+def _parse_date(value: str) -> datetime:
+    """argparse type for YYYY-MM-DD dates"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date '{value}'. Use YYYY-MM-DD format")
+
+
+def main():
+    """Export rank history via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Export rank tracking history to Parquet, Arrow or gzip CSV',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Full history as Parquet
+  python history_export.py -o history.parquet
+  
+  # One website since January, as gzip CSV
+  python history_export.py -o history.csv.gz -u https://www.example.com --since 2024-01-01
+        """
+    )
+
+    parser.add_argument('-o', '--output', required=True,
+                       help='Output file path')
+    parser.add_argument('--format', choices=EXPORT_FORMATS,
+                       help='Output format (default: inferred from the output file extension)')
+    parser.add_argument('-u', '--url',
+                       help='Only export rows for this website URL')
+    parser.add_argument('-k', '--keyword',
+                       help='Only export rows for this keyword')
+    parser.add_argument('--since', type=_parse_date,
+                       help='Only export rows checked on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--until', type=_parse_date,
+                       help='Only export rows checked before this date (YYYY-MM-DD)')
+    parser.add_argument('-l', '--location', default=DEFAULT_LOCATION,
+                       help=f'Location written to the location column (default: {DEFAULT_LOCATION})')
+
+    args = parser.parse_args()
+
+    fmt = args.format
+    if not fmt:
+        if args.output.endswith('.csv.gz'):
+            fmt = 'csv.gz'
+        elif args.output.endswith(('.arrow', '.feather')):
+            fmt = 'arrow'
+        else:
+            fmt = 'parquet'
+
+    from main import StorageManager
+
+    try:
+        blocks = export_history(StorageManager(), fmt, args.url, args.keyword, args.since, args.until,
+                                args.location)
+        with open(args.output, 'wb') as f:
+            for block in blocks:
+                f.write(block)
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"✅ History exported to {args.output} ({fmt})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Keyword Loader Module
+Streams keyword rows (keyword, url, location, depth) from plain or gzip-compressed CSV files
+"""
+import io
+import csv
+import gzip
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union, IO
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Accepted header names for each column (compared case-insensitively)
+HEADER_ALIASES = {
+    'keyword': ('keyword', 'keywords', 'query', 'search term'),
+    'url': ('url', 'website_url', 'website url', 'website', 'site', 'domain'),
+    'location': ('location', 'geo', 'country'),
+    'depth': ('depth', 'max_results', 'max results'),
+}
+
+# Column order used when the file has no header row
+DEFAULT_COLUMNS = ('keyword', 'url', 'location', 'depth')
+
+# Maximum number of invalid rows kept for reporting
+MAX_REPORTED_ERRORS = 100
+
+
+class KeywordRow(NamedTuple):
+    """A single keyword to check, with optional per-row overrides"""
+    keyword: str
+    url: Optional[str] = None
+    location: Optional[str] = None
+    depth: Optional[int] = None
+
+
+class LoadStats:
+    """Counters and invalid-row report collected while streaming a keyword file"""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.rows_skipped = 0
+        self.header = None
+        self.invalid_rows: List[Tuple[int, str]] = []
+        self.invalid_count = 0
+        # Row that could not be decoded or parsed as CSV; nothing after it was read
+        self.failed_row: Optional[int] = None
+
+    def add_invalid(self, line_number: int, reason: str):
+        """
+        Record an invalid row
+
+        Args:
+            line_number: 1-based row number in the file
+            reason: Why the row was rejected
+        """
+        self.invalid_count += 1
+        if len(self.invalid_rows) < MAX_REPORTED_ERRORS:
+            self.invalid_rows.append((line_number, reason))
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary"""
+        return (f"{self.rows_loaded} keywords loaded, {self.rows_skipped} empty rows skipped, "
+                f"{self.invalid_count} invalid rows")
+
+    def to_dict(self) -> dict:
+        """Return the stats as a JSON-serializable dictionary"""
+        return {
+            'rows_read': self.rows_read,
+            'loaded': self.rows_loaded,
+            'skipped': self.rows_skipped,
+            'invalid': self.invalid_count,
+            'invalid_rows': [{'line': line, 'reason': reason} for line, reason in self.invalid_rows]
+        }
+
+
+def _open_text(source: Union[str, IO], encoding: str = 'utf-8') -> IO[str]:
+    """
+    Open a path or file object as a text stream, transparently decompressing gzip
+
+    Args:
+        source: File path, binary file object or text file object
+        encoding: Text encoding
+
+    Returns:
+        Text stream suitable for csv.reader
+    """
+    if isinstance(source, str):
+        binary = open(source, 'rb')
+    elif isinstance(source, io.TextIOBase):
+        return source
+    else:
+        binary = source
+
+    if not hasattr(binary, 'peek'):
+        binary = io.BufferedReader(binary)
+
+    if binary.peek(2)[:2] == GZIP_MAGIC:
+        binary = gzip.GzipFile(fileobj=binary, mode='rb')
+
+    # utf-8-sig strips a BOM written by Excel
+    if encoding.lower().replace('-', '') == 'utf8':
+        encoding = 'utf-8-sig'
+    return io.TextIOWrapper(binary, encoding=encoding, newline='')
+
+
+def _detect_header(row: List[str]) -> Optional[Tuple[Optional[str], ...]]:
+    """
+    Map header cells to column names if the row looks like a header
+
+    Args:
+        row: First non-empty CSV row
+
+    Returns:
+        Tuple of column names (None for unknown columns), or None if the row is data
+    """
+    columns = []
+    for cell in row:
+        name = cell.strip().lower()
+        column = None
+        for key, aliases in HEADER_ALIASES.items():
+            if name in aliases:
+                column = key
+                break
+        columns.append(column)
+
+    if 'keyword' not in columns:
+        return None
+    return tuple(columns)
+
+
+def _parse_row(row: List[str], columns: Tuple[Optional[str], ...]) -> KeywordRow:
+    """
+    Convert a CSV row to a KeywordRow
+
+    Raises:
+        ValueError: If the row is invalid
+    """
+    values = {}
+    for column, cell in zip(columns, row):
+        if column and column not in values:
+            values[column] = cell.strip()
+
+    keyword = values.get('keyword', '')
+    if not keyword:
+        raise ValueError("missing keyword")
+
+    url = values.get('url') or None
+    if url and (' ' in url or '.' not in url):
+        raise ValueError(f"invalid URL '{url}'")
+
+    depth = values.get('depth') or None
+    if depth is not None:
+        try:
+            depth = int(depth)
+        except ValueError:
+            raise ValueError(f"invalid depth '{depth}'")
+        if depth <= 0:
+            raise ValueError(f"invalid depth '{depth}'")
+
+    return KeywordRow(keyword, url, values.get('location') or None, depth)
+
+
+def iter_keyword_rows(source: Union[str, IO], stats: LoadStats = None,
+                      encoding: str = 'utf-8') -> Iterator[KeywordRow]:
+    """
+    Stream keyword rows from a CSV file in bounded memory
+
+    The file may be gzip-compressed and may start with a header row naming the
+    columns (keyword, url, location, depth). Without a header, columns are read
+    in that order and only the keyword column is required. Empty rows are
+    skipped and invalid rows are reported in stats rather than raised.
+
+    Args:
+        source: File path or file object (binary or text, plain or gzip)
+        stats: Optional LoadStats collecting counts and invalid rows
+        encoding: Text encoding of the CSV data
+
+    Yields:
+        KeywordRow for each valid row
+
+    Raises:
+        FileNotFoundError: If source is a path that does not exist
+        UnicodeDecodeError: If the data is not valid text in encoding (stats.failed_row is set)
+        csv.Error: If a row is not valid CSV (stats.failed_row is set)
+    """
+    if stats is None:
+        stats = LoadStats()
+
+    stream = _open_text(source, encoding)
+    try:
+        columns = None
+        for line_number, row in enumerate(csv.reader(stream), start=1):
+            stats.rows_read += 1
+
+            if not row or not any(cell.strip() for cell in row):
+                stats.rows_skipped += 1
+                continue
+
+            if columns is None:
+                columns = _detect_header(row)
+                if columns is not None:
+                    stats.header = row
+                    continue
+                columns = DEFAULT_COLUMNS
+
+            try:
+                keyword_row = _parse_row(row, columns)
+            except ValueError as e:
+                stats.add_invalid(line_number, str(e))
+                continue
+
+            stats.rows_loaded += 1
+            yield keyword_row
+    except (UnicodeDecodeError, csv.Error):
+        stats.failed_row = stats.rows_read + 1
+        raise
+    finally:
+        if isinstance(source, str):
+            stream.close()
@@ -0,0 +1,294 @@
+"""
+Latest Ranks Module
+Materialized latest-position table per (website, keyword, location), maintained on every append
+"""
+import sys
+import time
+import sqlite3
+import argparse
+import functools
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from rank_result import RankResult, RankStatus
+from rank_series import DEFAULT_LOCATION
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS latest (
+    website_url TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    location TEXT NOT NULL,
+    status TEXT NOT NULL,
+    position INTEGER,
+    max_results INTEGER NOT NULL,
+    found_url TEXT,
+    serp_title TEXT,
+    checked_at REAL NOT NULL,
+    previous_position INTEGER,
+    previous_status TEXT,
+    PRIMARY KEY (website_url, keyword, location)
+);
+"""
+
+# Failed checks are not stored: the previous known position stays current.
+# Rows are only replaced by newer checks, so replayed or out-of-order batches are harmless.
+UPSERT = """
+INSERT INTO latest (website_url, keyword, location, status, position, max_results,
+                    found_url, serp_title, checked_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (website_url, keyword, location) DO UPDATE SET
+    previous_position = latest.position,
+    previous_status = latest.status,
+    status = excluded.status,
+    position = excluded.position,
+    max_results = excluded.max_results,
+    found_url = excluded.found_url,
+    serp_title = excluded.serp_title,
+    checked_at = excluded.checked_at
+WHERE excluded.checked_at > latest.checked_at
+"""
+
+COLUMNS = ('website_url', 'keyword', 'location', 'status', 'position', 'max_results',
+           'found_url', 'serp_title', 'checked_at', 'previous_position', 'previous_status')
+
+
+class LatestRankTable:
+    """SQLite table holding the most recent successful check of each tracked keyword"""
+
+    def __init__(self, path: str = None):
+        """
+        Initialize the Latest Rank Table
+
+        Args:
+            path: SQLite database file. If not provided, uses config.LATEST_RANKS_DB
+        """
+        self.path = path or config.LATEST_RANKS_DB
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (web requests run on several threads)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def update(self, results: Iterable[Dict], location: str = None) -> int:
+        """
+        Apply newly stored results to the table
+
+        Args:
+            results: RankResult records or legacy result dictionaries
+            location: Location for results that do not carry one. If not provided, DEFAULT_LOCATION
+
+        Returns:
+            Number of results applied (failed checks are skipped)
+        """
+        params = []
+        for result in results:
+            result = RankResult.from_dict(result, location)
+            if result.status is RankStatus.ERROR or not result.keyword:
+                continue
+            params.append((
+                result.website_url or '',
+                result.keyword,
+                result.location or location or DEFAULT_LOCATION,
+                result.status.value,
+                result.position,
+                result.max_results,
+                result.found_url,
+                result.serp_title,
+                result.checked_at
+            ))
+
+        if params:
+            connection = self._connection()
+            with connection:
+                connection.executemany(UPSERT, params)
+        return len(params)
+
+    def rebuild(self, rows: List[List], location: str = None) -> int:
+        """
+        Replace the table contents from full stored history
+
+        Stored rows have no location column, so rebuilt entries get one location,
+        the same one live updates use for results without a location.
+
+        Args:
+            rows: Rows as returned by a storage manager's get_all_results (header row included)
+            location: Location of the rebuilt entries. If not provided, DEFAULT_LOCATION
+
+        Returns:
+            Number of results applied
+        """
+        results = []
+        for row in rows:
+            if len(row) < 5 or row[0] == 'Keyword':
+                continue
+            results.append(RankResult.from_dict({
+                'keyword': row[0],
+                'website_url': row[1],
+                'ranking_position': row[2],
+                'found_url': row[3],
+                'checked_on': row[4],
+                'serp_title': row[5] if len(row) > 5 else '',
+                'error': (row[7] if len(row) > 7 else '') or None
+            }))
+
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM latest')
+        return self.update(results, location)
+
+    def query(self, website_url: str = None, keyword: str = None, location: str = None,
+              limit: int = None) -> List[Dict]:
+        """
+        Look up latest positions
+
+        Args:
+            website_url: Only include this website
+            keyword: Only include this keyword
+            location: Only include this location
+            limit: Maximum number of rows
+
+        Returns:
+            List of row dictionaries (see COLUMNS), ordered by website and keyword
+        """
+        clauses, params = [], []
+        for column, value in (('website_url', website_url), ('keyword', keyword), ('location', location)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM latest"
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY website_url, keyword, location'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        return [dict(zip(COLUMNS, row)) for row in self._connection().execute(sql, params)]
+
+    def count(self) -> int:
+        """Return the number of tracked (website, keyword, location) entries"""
+        return self._connection().execute('SELECT COUNT(*) FROM latest').fetchone()[0]
+
+
+_tables: Dict[str, LatestRankTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_table(path: str = None) -> LatestRankTable:
+    """Return the shared table for a database path (created on first use)"""
+    path = path or config.LATEST_RANKS_DB
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = _tables[path] = LatestRankTable(path)
+        return table
+
+
+def maintains_latest(method: Callable) -> Callable:
+    """
+    Decorator for storage manager append methods that updates the latest-rank table
+    after the append succeeds
+
+    A failure to update the table is reported but never fails the append: the
+    table can always be rebuilt from history with `python latest_ranks.py rebuild`.
+    """
+    @functools.wraps(method)
+    def wrapper(self, results, *args, **kwargs):
+        outcome = method(self, results, *args, **kwargs)
+        if results and config.LATEST_RANKS_ENABLED:
+            try:
+                get_table().update(results)
+            except sqlite3.Error as e:
+                print(f"Warning: could not update latest ranks: {e}")
+        return outcome
+    return wrapper
+
+
+def format_entry(entry: Dict) -> Dict:
+    """
+    Convert a table row to the JSON shape used by the web API
+
+    Args:
+        entry: Row dictionary from LatestRankTable.query
+
+    Returns:
+        Dictionary with display position, status and change since the previous check
+    """
+    def display(status: Optional[str], position: Optional[int]) -> Optional[str]:
+        if status == RankStatus.FOUND.value:
+            return str(position)
+        if status == RankStatus.NOT_FOUND.value:
+            return f"> {entry['max_results']}"
+        return None
+
+    change = None
+    if entry['position'] is not None and entry['previous_position'] is not None:
+        change = entry['previous_position'] - entry['position']
+
+    return {
+        'keyword': entry['keyword'],
+        'website_url': entry['website_url'],
+        'location': entry['location'],
+        'position': display(entry['status'], entry['position']),
+        'previous_position': display(entry['previous_status'], entry['previous_position']),
+        'change': change,
+        'status': entry['status'],
+        'found_url': entry['found_url'] or 'Not Found',
+        'serp_title': entry['serp_title'] or '',
+        'checked_on': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['checked_at']))
+    }
+
+
+def main():
+    """Show or rebuild the latest-rank table via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Latest ranking position per tracked keyword',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Show current positions for a website
+  python latest_ranks.py show -u https://www.example.com
+
+  # Rebuild the table from stored history (e.g. after enabling it on an existing document)
+  python latest_ranks.py rebuild
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show_parser = subparsers.add_parser('show', help='Print latest positions')
+    show_parser.add_argument('-u', '--url', help='Only show this website URL')
+    show_parser.add_argument('-k', '--keyword', help='Only show this keyword')
+    show_parser.add_argument('-l', '--location', help='Only show this location')
+
+    rebuild_parser = subparsers.add_parser('rebuild', help='Rebuild the table from stored history')
+    rebuild_parser.add_argument('-l', '--location', default=DEFAULT_LOCATION,
+                                help=f'Location of the rebuilt entries (default: {DEFAULT_LOCATION})')
+    args = parser.parse_args()
+
+    table = get_table()
+    if args.command == 'rebuild':
+        from main import StorageManager
+        count = table.rebuild(StorageManager().get_all_results(), args.location)
+        print(f"✅ Rebuilt latest ranks from {count} stored results ({table.count()} keywords)")
+        return
+
+    entries = [format_entry(entry) for entry in table.query(args.url, args.keyword, args.location)]
+    if not entries:
+        print("No latest ranks recorded yet. Run a rank check or `python latest_ranks.py rebuild`.")
+        sys.exit(1)
+
+    for entry in entries:
+        change = '' if entry['change'] is None else f" ({entry['change']:+d})"
+        location = f" [{entry['location']}]" if entry['location'] else ''
+        print(f"{entry['website_url']}  {entry['keyword']}{location}: {entry['position']}{change}  {entry['checked_on']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,518 @@
+"""
+Load Test Script
+Ramps virtual users against one app.py (or asgi_app.py) process served with a local
+fake SerpAPI and in-memory storage, and reports throughput, latency, errors and peak RSS
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+from typing import Callable, Dict, List, Optional
+import requests
+from adaptive_concurrency import CONCURRENCY_MODES
+from benchmark import summarize_latencies
+from fake_serpapi import FakeSerpApi, add_server_arguments, settings_from_args
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+SERVER_MODES = ('flask', 'asgi')
+
+ENDPOINTS = ('check-rankings', 'history', 'upload-keywords')
+
+# Seconds to wait for the app process to answer before giving up
+STARTUP_TIMEOUT = 30
+
+# Distinct keywords the virtual users draw from
+KEYWORD_SPACE = 10000
+
+
+def _free_port() -> int:
+    """Pick an unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _memory_mb(pid: int) -> Dict:
+    """
+    Current and peak resident memory of a process, from /proc (Linux)
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        Dictionary with rss_mb and peak_rss_mb, or an empty dictionary where /proc is unavailable
+    """
+    try:
+        with open(f"/proc/{pid}/status", 'r', encoding='utf-8') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        return {}
+    memory = {}
+    for field, key in (('VmRSS', 'rss_mb'), ('VmHWM', 'peak_rss_mb')):
+        if field in fields:
+            memory[key] = round(int(fields[field].split()[0]) / 1024, 1)
+    return memory
+
+
+def _children_peak_rss_mb() -> Optional[float]:
+    """Peak RSS of the largest finished child process (the app server), or None if unknown"""
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def seed_history(storage, rows: int, website_url: str):
+    """Fill storage with past results so /api/history has realistic work"""
+    batch = []
+    for index in range(rows):
+        position = index % 120 + 1
+        batch.append({
+            'keyword': f"load keyword {index % KEYWORD_SPACE}",
+            'website_url': website_url,
+            'ranking_position': position if position <= 100 else '> 100',
+            'found_url': f"{website_url}/page-{index}" if position <= 100 else 'Not Found',
+            'checked_on': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time() - index * 3600)),
+            'serp_title': f"Title {index}",
+            'serp_snippet': f"Snippet {index}",
+            'error': ''
+        })
+        if len(batch) == 1000:
+            storage.append_results(batch)
+            batch = []
+    storage.append_results(batch)
+
+
+def serve(mode: str, port: int, history_rows: int, website_url: str, append_latency_ms: float,
+          read_latency_ms: float):
+    """
+    Run the web app with in-memory storage (the app process started by run_load_test)
+
+    Args:
+        mode: 'flask' (app.py's threaded server) or 'asgi' (asgi_app.py under uvicorn)
+        port: Port to listen on
+        history_rows: Rows stored before serving starts
+        website_url: Website the stored rows belong to
+        append_latency_ms: Simulated latency of each storage append (a Docs/Sheets write)
+        read_latency_ms: Simulated latency of each storage read (a Docs/Sheets read)
+    """
+    from memory_storage import MemoryStorageManager
+    import app as flask_app
+
+    storage = MemoryStorageManager()
+    seed_history(storage, history_rows, website_url)
+    storage.append_latency_ms = append_latency_ms
+    storage.read_latency_ms = read_latency_ms
+    flask_app.app.config['STORAGE_MANAGER_FACTORY'] = lambda: storage
+
+    if mode == 'asgi':
+        import uvicorn
+        from asgi_app import asgi_app
+        uvicorn.run(asgi_app, host='127.0.0.1', port=port, log_level='warning')
+    else:
+        flask_app.app.run(host='127.0.0.1', port=port, threaded=True)
+
+
+class _Recorder:
+    """Thread-safe collection of request outcomes for one stage"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.statuses = {}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency_ms: float, status: str, ok: bool):
+        with self._lock:
+            self.latencies[endpoint].append(latency_ms)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def _check_request(session: requests.Session, base_url: str, rng: random.Random, args) -> requests.Response:
+    keywords = [f"load keyword {rng.randrange(KEYWORD_SPACE)}" for _ in range(args.keywords_per_check)]
+    return session.post(f"{base_url}/api/check-rankings", timeout=args.request_timeout, json={
+        'website_url': args.website_url,
+        'keywords': keywords,
+        'location': 'United States'
+    })
+
+
+def _history_request(session: requests.Session, base_url: str, rng: random.Random, args) -> requests.Response:
+    return session.get(f"{base_url}/api/history", timeout=args.request_timeout, params={
+        'website_url': args.website_url,
+        'limit': 50,
+        'offset': rng.randrange(max(1, args.history_rows - 50))
+    })
+
+
+def _upload_request(session: requests.Session, base_url: str, rng: random.Random, args) -> requests.Response:
+    return session.post(f"{base_url}/api/upload-keywords", timeout=args.request_timeout,
+                        files={'file': ('keywords.csv', io.BytesIO(args.upload_body), 'text/csv')})
+
+
+REQUESTS: Dict[str, Callable] = {
+    'check-rankings': _check_request,
+    'history': _history_request,
+    'upload-keywords': _upload_request,
+}
+
+
+def _virtual_user(base_url: str, stop_at: float, seed: int, weights: List[float], recorder: _Recorder, args):
+    """Send requests back to back (closed loop) until the stage ends"""
+    rng = random.Random(seed)
+    session = requests.Session()
+    try:
+        while time.monotonic() < stop_at:
+            endpoint = rng.choices(ENDPOINTS, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = REQUESTS[endpoint](session, base_url, rng, args)
+                status = str(response.status_code)
+                ok = response.status_code < 400
+            except requests.exceptions.Timeout:
+                status, ok = 'timeout', False
+            except requests.exceptions.RequestException:
+                status, ok = 'connection', False
+            recorder.record(endpoint, (time.perf_counter() - started) * 1000, status, ok)
+            if args.think_ms:
+                time.sleep(args.think_ms / 1000)
+    finally:
+        session.close()
+
+
+def run_stage(base_url: str, users: int, seconds: float, weights: List[float], args, server_pid: int) -> Dict:
+    """
+    Run one stage of the ramp
+
+    Args:
+        base_url: App URL
+        users: Concurrent virtual users
+        seconds: Stage duration
+        weights: Request mix weights, in ENDPOINTS order
+        args: Parsed CLI options
+        server_pid: App process ID (for memory readings)
+
+    Returns:
+        Stage report
+    """
+    recorder = _Recorder()
+    stop_at = time.monotonic() + seconds
+    threads = [
+        threading.Thread(target=_virtual_user, args=(base_url, stop_at, args.seed * 1000 + users * 100 + index,
+                                                     weights, recorder, args), daemon=True)
+        for index in range(users)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in recorder.latencies.values() for value in values]
+    total = len(all_latencies)
+    errors = sum(recorder.errors.values())
+    stage = {
+        'users': users,
+        'seconds': round(elapsed, 3),
+        'requests': total,
+        'requests_per_sec': round(total / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'status': recorder.statuses,
+        'latency_ms': summarize_latencies(all_latencies),
+        'endpoints': {
+            name: {
+                'requests': len(values),
+                'errors': recorder.errors[name],
+                'latency_ms': summarize_latencies(values)
+            }
+            for name, values in recorder.latencies.items() if values
+        }
+    }
+    stage.update(_memory_mb(server_pid))
+    return stage
+
+
+def _sustained(stages: List[Dict], max_error_rate: float, slo_ms: Optional[float]) -> Optional[Dict]:
+    """Highest-load stage that stayed within the error rate and p95 latency targets"""
+    passing = [stage for stage in stages
+               if stage['requests'] and stage['error_rate'] <= max_error_rate
+               and (slo_ms is None or stage['latency_ms']['p95'] <= slo_ms)]
+    if not passing:
+        return None
+    best = max(passing, key=lambda stage: stage['users'])
+    return {'users': best['users'], 'requests_per_sec': best['requests_per_sec'], 'p95_ms': best['latency_ms']['p95']}
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """
+    Compare a load test report with a stored baseline, stage by stage (matched on user count)
+
+    Args:
+        report: Current report
+        baseline: Baseline report
+        max_regression: Allowed change in percent before a stage counts as regressed
+
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    previous_stages = {stage['users']: stage for stage in baseline.get('stages', [])}
+    print(f"\n{'='*60}")
+    print("Comparison with baseline")
+    print(f"{'='*60}")
+    for current in report['stages']:
+        users = current['users']
+        previous = previous_stages.get(users)
+        if not previous:
+            print(f"{users} users: no baseline")
+            continue
+
+        old_rate, new_rate = previous['requests_per_sec'], current['requests_per_sec']
+        old_p95, new_p95 = previous['latency_ms']['p95'], current['latency_ms']['p95']
+        rate_change = (new_rate - old_rate) / old_rate * 100 if old_rate else 0.0
+        p95_change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+        print(f"{users} users: requests/sec {old_rate} -> {new_rate} ({rate_change:+.1f}%), "
+              f"p95 {old_p95} -> {new_p95} ms ({p95_change:+.1f}%), "
+              f"errors {previous['error_rate']:.2%} -> {current['error_rate']:.2%}")
+
+        if rate_change < -max_regression:
+            regressions.append(f"{users} users: throughput dropped {-rate_change:.1f}%")
+        if p95_change > max_regression:
+            regressions.append(f"{users} users: p95 latency rose {p95_change:.1f}%")
+        if current['error_rate'] > previous['error_rate'] + report['max_error_rate']:
+            regressions.append(f"{users} users: error rate rose to {current['error_rate']:.2%}")
+
+    old_peak, new_peak = baseline.get('peak_rss_mb'), report.get('peak_rss_mb')
+    if old_peak and new_peak:
+        peak_change = (new_peak - old_peak) / old_peak * 100
+        print(f"Peak RSS: {old_peak} -> {new_peak} MB ({peak_change:+.1f}%)")
+        if peak_change > max_regression:
+            regressions.append(f"peak RSS rose {peak_change:.1f}%")
+    return regressions
+
+
+def _start_app(args, serp_url: str, work_dir: str, port: int) -> subprocess.Popen:
+    """Start the app process pointed at the fake SerpAPI, with its state files in work_dir"""
+    env = dict(os.environ)
+    env.update({
+        'SERPAPI_KEY': 'loadtest',
+        'SERPAPI_URL': serp_url,
+        'SERP_CONCURRENCY': args.concurrency or env.get('SERP_CONCURRENCY', 'adaptive'),
+        'SERP_ARCHIVE_ENABLED': 'false',
+        'USE_WORK_QUEUE': 'false',
+        'RUN_JOURNAL_DIR': os.path.join(work_dir, 'runs'),
+        'LATEST_RANKS_DB': os.path.join(work_dir, 'latest_ranks.db'),
+        'DELTA_STATE_DB': os.path.join(work_dir, 'delta_state.db'),
+        'WORK_QUEUE_DB': os.path.join(work_dir, 'work_queue.db'),
+        'RANK_SERIES_DIR': os.path.join(work_dir, 'rank_series'),
+    })
+    if not args.keep_delays:
+        env['PAGE_DELAY_SECONDS'] = '0'
+        env['KEYWORD_DELAY_SECONDS'] = '0'
+
+    command = [sys.executable, os.path.abspath(__file__), '--serve', args.server, '--port', str(port),
+               '--history-rows', str(args.history_rows), '--website-url', args.website_url,
+               '--storage-append-ms', str(args.storage_append_ms), '--storage-read-ms', str(args.storage_read_ms)]
+    log = open(os.path.join(work_dir, 'app.log'), 'w', encoding='utf-8')
+    return subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_until_ready(process: subprocess.Popen, base_url: str, work_dir: str):
+    """Wait for the app to answer, or exit with its log if it fails to start"""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if requests.get(f"{base_url}/", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+
+    print("❌ The app did not start. Its output:")
+    with open(os.path.join(work_dir, 'app.log'), 'r', encoding='utf-8') as f:
+        print(f.read())
+    process.kill()
+    sys.exit(1)
+
+
+def run_load_test(args) -> Dict:
+    """
+    Start the fake SerpAPI and the app, ramp virtual users and build the report
+
+    Args:
+        args: Parsed CLI options
+
+    Returns:
+        Report dictionary
+    """
+    users_per_stage = [int(value) for value in args.users.split(',')]
+    weights = [args.check_weight, args.history_weight, args.upload_weight]
+    args.upload_body = ''.join(f"upload keyword {i}\n" for i in range(args.upload_keywords)).encode('utf-8')
+    settings = settings_from_args(args)
+    work_dir = tempfile.mkdtemp(prefix='rank-load-')
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'server_mode': args.server,
+        'concurrency': args.concurrency,
+        'fake_serpapi': vars(settings),
+        'storage_latency_ms': {'append': args.storage_append_ms, 'read': args.storage_read_ms},
+        'history_rows': args.history_rows,
+        'mix': dict(zip(ENDPOINTS, weights)),
+        'keywords_per_check': args.keywords_per_check,
+        'stage_seconds': args.stage_seconds,
+        'max_error_rate': args.max_error_rate,
+        'slo_p95_ms': args.slo_ms,
+        'stages': []
+    }
+
+    process = None
+    try:
+        with FakeSerpApi(settings) as serp:
+            process = _start_app(args, serp.url, work_dir, port)
+            _wait_until_ready(process, base_url, work_dir)
+            print(f"App ({args.server}) running at {base_url}, pid {process.pid}")
+            if _memory_mb(process.pid):
+                print(f"  RSS at start: {_memory_mb(process.pid)['rss_mb']} MB")
+
+            for users in users_per_stage:
+                print(f"Stage: {users} virtual users for {args.stage_seconds} s...")
+                stage = run_stage(base_url, users, args.stage_seconds, weights, args, process.pid)
+                report['stages'].append(stage)
+                latency = stage['latency_ms']
+                memory = f", RSS {stage['rss_mb']} MB (peak {stage['peak_rss_mb']} MB)" if 'rss_mb' in stage else ''
+                print(f"  {stage['requests_per_sec']} requests/sec, {stage['error_rate']:.2%} errors, "
+                      f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms{memory}")
+                for name, endpoint in stage['endpoints'].items():
+                    print(f"    {name}: {endpoint['requests']} requests, {endpoint['errors']} errors, "
+                          f"p95 {endpoint['latency_ms']['p95']} ms")
+            report['serpapi_calls'] = serp.stats['requests']
+    finally:
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    peaks = [stage['peak_rss_mb'] for stage in report['stages'] if 'peak_rss_mb' in stage]
+    report['peak_rss_mb'] = max(peaks) if peaks else _children_peak_rss_mb()
+    report['sustained'] = _sustained(report['stages'], args.max_error_rate, args.slo_ms)
+    return report
+
+
+def main():
+    """Run the load test via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Load test the web app against a local fake SerpAPI and in-memory storage',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Ramp 1 -> 32 users, 15 s per stage, results saved as a baseline
+  python load_test.py --users 1,2,4,8,16,32 --stage-seconds 15 -o load_baseline.json
+
+  # Same ramp against the async serving mode, compared with the baseline
+  python load_test.py --server asgi --users 1,2,4,8,16,32 --stage-seconds 15 --baseline load_baseline.json
+
+  # History-heavy traffic with slow storage reads and a 500 ms p95 target
+  python load_test.py --check-weight 1 --history-weight 8 --storage-read-ms 300 --slo-ms 500
+        """
+    )
+    parser.add_argument('--server', choices=SERVER_MODES, default='flask',
+                        help='Serving mode: app.py (flask) or asgi_app.py (asgi) (default: flask)')
+    parser.add_argument('--users', default='1,2,4,8,16',
+                        help='Comma-separated virtual users per stage (default: 1,2,4,8,16)')
+    parser.add_argument('--stage-seconds', type=float, default=10.0, help='Duration of each stage (default: 10)')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='Pause between requests of one user (default: 0)')
+    parser.add_argument('--check-weight', type=float, default=2.0, help='Share of /api/check-rankings (default: 2)')
+    parser.add_argument('--history-weight', type=float, default=5.0, help='Share of /api/history (default: 5)')
+    parser.add_argument('--upload-weight', type=float, default=1.0, help='Share of /api/upload-keywords (default: 1)')
+    parser.add_argument('--keywords-per-check', type=int, default=3, help='Keywords per check request (default: 3)')
+    parser.add_argument('--upload-keywords', type=int, default=500, help='Keywords per uploaded file (default: 500)')
+    parser.add_argument('--history-rows', type=int, default=5000, help='Rows stored before the test (default: 5000)')
+    parser.add_argument('--storage-append-ms', type=float, default=150.0,
+                        help='Simulated Docs/Sheets write latency (default: 150)')
+    parser.add_argument('--storage-read-ms', type=float, default=100.0,
+                        help='Simulated Docs/Sheets read latency (default: 100)')
+    parser.add_argument('--website-url', default='https://www.example.com', help='Website to track')
+    parser.add_argument('--concurrency', choices=CONCURRENCY_MODES,
+                        help='SerpAPI call pacing in the app (default: the configured SERP_CONCURRENCY)')
+    parser.add_argument('--keep-delays', action='store_true',
+                        help='Keep the configured page/keyword delays (default: disable them)')
+    parser.add_argument('--request-timeout', type=float, default=60.0, help='Client timeout per request (default: 60)')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='Highest error rate of a sustained stage (default: 0.01)')
+    parser.add_argument('--slo-ms', type=float, help='Highest p95 latency of a sustained stage (default: no limit)')
+    parser.add_argument('-o', '--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Baseline JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='Allowed regression vs baseline in percent (default: 10)')
+    parser.add_argument('--serve', choices=SERVER_MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    # Internal: the app process started by run_load_test
+    if args.serve:
+        serve(args.serve, args.port, args.history_rows, args.website_url,
+              args.storage_append_ms, args.storage_read_ms)
+        return
+
+    report = run_load_test(args)
+
+    print(f"\n{'='*60}")
+    sustained = report['sustained']
+    if sustained:
+        print(f"Sustained: {sustained['users']} concurrent users, {sustained['requests_per_sec']} requests/sec "
+              f"(p95 {sustained['p95_ms']} ms)")
+    else:
+        print("⚠️  No stage stayed within the error rate and latency targets")
+    if report['peak_rss_mb'] is not None:
+        print(f"Peak RSS of the app: {report['peak_rss_mb']} MB")
+    print(f"{'='*60}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.max_regression)
+        if regressions:
+            print("\n❌ Regressions detected:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions beyond the allowed threshold")
+
+
+if __name__ == '__main__':
+    main()
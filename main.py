@@ -2,17 +2,34 @@
 Main Application Script
 Google Rank Tracking System - Automated keyword ranking checker
 """
+import os
 import sys
+import time
 import argparse
 import csv
-from typing import List
+import queue
+import itertools
+import threading
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
 from rank_checker import RankChecker
+from rank_result import RankResult, RankStatus
+from run_journal import RunJournal
+from work_queue import WorkQueue
+from keyword_loader import KeywordRow, LoadStats, iter_keyword_rows
+import metrics
+import profiling
 import config
 
 # Import storage manager based on configuration
-if config.STORAGE_TYPE == 'docs':
+if config.STORAGE_TYPE == 'docs' and config.DOCS_SHARDING != 'off':
+    from sharded_docs_manager import ShardedDocsManager
+    StorageManager = ShardedDocsManager
+elif config.STORAGE_TYPE == 'docs':
     from google_docs_manager import GoogleDocsManager
     StorageManager = GoogleDocsManager
+elif config.STORAGE_TYPE == 'sheets' and config.SHEETS_PARTITIONING == 'website':
+    from partitioned_sheets_manager import PartitionedSheetsManager
+    StorageManager = PartitionedSheetsManager
 elif config.STORAGE_TYPE == 'sheets':
     from google_sheets_manager import GoogleSheetsManager
     StorageManager = GoogleSheetsManager
@@ -26,103 +43,360 @@ def load_keywords_from_csv(csv_file: str) -> List[str]:
     """
     Load keywords from a CSV file
     
+    Only the keyword column is returned; use keyword_loader.iter_keyword_rows
+    to stream rows with their per-row URL, location and depth.
+    
     Args:
-        csv_file: Path to CSV file
+        csv_file: Path to CSV file (plain or gzip-compressed)
         
     Returns:
         List of keywords
     """
-    keywords = []
+    stats = LoadStats()
     try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row and row[0].strip():  # Skip empty rows
-                    keywords.append(row[0].strip())
-        return keywords
+        keywords = [row.keyword for row in iter_keyword_rows(csv_file, stats)]
     except FileNotFoundError:
         print(f"Error: CSV file not found: {csv_file}")
         return []
-    except Exception as e:
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
         print(f"Error reading CSV file: {e}")
         return []
+    
+    report_load_stats(stats)
+    return keywords
+
+
+def report_load_stats(stats: LoadStats):
+    """Print skipped and invalid rows found while loading a keyword file"""
+    if not stats.invalid_count and not stats.rows_skipped and not stats.failed_row:
+        return
+    print(f"Keyword file: {stats.summary()}")
+    for line_number, reason in stats.invalid_rows:
+        print(f"  ⚠️  Row {line_number}: {reason}")
+    if stats.invalid_count > len(stats.invalid_rows):
+        print(f"  ... and {stats.invalid_count - len(stats.invalid_rows)} more invalid rows")
+    if stats.failed_row:
+        print(f"  ❌ Row {stats.failed_row}: could not be read; the rows after it were not loaded")
+
+
+def _to_check_rows(keywords: Iterable[Union[str, KeywordRow]], url: str, location: str) -> Iterator[KeywordRow]:
+    """Fill in the run's default URL and location for rows that don't override them"""
+    for item in keywords:
+        if isinstance(item, str):
+            yield KeywordRow(item, url, location, None)
+        else:
+            yield KeywordRow(item.keyword, item.url or url, item.location or location, item.depth)
 
 
-def run_rank_tracking(url: str, keywords: List[str], location: str = "United States", sheet_name: str = "Rank Tracking"):
+def save_results(storage_manager, results: List[Dict], sheet_name: str = "Rank Tracking"):
+    """
+    Save results with the configured storage manager
+    
+    Args:
+        storage_manager: GoogleDocsManager or GoogleSheetsManager instance
+        results: List of ranking result dictionaries
+        sheet_name: Google Sheets sheet name
+    """
+    if config.STORAGE_TYPE == 'docs':
+        storage_manager.append_results(results)
+    else:
+        storage_manager.append_results(results, sheet_name)
+
+
+class _StorageSink:
+    """Background stage that saves checked results to storage in micro-batches"""
+    
+    def __init__(self, journal: RunJournal, sheet_name: str, storage_manager=None, batch_size: int = None,
+                 interval: float = None, queue_size: int = None):
+        """
+        Initialize the Storage Sink
+        
+        Args:
+            journal: Run journal the results are recorded in
+            sheet_name: Google Sheets sheet name
+            storage_manager: Storage manager to save to. If not provided, one is created on first save
+            batch_size: Results per save. If not provided, uses config.FLUSH_BATCH_SIZE
+            interval: Seconds a result may wait for a full batch. If not provided, uses config.FLUSH_INTERVAL_SECONDS
+            queue_size: Results buffered before put() blocks. If not provided, uses config.PIPELINE_QUEUE_SIZE
+        """
+        self.journal = journal
+        self.sheet_name = sheet_name
+        self.storage_manager = storage_manager
+        self.batch_size = batch_size or config.FLUSH_BATCH_SIZE
+        self.interval = config.FLUSH_INTERVAL_SECONDS if interval is None else interval
+        self.failed = False
+        self.saved = 0
+        self._queue = queue.Queue(maxsize=queue_size or config.PIPELINE_QUEUE_SIZE)
+        # Anything a previous attempt checked but never stored is saved first
+        self._leftover = journal.pending_results()
+        self._thread = threading.Thread(target=profiling.propagated(self._run), name='rank-storage-sink', daemon=True)
+    
+    def start(self):
+        """Start the storage thread"""
+        self._thread.start()
+    
+    def put(self, result: RankResult):
+        """
+        Hand a journaled result to the storage thread
+        
+        Blocks while the queue is full, which pauses checking until storage catches up.
+        
+        Args:
+            result: Result already recorded in the journal
+        """
+        self._queue.put(result)
+    
+    def close(self):
+        """Save everything still queued and stop the storage thread"""
+        self._queue.put(_END_OF_RUN)
+        self._thread.join()
+    
+    def _run(self):
+        """Collect queued results and save them when the batch is full or its oldest result is too old"""
+        batch = list(self._leftover)
+        self._leftover = None
+        if batch:
+            self._save(batch)
+            batch = []
+        oldest = None
+        while True:
+            timeout = None if oldest is None else max(0.0, oldest + self.interval - time.monotonic())
+            try:
+                result = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                result = None
+            if result is _END_OF_RUN:
+                self._save(batch)
+                return
+            if result is not None:
+                batch.append(result)
+                if oldest is None:
+                    oldest = time.monotonic()
+            if batch and (len(batch) >= self.batch_size or time.monotonic() - oldest >= self.interval):
+                self._save(batch)
+                batch = []
+                oldest = None
+    
+    def _save(self, batch: List[RankResult]):
+        """Save one batch, in journal order, and mark it flushed"""
+        if not batch or self.failed:
+            return
+        try:
+            if self.storage_manager is None:
+                self.storage_manager = StorageManager()
+            save_results(self.storage_manager, batch, self.sheet_name)
+            self.journal.mark_flushed(len(batch))
+            self.saved += len(batch)
+        except Exception as e:
+            # Stop saving for this run; results stay in the journal for --resume
+            self.failed = True
+            print(f"❌ Error saving results: {e}")
+            print(f"Unsaved results are kept in run journal {self.journal.run_id}. "
+                  f"Re-run with --resume {self.journal.run_id} to save them.")
+
+
+# Marks the end of the results queue
+_END_OF_RUN = object()
+
+
+def _format_result(result: RankResult) -> str:
+    """One console line for a checked keyword"""
+    if result.status is RankStatus.ERROR:
+        return f"❌ {result.keyword}: Error - {result.error}"
+    if result.status is RankStatus.FOUND:
+        return f"✅ {result.keyword}: Position {result.position} - {result.found_url}"
+    return f"⚠️  {result.keyword}: {result.ranking_position} - Not found in top {result.max_results}"
+
+
+@profiling.profiled('run')
+def run_rank_tracking(url: str, keywords: Iterable[Union[str, KeywordRow]], location: str = "United States",
+                      sheet_name: str = "Rank Tracking", run_id: str = None, storage_manager=None,
+                      collect_results: bool = True):
     """
     Core function to run rank tracking (can be called directly or via CLI)
     
+    Checks run as a pipeline: keywords are checked (concurrently in adaptive
+    mode), each result is printed and recorded in a run journal as soon as it
+    is ready, and a storage thread saves journaled results in batches of
+    config.FLUSH_BATCH_SIZE, or sooner once a result has waited
+    config.FLUSH_INTERVAL_SECONDS. The queue between checking and storage holds
+    at most config.PIPELINE_QUEUE_SIZE results; when storage falls behind,
+    checking waits. An interrupted run can be resumed without re-checking
+    finished keywords.
+    
     Args:
-        url: Website URL to track
-        keywords: List of keywords to check
-        location: Search location
+        url: Website URL to track (default for rows without their own URL)
+        keywords: Keywords or KeywordRows to check; may be a lazy iterator,
+                  in which case checks start before it is exhausted
+        location: Search location (default for rows without their own location)
         sheet_name: Google Sheets sheet name
+        run_id: ID of a previous run to resume. A new run is started if not provided
+        storage_manager: Storage manager to save to. If not provided, one is created for config.STORAGE_TYPE
+        collect_results: Return the results checked in this run. Pass False for
+                         large keyword files to keep memory use constant
         
     Returns:
-        List of ranking result dictionaries
+        List of ranking results checked in this run (empty if collect_results is False)
     """
+    started = time.perf_counter()
+    try:
+        results, checked = _run_rank_tracking(url, keywords, location, sheet_name, run_id, storage_manager,
+                                              collect_results)
+    except Exception:
+        metrics.RUNS.labels('error').inc()
+        raise
+    
+    metrics.RUNS.labels('completed' if checked else 'empty').inc()
+    metrics.RUN_SECONDS.observe(time.perf_counter() - started)
+    metrics.RUN_KEYWORDS.inc(checked)
+    metrics.LAST_RUN_TIMESTAMP.set(time.time())
+    return results
+
+
+def _run_rank_tracking(url: str, keywords: Iterable[Union[str, KeywordRow]], location: str, sheet_name: str,
+                       run_id: Optional[str], storage_manager, collect_results: bool) -> Tuple[List[RankResult], int]:
+    """Run rank tracking (see run_rank_tracking); returns (collected results, keywords checked)"""
+    journal = RunJournal(run_id)
+    resuming = journal.exists()
+    if run_id and not resuming:
+        print(f"No journal found for run {run_id}, starting it as a new run")
+    if journal.complete:
+        print(f"Run {journal.run_id} already completed on {journal.finished_on}; nothing left to check or save")
+        return [], 0
+    
     print(f"\n{'='*60}")
     print("Google Rank Tracking System")
     print(f"{'='*60}")
+    print(f"Run ID: {journal.run_id}{' (resumed)' if resuming else ''}")
+    if journal.stopped_reason:
+        print(f"Previous attempt stopped: {journal.stopped_reason}")
     print(f"Website URL: {url}")
-    print(f"Keywords to check: {len(keywords)}")
+    if hasattr(keywords, '__len__'):
+        print(f"Keywords to check: {len(keywords)}")
+    else:
+        print("Keywords to check: streaming from file")
     print(f"Location: {location}")
     print(f"{'='*60}\n")
     
+    journal.start(url, location, sheet_name)
+    skipped = 0
+    read = 0
+    load_error = None
+    
+    def remaining_rows() -> Iterator[KeywordRow]:
+        nonlocal skipped, read, load_error
+        try:
+            for row in _to_check_rows(keywords, url, location):
+                read += 1
+                if journal.is_done(row.keyword, row.url, row.location):
+                    skipped += 1
+                    continue
+                yield row
+        except (UnicodeDecodeError, csv.Error) as e:
+            # The rest of the file is unreadable: finish and save the keywords read so far
+            load_error = e
+    
     # Initialize rank checker
     try:
         rank_checker = RankChecker()
     except ValueError as e:
         print(f"Error: {e}")
-        return []
-    
-    # Check rankings
-    print("Starting rank checks...\n")
-    results = rank_checker.check_multiple_keywords(
-        keywords, 
-        url, 
-        location
-    )
-    
-    # Display results
-    print(f"\n{'='*60}")
-    print("Ranking Results:")
-    print(f"{'='*60}")
-    for result in results:
-        pos = result['ranking_position']
-        keyword = result['keyword']
-        found_url = result['found_url']
-        
-        if result.get('error'):
-            print(f"❌ {keyword}: Error - {result['error']}")
-        elif isinstance(pos, int) or (isinstance(pos, str) and not pos.startswith('>')):
-            print(f"✅ {keyword}: Position {pos} - {found_url}")
-        else:
-            print(f"⚠️  {keyword}: {pos} - Not found in top 100")
+        return [], 0
     
-    # Save results to storage
-    print(f"\n{'='*60}")
     if config.STORAGE_TYPE == 'docs':
-        print("Saving results to Google Docs...")
+        print("Results are saved to Google Docs as they are checked")
     else:
-        print("Saving results to Google Sheets...")
-    print(f"{'='*60}")
+        print("Results are saved to Google Sheets as they are checked")
+    sink = _StorageSink(journal, sheet_name, storage_manager=storage_manager)
+    sink.start()
     
+    results = []
+    counts = {status: 0 for status in RankStatus}
     try:
-        storage_manager = StorageManager()
-        if config.STORAGE_TYPE == 'docs':
-            storage_manager.append_results(results)
-        else:
-            storage_manager.append_results(results, sheet_name)
-        print("✅ Results saved successfully!")
-    except Exception as e:
-        print(f"❌ Error saving results: {e}")
+        # Check rankings
+        print("Starting rank checks...\n")
+        for row, result in rank_checker.iter_rankings(remaining_rows()):
+            journal.record_result(result, row.location)
+            print(_format_result(result))
+            counts[result.status] += 1
+            if collect_results:
+                results.append(result)
+            sink.put(result)
+    finally:
+        # Save whatever was checked, also when the run is interrupted
+        sink.close()
+    
+    if resuming:
+        print(f"\nSkipped {skipped} keywords already checked in this run")
+    
+    print(f"\n{'='*60}")
+    print(f"Checked {sum(counts.values())} keywords: {counts[RankStatus.FOUND]} found, "
+          f"{counts[RankStatus.NOT_FOUND]} not found, {counts[RankStatus.ERROR]} errors")
+    if load_error is not None:
+        journal.mark_stopped(f"keyword file unreadable after {read} keywords ({load_error})")
+        print(f"❌ Could not read the keyword file after {read} keywords: {load_error}")
+        print(f"Fix the file and re-run with --resume {journal.run_id} to check the remaining keywords.")
+    if not journal.pending_results():
+        if load_error is None:
+            journal.mark_complete()
+        print(f"✅ {sink.saved} results saved successfully!")
+    else:
         print("Results are still available in the console output above.")
     
     print(f"\n{'='*60}")
-    print("Rank tracking completed!")
+    print(f"Rank tracking completed! (run {journal.run_id})")
     print(f"{'='*60}\n")
     
+    return results, sum(counts.values())
+
+
+def enqueue_rank_tracking(url: str, keywords: Iterable[Union[str, KeywordRow]], location: str = "United States",
+                          sheet_name: str = "Rank Tracking", source: str = 'cli', queue: WorkQueue = None) -> Optional[str]:
+    """
+    Enqueue a rank tracking job for rank_worker.py processes instead of checking in this process
+    
+    Args:
+        url: Website URL to track (default for rows without their own URL)
+        keywords: Keywords or KeywordRows to check
+        location: Search location (default for rows without their own location)
+        sheet_name: Google Sheets sheet name
+        source: Who enqueued the job (cli, scheduler, web)
+        queue: Work queue to use. If not provided, uses config.WORK_QUEUE_DB
+        
+    Returns:
+        Job ID, or None if there were no keywords
+    """
+    queue = queue or WorkQueue()
+    job_id = queue.enqueue(_to_check_rows(keywords, url, location), sheet_name, source)
+    if job_id:
+        status = queue.job_status(job_id)
+        print(f"Queued job {job_id} ({status['tasks']} keyword checks) in {queue.path}")
+    return job_id
+
+
+def wait_for_job(job_id: str, queue: WorkQueue = None) -> List[RankResult]:
+    """
+    Wait for a queued job to finish and print its results
+    
+    Args:
+        job_id: Job ID returned by enqueue_rank_tracking
+        queue: Work queue to use. If not provided, uses config.WORK_QUEUE_DB
+        
+    Returns:
+        List of RankResults
+    """
+    queue = queue or WorkQueue()
+    print(f"Waiting for workers to finish job {job_id}...")
+    queue.wait(job_id)
+    results = queue.job_results(job_id)
+    for result in results:
+        if result.status is RankStatus.ERROR:
+            print(f"❌ {result.keyword} ({result.website_url}): Error - {result.error}")
+        elif result.status is RankStatus.FOUND:
+            print(f"✅ {result.keyword} ({result.website_url}): Position {result.position} - {result.found_url}")
+        else:
+            print(f"⚠️  {result.keyword} ({result.website_url}): Not found in top {result.max_results}")
+    print("Results are saved to storage by the worker that finishes the job.")
     return results
 
 
@@ -139,11 +413,17 @@ Examples:
   # Multiple keywords
   python main.py -u https://www.example.com -k "AI software" "best AI companies"
   
-  # From CSV file
+  # From CSV file (columns: keyword[, url, location, depth]; may be .csv.gz)
   python main.py -u https://www.example.com -f keywords.csv
   
   # Custom location
   python main.py -u https://www.example.com -k "AI tools" --location "United Kingdom"
+  
+  # Resume an interrupted run (skips keywords that were already checked)
+  python main.py -u https://www.example.com -f keywords.csv --resume 20240101-090000-3fa2c1
+  
+  # Hand the checks to rank_worker.py processes and wait for them
+  python main.py -u https://www.example.com -f keywords.csv --queue --wait
         """
     )
     
@@ -152,29 +432,74 @@ Examples:
     parser.add_argument('-k', '--keywords', nargs='+',
                        help='One or more keywords to check')
     parser.add_argument('-f', '--file',
-                       help='CSV file containing keywords (one per line)')
+                       help='CSV file (optionally gzip-compressed) with a keyword per row and optional '
+                            'url, location and depth columns')
     parser.add_argument('--location', default='United States',
                        help='Search location (default: United States)')
     parser.add_argument('--sheet-name', default='Rank Tracking',
                        help='Google Sheets sheet name (default: Rank Tracking)')
+    parser.add_argument('--resume', metavar='RUN_ID',
+                       help='Resume an interrupted run, skipping keywords it already checked')
+    parser.add_argument('--queue', action='store_true',
+                       help='Enqueue the checks for rank_worker.py processes instead of running them here')
+    parser.add_argument('--wait', action='store_true',
+                       help='With --queue, wait for the job to finish and print its results')
+    parser.add_argument('--profile', choices=profiling.PROFILE_MODES,
+                       help='Profile the run (cprofile: .prof for pstats/snakeviz, sampling: pyinstrument html/speedscope)')
+    parser.add_argument('--profile-threshold-ms', type=float, default=0,
+                       help='Only write the profile if the run takes longer than this (default: 0)')
     
     args = parser.parse_args()
     
+    if args.queue and args.resume:
+        print("Error: --resume cannot be combined with --queue (queued jobs are retried by the workers)")
+        sys.exit(1)
+    
     # Get keywords
-    keywords = []
+    stats = None
     if args.file:
-        keywords = load_keywords_from_csv(args.file)
-        if not keywords:
+        if not os.path.exists(args.file):
+            print(f"Error: CSV file not found: {args.file}")
+            sys.exit(1)
+        # Stream rows so checks start before a large file is fully read
+        stats = LoadStats()
+        keywords = iter_keyword_rows(args.file, stats)
+        # Read the first row up front so an empty file exits before a run or job is created
+        first = next(keywords, None)
+        if first is None:
+            report_load_stats(stats)
             print("No keywords found in CSV file")
             sys.exit(1)
+        keywords = itertools.chain([first], keywords)
     elif args.keywords:
         keywords = args.keywords
     else:
         print("Error: Either --keywords or --file must be provided")
         sys.exit(1)
     
+    if args.profile:
+        profiling.configure(args.profile, args.profile_threshold_ms)
+    
     # Run rank tracking
-    run_rank_tracking(args.url, keywords, args.location, args.sheet_name)
+    if args.queue:
+        try:
+            job_id = enqueue_rank_tracking(args.url, keywords, args.location, args.sheet_name)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Rows are all read before the job is written, so nothing was queued
+            report_load_stats(stats)
+            print(f"Error reading CSV file: {e}. Nothing was queued.")
+            sys.exit(1)
+        if job_id and args.wait:
+            wait_for_job(job_id)
+    else:
+        with profiling.session('run'):
+            run_rank_tracking(args.url, keywords, args.location, args.sheet_name, run_id=args.resume,
+                              collect_results=False)
+    
+    if stats is not None:
+        report_load_stats(stats)
+        if stats.failed_row:
+            sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,84 @@
+"""
+Memory Storage Module
+In-process stand-in for GoogleDocsManager/GoogleSheetsManager, used by benchmarks and load tests
+"""
+import time
+import threading
+from typing import List, Dict
+from metrics import instrument_storage
+from latest_ranks import maintains_latest
+from rank_series import maintains_series
+from delta_storage import delta_decoded, delta_encoded
+
+HEADERS = ['Keyword', 'Website URL', 'Ranking Position', 'Found URL',
+           'Checked On', 'SERP Title', 'SERP Snippet', 'Notes']
+
+
+class MemoryStorageManager:
+    """Keeps ranking rows in memory with the same interface as the Google storage managers"""
+
+    BACKEND = 'memory'
+
+    def __init__(self, append_latency_ms: float = 0.0, read_latency_ms: float = 0.0):
+        """
+        Initialize Memory Storage Manager
+
+        Args:
+            append_latency_ms: Simulated latency of each append call
+            read_latency_ms: Simulated latency of each read call
+        """
+        self.append_latency_ms = append_latency_ms
+        self.read_latency_ms = read_latency_ms
+        self.rows = [list(HEADERS)]
+        self.append_calls = 0
+        self._lock = threading.Lock()
+
+    @maintains_latest
+    @maintains_series
+    @delta_encoded
+    @instrument_storage('append')
+    def append_results(self, results: List[Dict], sheet_name: str = None):
+        """
+        Append ranking results
+
+        Args:
+            results: List of ranking results
+            sheet_name: Not used (kept for compatibility)
+        """
+        if not results:
+            return
+        if self.append_latency_ms:
+            time.sleep(self.append_latency_ms / 1000)
+
+        rows = []
+        for result in results:
+            rows.append([
+                result.get('keyword', ''),
+                result.get('website_url', ''),
+                str(result.get('ranking_position', '')),
+                result.get('found_url', '') or '',
+                result.get('checked_on', ''),
+                result.get('serp_title', '') or '',
+                result.get('serp_snippet', '') or '',
+                result.get('error', '') or ''
+            ])
+        with self._lock:
+            self.rows.extend(rows)
+            self.append_calls += 1
+
+    @delta_decoded
+    @instrument_storage('read')
+    def get_all_results(self, sheet_name: str = None) -> List[List]:
+        """
+        Get all stored rows (header row first)
+
+        Args:
+            sheet_name: Not used (kept for compatibility)
+
+        Returns:
+            List of rows
+        """
+        if self.read_latency_ms:
+            time.sleep(self.read_latency_ms / 1000)
+        with self._lock:
+            return list(self.rows)
@@ -0,0 +1,183 @@
+"""
+Metrics Module
+Prometheus counters and histograms for rank checks, storage calls and web requests
+"""
+import time
+import functools
+from typing import Callable
+
+try:
+    from prometheus_client import (Counter, Gauge, Histogram, CONTENT_TYPE_LATEST,
+                                   generate_latest, start_http_server)
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is not installed"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def track_inprogress(self):
+        return _NoopContext()
+
+    def time(self):
+        return _NoopContext()
+
+
+class _NoopContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if not METRICS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def generate_latest(*args, **kwargs) -> bytes:
+        return b'# prometheus_client is not installed\n'
+
+    def start_http_server(*args, **kwargs):
+        print("Warning: prometheus_client is not installed; metrics server not started")
+
+
+# Latency buckets (seconds) sized for SerpAPI and Google API round trips
+API_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+REQUEST_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 120, 300)
+
+# Rank checking (RankChecker)
+SERP_PAGE_SECONDS = Histogram(
+    'rank_serp_page_seconds', 'SerpAPI HTTP latency per result page', buckets=API_BUCKETS)
+SERP_PAGES_PER_KEYWORD = Histogram(
+    'rank_serp_pages_per_keyword', 'Result pages fetched per keyword check', buckets=(1, 2, 3, 4, 5, 6, 8, 10, 11))
+KEYWORD_CHECK_SECONDS = Histogram(
+    'rank_keyword_check_seconds', 'Wall time of one keyword check', buckets=REQUEST_BUCKETS)
+KEYWORD_CHECKS = Counter(
+    'rank_keyword_checks_total', 'Completed keyword checks by outcome', ['status'])
+CHECK_ERRORS = Counter(
+    'rank_check_errors_total', 'Failed SerpAPI calls by error type', ['type'])
+SERP_CONCURRENCY_WINDOW = Gauge(
+    'rank_serp_concurrency_window', 'Adaptive limit on concurrent SerpAPI calls (AIMD window)')
+SERP_INFLIGHT = Gauge(
+    'rank_serp_inflight_calls', 'SerpAPI calls currently in flight under the adaptive limiter')
+SERP_QUEUED_CALLS = Gauge(
+    'rank_serp_queued_calls', 'SerpAPI calls waiting for a slot in the adaptive limiter', ['priority'])
+SERP_CONGESTION_EVENTS = Counter(
+    'rank_serp_congestion_events_total', 'Adaptive window cuts by cause', ['reason'])
+SERP_RETRIES = Counter(
+    'rank_serp_retries_total', 'SerpAPI calls retried after throttling or server errors')
+SERP_PREFETCH_WASTED = Counter(
+    'rank_serp_prefetch_wasted_pages_total', 'Prefetched result pages fetched but not needed')
+SERP_KEY_CALLS = Counter(
+    'rank_serp_key_calls_total', 'SerpAPI calls per key (position in the pool and last 4 characters)', ['key'])
+SERP_KEY_ERRORS = Counter(
+    'rank_serp_key_errors_total', 'SerpAPI calls rejected per key by cause', ['key', 'reason'])
+SERP_KEY_RETIREMENTS = Counter(
+    'rank_serp_key_retirements_total', 'SerpAPI keys retired after auth or quota errors', ['key', 'reason'])
+SERP_KEY_HEADROOM = Gauge(
+    'rank_serp_key_headroom', 'Calls a SerpAPI key can still take under its hourly limit and quota', ['key'])
+
+# Storage managers
+STORAGE_SECONDS = Histogram(
+    'rank_storage_operation_seconds', 'Storage call latency', ['backend', 'operation'], buckets=API_BUCKETS)
+STORAGE_BYTES = Counter(
+    'rank_storage_bytes_total', 'Approximate bytes written or read by storage calls', ['backend', 'operation'])
+STORAGE_ERRORS = Counter(
+    'rank_storage_errors_total', 'Failed storage calls', ['backend', 'operation'])
+
+# Web app
+HTTP_REQUEST_SECONDS = Histogram(
+    'rank_http_request_seconds', 'Flask request duration', ['endpoint', 'method', 'status'], buckets=REQUEST_BUCKETS)
+INFLIGHT_CHECKS = Gauge(
+    'rank_inflight_checks', 'Rank check requests currently being processed')
+
+# Scheduled and CLI runs
+RUNS = Counter(
+    'rank_runs_total', 'Rank tracking runs by outcome', ['outcome'])
+RUN_SECONDS = Histogram(
+    'rank_run_seconds', 'Duration of a rank tracking run', buckets=(1, 10, 30, 60, 300, 900, 1800, 3600, 7200, 14400))
+RUN_KEYWORDS = Counter(
+    'rank_run_keywords_total', 'Keywords checked by rank tracking runs')
+LAST_RUN_TIMESTAMP = Gauge(
+    'rank_last_run_timestamp_seconds', 'Unix time the last rank tracking run finished')
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Map a request exception to a low-cardinality error type label
+
+    Args:
+        error: Exception raised by an outbound call
+
+    Returns:
+        Error type (timeout, connection, http_<status>, or the exception class name)
+    """
+    import requests
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return 'connection'
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return f"http_{error.response.status_code}"
+    return type(error).__name__
+
+
+def _payload_bytes(value) -> int:
+    """Approximate the text size of results or rows"""
+    if not value:
+        return 0
+    total = 0
+    for item in value:
+        cells = item.values() if hasattr(item, 'values') else item
+        total += sum(len(str(cell)) for cell in cells if cell is not None)
+    return total
+
+
+def instrument_storage(operation: str) -> Callable:
+    """
+    Decorator timing a storage manager method and counting its payload bytes
+
+    The backend label comes from the manager's BACKEND class attribute. For
+    'append' the first argument (results) is measured; for 'read' the return value.
+
+    Args:
+        operation: 'append' or 'read'
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            backend = getattr(self, 'BACKEND', type(self).__name__)
+            started = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                STORAGE_ERRORS.labels(backend, operation).inc()
+                raise
+            finally:
+                STORAGE_SECONDS.labels(backend, operation).observe(time.perf_counter() - started)
+
+            payload = args[0] if operation == 'append' and args else result
+            STORAGE_BYTES.labels(backend, operation).inc(_payload_bytes(payload))
+            return result
+        return wrapper
+    return decorator
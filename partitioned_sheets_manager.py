@@ -0,0 +1,389 @@
+"""
+Partitioned Google Sheets Manager Module
+One sheet per website plus a directory sheet, so per-site history reads fetch
+only that site's rows and a multi-site append is a single API call
+"""
+import sys
+import time
+import random
+import argparse
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from googleapiclient.errors import HttpError
+from google_sheets_manager import GoogleSheetsManager
+from metrics import instrument_storage
+from latest_ranks import maintains_latest
+from rank_series import maintains_series
+from delta_storage import delta_decoded, delta_encoded
+from profiling import profiled
+import config
+
+HEADERS = ['Keyword', 'Website URL', 'Ranking Position', 'Found URL',
+           'Checked On', 'SERP Title', 'SERP Snippet', 'Notes']
+
+DIRECTORY_HEADERS = ['Website URL', 'Sheet', 'Sheet ID', 'Created On']
+
+# Single sheet used before partitioning; its rows are copied into partitions once
+LEGACY_SHEET = 'Rank Tracking'
+
+# Rows per API call when copying the legacy sheet into partitions
+MIGRATION_BATCH_ROWS = 5000
+
+# Directory header cells E1:F1 record how many legacy rows were copied, so an interrupted
+# copy resumes where it stopped; F1 reads MIGRATION_DONE once every row is copied
+MIGRATION_LABEL = 'Legacy Rows Copied'
+MIGRATION_DONE = 'done'
+
+# Characters Google Sheets does not allow in sheet titles
+_INVALID_TITLE_CHARS = str.maketrans({char: '-' for char in '[]*?/\\:'})
+
+
+def _a1(title: str, cells: str) -> str:
+    """Build an A1 range for a sheet title that may contain spaces or quotes"""
+    return "'{}'!{}".format(title.replace("'", "''"), cells)
+
+
+def _cells(row: List[str]) -> Dict:
+    """Convert a row of strings to an appendCells RowData (stored as-is, like valueInputOption=RAW)"""
+    return {'values': [{'userEnteredValue': {'stringValue': value}} for value in row]}
+
+
+def _result_row(result: Dict) -> List[str]:
+    """Convert a ranking result dictionary to a sheet row"""
+    return [
+        result.get('keyword', ''),
+        result.get('website_url', ''),
+        str(result.get('ranking_position', '')),
+        result.get('found_url', '') or '',
+        result.get('checked_on', ''),
+        result.get('serp_title', '') or '',
+        result.get('serp_snippet', '') or '',
+        result.get('error', '') or ''
+    ]
+
+
+class PartitionedSheetsManager(GoogleSheetsManager):
+    """Google Sheets storage with one sheet per website, listed in a directory sheet"""
+
+    def __init__(self, credentials_file: str = None, spreadsheet_id: str = None, directory_sheet: str = None):
+        """
+        Initialize Partitioned Google Sheets Manager
+
+        Args:
+            credentials_file: Path to Google OAuth credentials JSON file
+            spreadsheet_id: Google Sheets spreadsheet ID
+            directory_sheet: Name of the sheet mapping websites to partitions.
+                             If not provided, uses config.SHEETS_DIRECTORY_SHEET
+        """
+        super().__init__(credentials_file, spreadsheet_id)
+        self.directory_sheet = directory_sheet or config.SHEETS_DIRECTORY_SHEET
+        # website URL -> (sheet title, sheet ID), loaded on first use
+        self._partitions: Optional[Dict[str, Tuple[str, int]]] = None
+        self._titles = set()
+        self._directory_id = None
+        # Legacy rows copied so far while a copy is pending, else None
+        self._legacy_copied: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Load the directory, then finish copying the legacy sheet if that is still pending"""
+        self._load_directory()
+        if self._legacy_copied is not None:
+            try:
+                self._migrate_legacy(self._legacy_copied)
+            except BaseException:
+                # Not usable until the copy is complete: the next use reloads and resumes it
+                self._partitions = None
+                raise
+
+    def _load_directory(self):
+        """Read the sheet list and directory, creating the directory on first use"""
+        spreadsheet = self.service.spreadsheets().get(
+            spreadsheetId=self.spreadsheet_id,
+            fields='sheets.properties(sheetId,title)'
+        ).execute()
+        sheets = {sheet['properties']['title']: sheet['properties']['sheetId']
+                  for sheet in spreadsheet.get('sheets', [])}
+        self._titles = set(sheets)
+
+        if self.directory_sheet not in sheets:
+            self._partitions = {}
+            self._create_directory(migrate=LEGACY_SHEET in sheets)
+            return
+
+        self._directory_id = sheets[self.directory_sheet]
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=_a1(self.directory_sheet, 'A1:F')
+        ).execute()
+        values = result.get('values', [])
+        header = values[0] if values else []
+        self._legacy_copied = None
+        if len(header) > 5 and header[4] == MIGRATION_LABEL and header[5] != MIGRATION_DONE:
+            self._legacy_copied = int(header[5] or 0)
+        self._partitions = {}
+        for row in values[1:]:
+            if len(row) >= 3 and row[1] in sheets:
+                self._partitions.setdefault(row[0], (row[1], sheets[row[1]]))
+
+    def _create_directory(self, migrate: bool = False):
+        """
+        Add the directory sheet with its header row
+
+        Args:
+            migrate: Whether the legacy sheet still has to be copied (recorded in the header row)
+        """
+        sheet_id = random.randrange(1, 2 ** 31)
+        header = DIRECTORY_HEADERS + ([MIGRATION_LABEL, '0'] if migrate else [])
+        self.service.spreadsheets().batchUpdate(
+            spreadsheetId=self.spreadsheet_id,
+            body={'requests': [
+                {'addSheet': {'properties': {'title': self.directory_sheet, 'sheetId': sheet_id}}},
+                {'appendCells': {'sheetId': sheet_id, 'rows': [_cells(header)],
+                                 'fields': 'userEnteredValue'}}
+            ]}
+        ).execute()
+        self._titles.add(self.directory_sheet)
+        self._directory_id = sheet_id
+        self._legacy_copied = 0 if migrate else None
+        print(f"Created directory sheet: {self.directory_sheet}")
+
+    def _migration_mark(self, copied: str) -> Dict:
+        """Request recording the legacy rows copied so far in the directory header"""
+        return {'updateCells': {
+            'range': {'sheetId': self._directory_id, 'startRowIndex': 0, 'endRowIndex': 1,
+                      'startColumnIndex': len(DIRECTORY_HEADERS), 'endColumnIndex': len(DIRECTORY_HEADERS) + 2},
+            'rows': [_cells([MIGRATION_LABEL, copied])],
+            'fields': 'userEnteredValue'
+        }}
+
+    def _migrate_legacy(self, copied: int = 0):
+        """
+        Copy the rows of the single legacy sheet into per-website partitions (left in place, no longer read)
+
+        Each batch is appended in the same atomic batchUpdate that advances the
+        watermark in the directory header, so a copy interrupted by an error or
+        quota limit resumes after the last copied batch, without duplicates.
+
+        Args:
+            copied: Legacy rows already copied
+        """
+        # Raw values: stored rows are copied as they are, never expanded (see delta_storage)
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=_a1(LEGACY_SHEET, 'A2:H')
+        ).execute()
+        rows = [row + [''] * (len(HEADERS) - len(row)) for row in result.get('values', []) if len(row) >= 2]
+        if copied >= len(rows):
+            self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': [self._migration_mark(MIGRATION_DONE)]}
+            ).execute()
+        for start in range(copied, len(rows), MIGRATION_BATCH_ROWS):
+            batch = rows[start:start + MIGRATION_BATCH_ROWS]
+            end = start + len(batch)
+            self._append_rows([(row[1], row) for row in batch],
+                              [self._migration_mark(str(end) if end < len(rows) else MIGRATION_DONE)])
+            self._legacy_copied = end
+        self._legacy_copied = None
+        if len(rows) > copied:
+            print(f"Copied {len(rows) - copied} rows from '{LEGACY_SHEET}' into per-website sheets")
+
+    def _partition_title(self, website_url: str) -> str:
+        """Derive a unique, valid sheet title for a website"""
+        parsed = urlparse(website_url if '://' in website_url else f"https://{website_url}")
+        base = (parsed.netloc + parsed.path.rstrip('/')) or website_url or 'unknown'
+        base = base.translate(_INVALID_TITLE_CHARS).strip("'")[:90]
+        title, suffix = base, 2
+        while title in self._titles:
+            title = f"{base} ({suffix})"
+            suffix += 1
+        return title
+
+    def _append_rows(self, rows: List[Tuple[str, List[str]]], extra_requests: List[Dict] = None):
+        """
+        Append rows to their websites' partitions in one atomic spreadsheets.batchUpdate
+
+        Missing partitions are created (sheet, header row and directory entry) in the
+        same call. If a concurrent writer created one first, the call fails as a whole
+        and is retried once against the refreshed directory.
+
+        Args:
+            rows: (website URL, row) pairs
+            extra_requests: Requests applied in the same call (e.g. the migration watermark)
+        """
+        groups: Dict[str, List[List[str]]] = {}
+        for website_url, row in rows:
+            groups.setdefault(website_url, []).append(row)
+
+        for attempt in range(2):
+            if self._partitions is None:
+                self._load()
+            elif attempt and any(url not in self._partitions for url in groups):
+                self._load_directory()
+
+            requests, created = [], {}
+            for website_url in groups:
+                if website_url in self._partitions:
+                    continue
+                title = self._partition_title(website_url)
+                sheet_id = random.randrange(1, 2 ** 31)
+                created[website_url] = (title, sheet_id)
+                self._titles.add(title)
+                requests.append({'addSheet': {'properties': {'title': title, 'sheetId': sheet_id}}})
+                requests.append({'appendCells': {'sheetId': sheet_id, 'rows': [_cells(HEADERS)],
+                                                 'fields': 'userEnteredValue'}})
+            if created:
+                requests.append({'appendCells': {
+                    'sheetId': self._directory_id,
+                    'rows': [_cells([url, title, str(sheet_id), time.strftime('%Y-%m-%d %H:%M:%S')])
+                             for url, (title, sheet_id) in created.items()],
+                    'fields': 'userEnteredValue'
+                }})
+
+            partitions = {**self._partitions, **created}
+            for website_url, group in groups.items():
+                requests.append({'appendCells': {'sheetId': partitions[website_url][1],
+                                                 'rows': [_cells(row) for row in group],
+                                                 'fields': 'userEnteredValue'}})
+            requests.extend(extra_requests or [])
+
+            try:
+                self.service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'requests': requests}
+                ).execute()
+            except HttpError:
+                self._titles.difference_update(title for title, _ in created.values())
+                if not created or attempt:
+                    raise
+                continue
+
+            self._partitions.update(created)
+            for title, _ in created.values():
+                print(f"Created new sheet: {title}")
+            return
+
+    @maintains_latest
+    @maintains_series
+    @delta_encoded
+    @instrument_storage('append')
+    @profiled()
+    def append_results(self, results: List[Dict], sheet_name: str = LEGACY_SHEET):
+        """
+        Append ranking results to their websites' sheets
+
+        Args:
+            results: List of ranking result dictionaries
+            sheet_name: Not used (each website has its own sheet)
+        """
+        if not results:
+            return
+
+        try:
+            with self._lock:
+                self._append_rows([(result.get('website_url', ''), _result_row(result)) for result in results])
+            sites = len({result.get('website_url', '') for result in results})
+            print(f"Successfully appended {len(results)} results to {sites} website sheet(s)")
+        except HttpError as error:
+            print(f"Error appending results: {error}")
+            raise
+
+    def _partition_ranges(self, website_url: str = None) -> List[str]:
+        """A1 ranges of all partitions, or of one website's partition"""
+        with self._lock:
+            if self._partitions is None or (website_url and website_url not in self._partitions):
+                self._load()
+            titles = [title for url, (title, _) in self._partitions.items()
+                      if website_url is None or url == website_url]
+        return [_a1(title, 'A2:H') for title in titles]
+
+    def _read_ranges(self, ranges: List[str]) -> List[List]:
+        """Read several partitions in one values.batchGet, under one header row"""
+        rows = [list(HEADERS)]
+        if not ranges:
+            return rows
+        result = self.service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id,
+            ranges=ranges
+        ).execute()
+        for value_range in result.get('valueRanges', []):
+            rows.extend(value_range.get('values', []))
+        return rows
+
+    @delta_decoded
+    @instrument_storage('read')
+    @profiled()
+    def get_all_results(self, sheet_name: str = LEGACY_SHEET) -> List[List]:
+        """
+        Get all results from every website's sheet
+
+        Args:
+            sheet_name: Not used (each website has its own sheet)
+
+        Returns:
+            List of rows (one header row first)
+        """
+        try:
+            return self._read_ranges(self._partition_ranges())
+        except HttpError as error:
+            print(f"Error reading results: {error}")
+            return []
+
+    @delta_decoded
+    @instrument_storage('read')
+    @profiled()
+    def get_website_results(self, website_url: str) -> List[List]:
+        """
+        Get the results of one website, reading only its sheet
+
+        Args:
+            website_url: Website URL as stored with its results
+
+        Returns:
+            List of rows (one header row first)
+        """
+        try:
+            return self._read_ranges(self._partition_ranges(website_url))
+        except HttpError as error:
+            print(f"Error reading results: {error}")
+            return []
+
+    def websites(self) -> Dict[str, str]:
+        """Return the directory as {website URL: sheet title}"""
+        with self._lock:
+            self._load()
+            return {url: title for url, (title, _) in self._partitions.items()}
+
+
+def main():
+    """Show the per-website sheet directory via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Per-website Google Sheets partitions (SHEETS_PARTITIONING=website)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # List tracked websites and their sheets (creates the directory and migrates
+  # the "Rank Tracking" sheet on first use)
+  python partitioned_sheets_manager.py
+        """
+    )
+    parser.parse_args()
+
+    try:
+        manager = PartitionedSheetsManager()
+        websites = manager.websites()
+    except (ValueError, FileNotFoundError, HttpError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if not websites:
+        print("No website sheets yet. Run a rank check to create them.")
+        return
+    for website_url, title in sorted(websites.items()):
+        print(f"{website_url}  ->  {title}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Priority Lanes Module
+Priority classes and weighted fair sharing of SerpAPI capacity: interactive checks go
+ahead of batch work, and within a class each tenant (tracked website) gets a share of
+calls proportional to its weight, so one large campaign cannot starve the others
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+import config
+
+# Priority classes, highest first
+PRIORITY_CLASSES = ('interactive', 'batch')
+
+# Work started by these sources is interactive; everything else (cli, scheduler) is batch
+INTERACTIVE_SOURCES = frozenset({'web'})
+
+_weights: Dict[str, float] = {}
+_weights_spec: Optional[str] = None
+_weights_lock = threading.Lock()
+
+
+def priority_rank(priority: Optional[str]) -> int:
+    """
+    Return the rank of a priority class (0 is served first)
+
+    Args:
+        priority: Class name from PRIORITY_CLASSES; None or unknown names are batch
+
+    Returns:
+        Index in PRIORITY_CLASSES
+    """
+    try:
+        return PRIORITY_CLASSES.index(priority)
+    except ValueError:
+        return PRIORITY_CLASSES.index('batch')
+
+
+def priority_for_source(source: str) -> str:
+    """Return the priority class of work started by a source (cli, scheduler, web)"""
+    return 'interactive' if source in INTERACTIVE_SOURCES else 'batch'
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """
+    Parse a 'tenant=weight,tenant=weight' list
+
+    Args:
+        spec: Comma-separated assignments; malformed entries are ignored
+
+    Returns:
+        Dictionary of tenant to positive weight
+    """
+    weights = {}
+    for entry in (spec or '').split(','):
+        tenant, _, weight = entry.strip().rpartition('=')
+        try:
+            value = float(weight)
+        except ValueError:
+            continue
+        if tenant and value > 0:
+            weights[tenant.strip()] = value
+    return weights
+
+
+def tenant_weight(tenant: str) -> float:
+    """Return a tenant's share weight from config.TENANT_WEIGHTS (default 1)"""
+    global _weights, _weights_spec
+    with _weights_lock:
+        if _weights_spec != config.TENANT_WEIGHTS:
+            _weights = parse_weights(config.TENANT_WEIGHTS)
+            _weights_spec = config.TENANT_WEIGHTS
+        return _weights.get(tenant, 1.0)
+
+
+class FairShare:
+    """
+    Start-time fair queuing tags per (priority rank, tenant)
+
+    Each grant to a tenant advances its finish tag by 1 / weight. The next grant in
+    a class goes to the tenant with the smallest start tag: its finish tag, or the
+    class clock (start tag of the last grant) if it was idle, so a tenant returning
+    from idleness gets its share from now on instead of a burst to catch up.
+    Callers serialize access.
+    """
+
+    def __init__(self, finish: Dict[Tuple[int, str], float] = None, clock: Dict[int, float] = None):
+        """
+        Initialize the Fair Share tags
+
+        Args:
+            finish: Finish tag per (rank, tenant), e.g. loaded from a database
+            clock: Clock per rank
+        """
+        self.finish: Dict[Tuple[int, str], float] = dict(finish or {})
+        self.clock: Dict[int, float] = dict(clock or {})
+
+    def start_tag(self, rank: int, tenant: str) -> float:
+        """Return the start tag the tenant's next grant would get"""
+        return max(self.finish.get((rank, tenant), 0.0), self.clock.get(rank, 0.0))
+
+    def pick(self, candidates: Iterable[Tuple[int, str, int]]) -> Optional[Tuple[int, str, int]]:
+        """
+        Choose the next grant
+
+        Args:
+            candidates: (rank, tenant, order) entries; order breaks ties (e.g. arrival or task id)
+
+        Returns:
+            Highest-priority candidate with the smallest start tag, or None if there are none
+        """
+        return min(candidates, key=lambda candidate: (candidate[0], self.start_tag(candidate[0], candidate[1]),
+                                                      candidate[2]), default=None)
+
+    def charge(self, rank: int, tenant: str, cost: float = 1.0) -> Tuple[float, float]:
+        """
+        Record a grant
+
+        Args:
+            rank: Priority rank
+            tenant: Tenant the grant went to
+            cost: Units of work granted
+
+        Returns:
+            (new class clock, new finish tag of the tenant)
+        """
+        start = self.start_tag(rank, tenant)
+        finish = start + cost / tenant_weight(tenant)
+        self.clock[rank] = start
+        self.finish[(rank, tenant)] = finish
+        return start, finish
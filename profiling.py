@@ -0,0 +1,249 @@
+"""
+Profiling Module
+Opt-in profiling of runs, web requests and storage calls
+
+Enable with PROFILE_MODE=cprofile (deterministic, writes .prof files for
+pstats/snakeviz) or PROFILE_MODE=sampling (pyinstrument, writes .html and
+speedscope .json files), or with --profile on main.py/scheduler.py. Profiles
+are only written for calls slower than PROFILE_THRESHOLD_MS. When the mode is
+off, the decorators return the original functions, so there is no overhead.
+
+Both profilers only record the thread they run on, so work a session hands to
+other threads (keyword checks, page prefetches, the storage stage) is wrapped
+with propagated() and profiled on its thread into the same profile.
+"""
+import os
+import re
+import time
+import functools
+import threading
+import contextlib
+from typing import Callable, List, Optional
+import config
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+_local = threading.local()
+
+
+def enabled() -> bool:
+    """Return True if a profiling mode is configured"""
+    return config.PROFILE_MODE in PROFILE_MODES
+
+
+def configure(mode: str, threshold_ms: float = None, directory: str = None):
+    """
+    Turn profiling on at runtime (used by CLI flags)
+
+    Only code profiled through session() or decorators applied after this call
+    is affected; modules decorated at import time keep their import-time mode.
+
+    Args:
+        mode: One of PROFILE_MODES
+        threshold_ms: Minimum duration for a profile to be written
+        directory: Output directory for profile files
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'. Use one of: {', '.join(PROFILE_MODES)}")
+    config.PROFILE_MODE = mode
+    if threshold_ms is not None:
+        config.PROFILE_THRESHOLD_MS = threshold_ms
+    if directory:
+        config.PROFILE_DIR = directory
+
+
+class _Profiler:
+    """Common interface over cProfile and pyinstrument"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        if mode == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+        else:
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ImportError("Sampling profiles require pyinstrument. Install it with: pip install pyinstrument")
+            self._profiler = Profiler()
+
+    def start(self):
+        if self.mode == 'cprofile':
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+
+    def stop(self):
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+    def write(self, path_prefix: str, workers: List['_Profiler'] = ()) -> str:
+        """Write the profile merged with worker thread profiles next to path_prefix; return the main file path"""
+        if self.mode == 'cprofile':
+            import pstats
+            path = f"{path_prefix}.prof"
+            stats = pstats.Stats(self._profiler)
+            for worker in workers:
+                stats.add(worker._profiler)
+            stats.dump_stats(path)
+            return path
+
+        from pyinstrument.session import Session
+        from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+        profile = self._profiler.last_session
+        for worker in workers:
+            if worker._profiler.last_session is not None:
+                profile = Session.combine(profile, worker._profiler.last_session)
+        path = f"{path_prefix}.html"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(HTMLRenderer().render(profile))
+        with open(f"{path_prefix}.speedscope.json", 'w', encoding='utf-8') as f:
+            f.write(SpeedscopeRenderer().render(profile))
+        return path
+
+
+class _Collector:
+    """Profiles of work a session handed to other threads"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.profilers: List[_Profiler] = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def worker(self):
+        """Profile the enclosed block on the current thread into this collector"""
+        if getattr(_local, 'active', False):
+            yield
+            return
+
+        profiler = _Profiler(self.mode)
+        try:
+            profiler.start()
+        except ValueError:
+            # cProfile on Python 3.12+ is interpreter-wide: the session's profiler already sees this thread
+            profiler = None
+        _local.active, _local.collector = True, self
+        try:
+            yield
+        finally:
+            _local.active, _local.collector = False, None
+            if profiler is not None:
+                profiler.stop()
+                with self._lock:
+                    self.profilers.append(profiler)
+
+
+def _safe_name(name: str) -> str:
+    """Make a profile name safe to use in a file name"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'profile'
+
+
+@contextlib.contextmanager
+def session(name: str):
+    """
+    Profile the enclosed block and write a profile file if it exceeds the threshold
+
+    Nested sessions on the same thread are folded into the outermost one.
+
+    Args:
+        name: Label used in the profile file name
+    """
+    if not enabled() or getattr(_local, 'active', False):
+        yield
+        return
+
+    profiler = _Profiler(config.PROFILE_MODE)
+    collector = _Collector(config.PROFILE_MODE)
+    _local.active, _local.collector = True, collector
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        _local.active, _local.collector = False, None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= config.PROFILE_THRESHOLD_MS:
+            os.makedirs(config.PROFILE_DIR, exist_ok=True)
+            prefix = os.path.join(
+                config.PROFILE_DIR,
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{_safe_name(name)}-{int(elapsed_ms)}ms"
+            )
+            try:
+                with collector._lock:
+                    workers = list(collector.profilers)
+                path = profiler.write(prefix, workers)
+                print(f"Profile written: {path}")
+            except OSError as e:
+                print(f"Warning: could not write profile: {e}")
+
+
+def propagated(func: Callable) -> Callable:
+    """
+    Wrap work handed to another thread so it is profiled into the session running on this thread
+
+    Args:
+        func: Function that will run on another thread
+
+    Returns:
+        The function itself when no session is active, so there is no overhead
+    """
+    collector = getattr(_local, 'collector', None)
+    if collector is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with collector.worker():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def profiled(name: str = None) -> Callable:
+    """
+    Decorator profiling each call when profiling is enabled at import time
+
+    Args:
+        name: Profile label. Defaults to the function's qualified name
+    """
+    def decorator(func):
+        if not enabled():
+            return func
+
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with session(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    """
+    Profile every Flask request when profiling is enabled (no hooks are registered otherwise)
+
+    Args:
+        app: Flask application
+    """
+    if not enabled():
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        if request.endpoint in (None, 'static', 'prometheus_metrics'):
+            return
+        g.profile_session = session(f"request-{request.endpoint}")
+        g.profile_session.__enter__()
+
+    @app.teardown_request
+    def _stop_profile(exc: Optional[BaseException]):
+        profile_session = g.pop('profile_session', None)
+        if profile_session is not None:
+            profile_session.__exit__(None, None, None)
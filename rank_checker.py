@@ -4,30 +4,61 @@ Handles Google search queries and ranking position extraction using SerpAPI
 """
 import requests
 import time
-from typing import Dict, Optional, List
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Callable, Iterable, Iterator, Tuple
 from urllib.parse import urlparse
+from rank_result import RankResult
+from adaptive_concurrency import CONGESTION_STATUSES, get_limiter, parse_retry_after
+from serpapi_keys import RETIRE_REASONS, KeyPool, KeyPoolExhausted, SerpKey, get_key_pool
+import metrics
+import profiling
+import fast_json
 import config
 
 
 class RankChecker:
     """Handles Google search queries and extracts ranking positions"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, capture_snippets: bool = None, archive=None, prefetch_pages: int = 0,
+                 priority: str = 'batch'):
         """
         Initialize the Rank Checker
         
         Args:
-            api_key: SerpAPI key. If not provided, uses config.SERPAPI_KEY
+            api_key: SerpAPI key. If not provided, calls are spread over the shared pool of
+                     config.SERPAPI_KEY and config.SERPAPI_KEYS (see serpapi_keys.py)
+            capture_snippets: Keep SERP title/snippet of matches. If not provided, uses config.CAPTURE_SERP_SNIPPETS
+            archive: SerpArchive receiving every fetched page. If not provided, one is
+                     created when config.SERP_ARCHIVE_ENABLED is set
+            prefetch_pages: Result pages of one keyword fetched at once (speculatively, without
+                            page delays). 0 or 1 fetches pages one after another
+            priority: Priority class of this checker's SerpAPI calls in the adaptive limiter
+                      ('interactive' goes ahead of 'batch'; see priority_lanes.py)
         """
-        self.api_key = api_key or config.SERPAPI_KEY
-        if not self.api_key:
-            raise ValueError("SerpAPI key is required. Set SERPAPI_KEY in .env file")
+        self.keys = KeyPool([SerpKey(api_key)]) if api_key else get_key_pool()
+        self.api_key = self.keys.keys[0].key
         
         self.base_url = config.SERPAPI_URL
         self.max_results = config.MAX_RESULTS_TO_CHECK
         self.results_per_page = config.RESULTS_PER_PAGE
+        # In adaptive mode the shared AIMD window paces SerpAPI calls instead of fixed delays
+        self.limiter = get_limiter() if config.SERP_CONCURRENCY == 'adaptive' else None
+        self.max_retries = config.SERP_MAX_RETRIES if self.limiter else 0
+        self.page_delay = 0 if self.limiter else config.PAGE_DELAY_SECONDS
+        self.keyword_delay = 0 if self.limiter else config.KEYWORD_DELAY_SECONDS
+        self.capture_snippets = config.CAPTURE_SERP_SNIPPETS if capture_snippets is None else capture_snippets
+        self.prefetch_pages = max(1, prefetch_pages or 1)
+        self.priority = priority
+        
+        if archive is None and config.SERP_ARCHIVE_ENABLED:
+            from serp_archive import SerpArchive
+            archive = SerpArchive()
+        self.archive = archive
     
-    def normalize_url(self, url: str) -> str:
+    @staticmethod
+    def normalize_url(url: str) -> str:
         """
         Normalize URL for comparison (remove protocol, www, trailing slashes)
         
@@ -52,7 +83,8 @@ class RankChecker:
         
         return url.lower()
     
-    def extract_domain(self, url: str) -> str:
+    @staticmethod
+    def extract_domain(url: str) -> str:
         """
         Extract domain from URL
         
@@ -65,11 +97,12 @@ class RankChecker:
         try:
             parsed = urlparse(url if url.startswith('http') else f'https://{url}')
             domain = parsed.netloc or parsed.path.split('/')[0]
-            return self.normalize_url(domain)
+            return RankChecker.normalize_url(domain)
         except:
-            return self.normalize_url(url)
+            return RankChecker.normalize_url(url)
     
-    def check_ranking(self, keyword: str, website_url: str, location: str = "United States") -> Dict:
+    def check_ranking(self, keyword: str, website_url: str, location: str = "United States",
+                      max_results: int = None) -> RankResult:
         """
         Check the ranking position of a website for a given keyword
         
@@ -77,48 +110,226 @@ class RankChecker:
             keyword: Search keyword
             website_url: Website URL to track
             location: Search location (default: United States)
+            max_results: Search depth for this keyword. If not provided, uses config.MAX_RESULTS_TO_CHECK
             
         Returns:
-            Dictionary containing ranking information
+            RankResult (also usable as the legacy result dictionary)
+        """
+        return self.check_targets(keyword, [website_url], location, max_results)[0]
+    
+    def check_targets(self, keyword: str, targets: List[str], location: str = "United States",
+                      max_results: int = None) -> List[RankResult]:
         """
-        target_domain = self.extract_domain(website_url)
-        ranking_position = None
-        found_url = None
-        serp_title = None
-        serp_snippet = None
+        Check the ranking positions of several websites for one keyword
         
-        # Check multiple pages if needed
-        max_pages = (self.max_results // self.results_per_page) + 1
+        Result pages are fetched once and matched against every target, so
+        tracking competitors costs no extra API calls.
         
-        for page in range(max_pages):
-            start = page * self.results_per_page
+        Args:
+            keyword: Search keyword
+            targets: Website URLs to track
+            location: Search location (default: United States)
+            max_results: Search depth for this keyword. If not provided, uses config.MAX_RESULTS_TO_CHECK
+            
+        Returns:
+            One RankResult per target, in target order
+        """
+        started = time.perf_counter()
+        results = self._check_ranking(keyword, targets, location, max_results)
+        metrics.KEYWORD_CHECK_SECONDS.observe(time.perf_counter() - started)
+        for result in results:
+            metrics.KEYWORD_CHECKS.labels(result.status.value).inc()
+        return results
+    
+    def _fetch_page(self, params: dict, tenant: str = None) -> requests.Response:
+        """
+        Fetch one SerpAPI result page, recording latency and error metrics
+        
+        In adaptive mode the call waits for a slot in the concurrency window, its
+        outcome adjusts the window, and throttled (429), 5xx and timed out calls are
+        retried once the window (and any Retry-After pause) allows. Waiting calls get
+        free slots by priority class, then by fair share of their tenant. Each call
+        uses the pool key with the most headroom; if that key is retired for an auth
+        or quota error, the call is repeated right away with the next key.
+        
+        Args:
+            params: SerpAPI query parameters
+            tenant: Website the call is made for (fair-share key)
             
-            params = {
-                'q': keyword,
-                'api_key': self.api_key,
-                'engine': 'google',
-                'location': location,
-                'num': self.results_per_page,
-                'start': start
-            }
+        Returns:
+            Successful HTTP response
             
+        Raises:
+            requests.exceptions.RequestException: On network or HTTP errors, or
+                serpapi_keys.KeyPoolExhausted if every key is retired
+        """
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            token = self.limiter.acquire(self.priority, tenant) if self.limiter else None
             try:
-                response = requests.get(self.base_url, params=params, timeout=30)
+                key = self.keys.acquire()
+            except KeyPoolExhausted:
+                if token is not None:
+                    self.limiter.abandon(token)
+                raise
+            status, retry_after, key_error = None, None, None
+            try:
+                response = requests.get(self.base_url, params=dict(params, api_key=key.key), timeout=30)
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                key_error = self.keys.release(key, status, response.text if status >= 400 else '', retry_after)
+                key = None
                 response.raise_for_status()
-                data = response.json()
+                return response
+            except requests.exceptions.RequestException as e:
+                metrics.CHECK_ERRORS.labels(metrics.classify_error(e)).inc()
+                if key_error in RETIRE_REASONS and self.keys.available():
+                    # The key was retired: repeat the call with the next one without using up a retry
+                    continue
+                if attempt >= self.max_retries or (status is not None and status not in CONGESTION_STATUSES):
+                    raise
+                attempt += 1
+                metrics.SERP_RETRIES.inc()
+            finally:
+                if key is not None:
+                    self.keys.release(key, None)
+                if token is not None and key_error in RETIRE_REASONS:
+                    # A rejected key says nothing about the API's capacity
+                    self.limiter.abandon(token)
+                elif token is not None:
+                    self.limiter.release(token, status, retry_after)
+                metrics.SERP_PAGE_SECONDS.observe(time.perf_counter() - started)
+    
+    def _page_params(self, keyword: str, location: str, start: int) -> dict:
+        """Build the SerpAPI query parameters for one result page (the key is added per call)"""
+        return {
+            'q': keyword,
+            'engine': 'google',
+            'location': location,
+            'num': self.results_per_page,
+            'start': start
+        }
+    
+    def _iter_pages(self, keyword: str, location: str, max_pages: int,
+                    tenant: str = None) -> Iterator[Tuple[int, requests.Response]]:
+        """
+        Fetch the result pages of one keyword in page order, as the caller asks for them
+        
+        With prefetch_pages above 1, that many pages are requested ahead of the page
+        being matched. Pages still being fetched when the caller stops (close()) are
+        cancelled, or discarded if already on the wire.
+        
+        Args:
+            keyword: Search keyword
+            location: Search location
+            max_pages: Number of pages at most
+            tenant: Website the pages are fetched for (fair-share key)
+            
+        Yields:
+            (result offset, response) pairs, in page order
+        """
+        if self.prefetch_pages > 1:
+            yield from self._iter_pages_prefetched(keyword, location, max_pages, tenant)
+            return
+        
+        for page in range(max_pages):
+            # Rate limiting - be respectful to API
+            if page:
+                time.sleep(self.page_delay)
+            start = page * self.results_per_page
+            yield start, self._fetch_page(self._page_params(keyword, location, start), tenant)
+    
+    def _iter_pages_prefetched(self, keyword: str, location: str, max_pages: int,
+                               tenant: str = None) -> Iterator[Tuple[int, requests.Response]]:
+        """Fetch up to prefetch_pages pages concurrently, yielding them in page order (see _iter_pages)"""
+        pool = ThreadPoolExecutor(max_workers=self.prefetch_pages, thread_name_prefix='serp-prefetch')
+        fetch_page = profiling.propagated(self._fetch_page)
+        pending = deque()
+        try:
+            for page in range(max_pages):
+                start = page * self.results_per_page
+                pending.append((start, pool.submit(fetch_page, self._page_params(keyword, location, start), tenant)))
+                if len(pending) >= self.prefetch_pages:
+                    start, future = pending.popleft()
+                    yield start, future.result()
+            while pending:
+                start, future = pending.popleft()
+                yield start, future.result()
+        finally:
+            for _, future in pending:
+                if not future.cancel():
+                    metrics.SERP_PREFETCH_WASTED.inc()
+            # Don't wait for discarded calls still in flight
+            pool.shutdown(wait=False)
+    
+    def _match_page(self, organic_results: List[dict], start: int, target_domains: List[str], matches: dict):
+        """
+        Record the first match of each target on one result page
+        
+        Args:
+            organic_results: Organic results of the page
+            start: Result offset of the page
+            target_domains: Normalized domains of the targets
+            matches: Target index -> (position, organic result); updated in place
+        """
+        for index, result in enumerate(organic_results):
+            result_domain = self.extract_domain(result.get('link', ''))
+            for target_index, target_domain in enumerate(target_domains):
+                if target_index not in matches and result_domain == target_domain:
+                    matches[target_index] = (start + index + 1, result)
+    
+    def _build_results(self, keyword: str, targets: List[str], location: str, max_results: int,
+                       matches: dict) -> List[RankResult]:
+        """Turn the matches of a finished search into one RankResult per target"""
+        results = []
+        for target_index, website_url in enumerate(targets):
+            if target_index not in matches:
+                results.append(RankResult.not_found(keyword, website_url, max_results, location=location))
+                continue
+            
+            position, result = matches[target_index]
+            results.append(RankResult.found(
+                keyword,
+                website_url,
+                position,
+                result.get('link', ''),
+                location=location,
+                serp_title=result.get('title', '') if self.capture_snippets else None,
+                serp_snippet=result.get('snippet', '') if self.capture_snippets else None
+            ))
+        return results
+    
+    def _check_ranking(self, keyword: str, targets: List[str], location: str,
+                       max_results: Optional[int]) -> List[RankResult]:
+        """Search result pages for each target website (see check_targets)"""
+        max_results = max_results or self.max_results
+        target_domains = [self.extract_domain(url) for url in targets]
+        matches = {}  # target index -> (position, organic result)
+        
+        # Check multiple pages if needed
+        max_pages = (max_results // self.results_per_page) + 1
+        check_id = self.archive.new_check_id() if self.archive else None
+        pages_fetched = 0
+        
+        pages = self._iter_pages(keyword, location, max_pages, targets[0] if targets else None)
+        try:
+            for start, response in pages:
+                pages_fetched += 1
+                
+                if self.archive:
+                    try:
+                        self.archive.store(check_id, keyword, location, start, response.content)
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"Warning: could not archive SERP page: {e}")
+                
+                # Only organic_results/error are used; see fast_json for the partial decoding path
+                data = fast_json.extract_serp(response.content)
                 
                 # Check for errors
                 if 'error' in data:
-                    return {
-                        'keyword': keyword,
-                        'website_url': website_url,
-                        'ranking_position': 'Error',
-                        'found_url': None,
-                        'checked_on': time.strftime('%Y-%m-%d %H:%M:%S'),
-                        'serp_title': None,
-                        'serp_snippet': None,
-                        'error': data['error']
-                    }
+                    metrics.CHECK_ERRORS.labels('api').inc()
+                    return [RankResult.failed(keyword, url, data['error'], location=location) for url in targets]
                 
                 # Extract organic results
                 organic_results = data.get('organic_results', [])
@@ -126,54 +337,28 @@ class RankChecker:
                 if not organic_results:
                     break
                 
-                # Check each result
-                for result in organic_results:
-                    result_url = result.get('link', '')
-                    result_domain = self.extract_domain(result_url)
-                    
-                    # Check if domain matches
-                    if result_domain == target_domain:
-                        ranking_position = start + organic_results.index(result) + 1
-                        found_url = result_url
-                        serp_title = result.get('title', '')
-                        serp_snippet = result.get('snippet', '')
-                        break
+                # Check each result; the first match of each target is its position
+                self._match_page(organic_results, start, target_domains, matches)
                 
-                # If found, break out of page loop
-                if ranking_position:
+                # If every target was found, break out of page loop
+                if len(matches) == len(targets):
                     break
-                
-                # Rate limiting - be respectful to API
-                time.sleep(1)
-                
-            except requests.exceptions.RequestException as e:
-                return {
-                    'keyword': keyword,
-                    'website_url': website_url,
-                    'ranking_position': 'Error',
-                    'found_url': None,
-                    'checked_on': time.strftime('%Y-%m-%d %H:%M:%S'),
-                    'serp_title': None,
-                    'serp_snippet': None,
-                    'error': str(e)
-                }
-        
-        # Prepare result
-        if ranking_position is None:
-            ranking_position = f"> {self.max_results}"
         
-        return {
-            'keyword': keyword,
-            'website_url': website_url,
-            'ranking_position': ranking_position,
-            'found_url': found_url or 'Not Found',
-            'checked_on': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'serp_title': serp_title or '',
-            'serp_snippet': serp_snippet or '',
-            'error': None
-        }
+        except requests.exceptions.RequestException as e:
+            return [RankResult.failed(keyword, url, str(e), location=location) for url in targets]
+        except ValueError as e:
+            metrics.CHECK_ERRORS.labels('invalid_json').inc()
+            return [RankResult.failed(keyword, url, f"Invalid JSON from SerpAPI: {e}", location=location)
+                    for url in targets]
+        finally:
+            # Cancels prefetched pages that are no longer needed
+            pages.close()
+            metrics.SERP_PAGES_PER_KEYWORD.observe(pages_fetched)
+        
+        return self._build_results(keyword, targets, location, max_results, matches)
     
-    def check_multiple_keywords(self, keywords: List[str], website_url: str, location: str = "United States") -> List[Dict]:
+    def check_multiple_keywords(self, keywords: List[str], website_url: str, location: str = "United States",
+                                on_result: Optional[Callable[[RankResult], None]] = None) -> List[RankResult]:
         """
         Check rankings for multiple keywords
         
@@ -181,20 +366,75 @@ class RankChecker:
             keywords: List of keywords to check
             website_url: Website URL to track
             location: Search location
+            on_result: Optional callback invoked with each result as soon as it is ready
             
         Returns:
-            List of ranking dictionaries
+            List of RankResults
         """
         results = []
         
-        for keyword in keywords:
-            print(f"Checking keyword: {keyword}")
-            result = self.check_ranking(keyword, website_url, location)
+        rows = ((keyword, website_url, location, None) for keyword in keywords)
+        for _, result in self.iter_rankings(rows):
             results.append(result)
             
-            # Rate limiting between keywords
-            time.sleep(2)
+            if on_result:
+                on_result(result)
         
         return results
-
-
+    
+    def iter_rankings(self, rows: Iterable[Tuple[str, str, str, Optional[int]]]) -> Iterator[Tuple[Tuple, RankResult]]:
+        """
+        Lazily check rankings for a stream of (keyword, website_url, location, depth) rows
+        
+        Rows are consumed lazily, so checks start before a large keyword file has
+        been fully read. In adaptive mode several rows are checked concurrently.
+        
+        Args:
+            rows: Iterable of (keyword, website_url, location, depth) tuples; depth may be None
+            
+        Yields:
+            (row, RankResult) pairs, in input order
+        """
+        if self.limiter:
+            yield from self._iter_rankings_concurrent(rows)
+            return
+        
+        first = True
+        for row in rows:
+            # Rate limiting between keywords
+            if not first:
+                time.sleep(self.keyword_delay)
+            first = False
+            
+            yield row, self._check_row(row)
+    
+    def _check_row(self, row: Tuple[str, str, str, Optional[int]]) -> RankResult:
+        """Check one (keyword, website_url, location, depth) row"""
+        keyword, website_url, location, depth = row
+        return self.check_ranking(keyword, website_url, location, max_results=depth)
+    
+    def _iter_rankings_concurrent(self, rows: Iterable[Tuple]) -> Iterator[Tuple[Tuple, RankResult]]:
+        """
+        Check rows on a thread pool, yielding results in input order
+        
+        Up to AIMD_MAX_WINDOW keywords are checked at once; how many SerpAPI calls
+        actually run is decided by the adaptive limiter. Rows are read at most one
+        pool's worth ahead of the results consumed.
+        """
+        workers = max(1, int(self.limiter.window.maximum))
+        pending = deque()
+        check_row = profiling.propagated(self._check_row)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rank-check') as pool:
+            try:
+                for row in rows:
+                    pending.append((row, pool.submit(check_row, row)))
+                    while len(pending) > workers or (pending and pending[0][1].done()):
+                        done_row, future = pending.popleft()
+                        yield done_row, future.result()
+                while pending:
+                    done_row, future = pending.popleft()
+                    yield done_row, future.result()
+            finally:
+                # Stopped early (interrupted run): drop checks that have not started
+                for _, future in pending:
+                    future.cancel()
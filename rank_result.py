@@ -0,0 +1,159 @@
+"""
+Rank Result Module
+Compact, typed record for a single keyword ranking check
+"""
+import sys
+import time
+from enum import Enum
+from dataclasses import dataclass
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional
+
+# Keys exposed by the dict-compatible view (the legacy result dictionary layout)
+RESULT_KEYS = ('keyword', 'website_url', 'ranking_position', 'found_url',
+               'checked_on', 'serp_title', 'serp_snippet', 'error')
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class RankStatus(str, Enum):
+    """Outcome of a ranking check (values match the status strings used by the web UI)"""
+    FOUND = 'success'
+    NOT_FOUND = 'not_found'
+    ERROR = 'error'
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern strings that repeat across many results (URLs, locations)"""
+    return sys.intern(value) if value else value
+
+
+@dataclass(slots=True, eq=False)
+class RankResult(Mapping):
+    """
+    Result of checking one keyword for one website
+
+    Behaves as a read-only mapping with the legacy result dictionary keys
+    (keyword, website_url, ranking_position, found_url, checked_on,
+    serp_title, serp_snippet, error), so storage managers and API handlers
+    can keep using result['ranking_position'] and result.get('error').
+    """
+    keyword: str
+    website_url: str
+    status: RankStatus
+    position: Optional[int] = None
+    max_results: int = 100
+    location: Optional[str] = None
+    found_url: Optional[str] = None
+    serp_title: Optional[str] = None
+    serp_snippet: Optional[str] = None
+    error: Optional[str] = None
+    checked_at: float = 0.0
+
+    def __post_init__(self):
+        self.website_url = _intern(self.website_url)
+        self.location = _intern(self.location)
+        if not self.checked_at:
+            self.checked_at = time.time()
+
+    @classmethod
+    def found(cls, keyword: str, website_url: str, position: int, found_url: str, **kwargs) -> 'RankResult':
+        """Build a result for a keyword where the website was found"""
+        return cls(keyword, website_url, RankStatus.FOUND, position=position, found_url=found_url, **kwargs)
+
+    @classmethod
+    def not_found(cls, keyword: str, website_url: str, max_results: int, **kwargs) -> 'RankResult':
+        """Build a result for a keyword where the website was not in the checked results"""
+        return cls(keyword, website_url, RankStatus.NOT_FOUND, max_results=max_results, **kwargs)
+
+    @classmethod
+    def failed(cls, keyword: str, website_url: str, error: str, **kwargs) -> 'RankResult':
+        """Build a result for a check that failed"""
+        return cls(keyword, website_url, RankStatus.ERROR, error=error, **kwargs)
+
+    @classmethod
+    def from_dict(cls, data: Dict, location: str = None) -> 'RankResult':
+        """
+        Rebuild a result from a legacy result dictionary
+
+        Args:
+            data: Dictionary with the RESULT_KEYS layout
+            location: Search location, if known
+
+        Returns:
+            RankResult instance
+        """
+        if isinstance(data, RankResult):
+            return data
+
+        raw_position = data.get('ranking_position')
+        position = None
+        max_results = 100
+        if data.get('error') or raw_position == 'Error':
+            status = RankStatus.ERROR
+        elif isinstance(raw_position, int) or str(raw_position).strip().isdigit():
+            status = RankStatus.FOUND
+            position = int(raw_position)
+        else:
+            status = RankStatus.NOT_FOUND
+            digits = str(raw_position or '').lstrip('> ').strip()
+            if digits.isdigit():
+                max_results = int(digits)
+
+        found_url = data.get('found_url')
+        checked_at = 0.0
+        try:
+            checked_at = time.mktime(time.strptime(data.get('checked_on', ''), TIMESTAMP_FORMAT))
+        except (TypeError, ValueError, OverflowError):
+            pass
+
+        return cls(
+            keyword=data.get('keyword', ''),
+            website_url=data.get('website_url', ''),
+            status=status,
+            position=position,
+            max_results=max_results,
+            location=location,
+            found_url=None if found_url == 'Not Found' else found_url,
+            serp_title=data.get('serp_title') or None,
+            serp_snippet=data.get('serp_snippet') or None,
+            error=data.get('error'),
+            checked_at=checked_at
+        )
+
+    @property
+    def ranking_position(self):
+        """Legacy position value: int when found, '> N' when not found, 'Error' on failure"""
+        if self.status is RankStatus.FOUND:
+            return self.position
+        if self.status is RankStatus.NOT_FOUND:
+            return f"> {self.max_results}"
+        return 'Error'
+
+    @property
+    def checked_on(self) -> str:
+        """Check time formatted as YYYY-MM-DD HH:MM:SS (local time)"""
+        return time.strftime(TIMESTAMP_FORMAT, time.localtime(self.checked_at))
+
+    def __getitem__(self, key: str):
+        if key == 'found_url':
+            if self.status is RankStatus.ERROR:
+                return None
+            return self.found_url or 'Not Found'
+        if key in ('serp_title', 'serp_snippet'):
+            if self.status is RankStatus.ERROR:
+                return None
+            return getattr(self, key) or ''
+        if key in RESULT_KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(RESULT_KEYS)
+
+    def __len__(self) -> int:
+        return len(RESULT_KEYS)
+
+    def to_dict(self) -> Dict:
+        """Return the legacy result dictionary"""
+        return {key: self[key] for key in RESULT_KEYS}
@@ -0,0 +1,556 @@
+"""
+Rank Series Module
+Memory-mapped daily rank series per (website, keyword, location), maintained on every
+append and read without copying
+"""
+import os
+import sys
+import sqlite3
+import argparse
+import functools
+import threading
+from datetime import date
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from rank_result import RankResult, RankStatus
+import config
+
+# Cell values other than positions (1..POSITION_MAX)
+EMPTY = 0        # Not checked that day
+NOT_FOUND = -1   # Checked, website not in the results
+ERROR = -2       # Check failed; never replaces a result of the same day
+
+POSITION_MAX = np.iinfo(np.int16).max
+
+# The matrix grows by this many days at a time
+ROW_BLOCK = 256
+
+# Series columns allocated up front (doubled whenever they run out)
+INITIAL_COLUMNS = 64
+
+# Writes remembered in the change log (see RankSeriesStore.changed_since)
+CHANGE_LOG_SIZE = 1000
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    series_id INTEGER PRIMARY KEY,
+    website_url TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    location TEXT NOT NULL,
+    UNIQUE (website_url, keyword, location)
+);
+CREATE TABLE IF NOT EXISTS layout (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    generation INTEGER NOT NULL,
+    first_day INTEGER NOT NULL,
+    last_day INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    columns INTEGER NOT NULL,
+    writes INTEGER NOT NULL,
+    resets INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO layout VALUES (0, 0, 0, -1, 0, 0, 0, 0);
+CREATE TABLE IF NOT EXISTS changes (
+    write INTEGER PRIMARY KEY,
+    first_day INTEGER NOT NULL
+);
+"""
+
+# (website URL, keyword, location)
+SeriesKey = Tuple[str, str, str]
+
+# Location of results that don't carry one (the default of the CLI, scheduler and web checks).
+# Live updates and rebuilds from stored rows, which have no location, must key series the same way
+DEFAULT_LOCATION = 'United States'
+
+
+class Layout(NamedTuple):
+    """Shape and position of the current matrix file"""
+    generation: int
+    first_day: int
+    last_day: int
+    rows: int
+    columns: int
+    writes: int
+    resets: int
+
+
+class DayView(NamedTuple):
+    """Read-only cells starting at first_day: one row per day, or a single series' column"""
+    first_day: int
+    positions: np.ndarray
+
+    @property
+    def days(self) -> np.ndarray:
+        """Day index of each row"""
+        return np.arange(self.first_day, self.first_day + len(self.positions))
+
+
+def day_index(checked_at: float) -> int:
+    """Return the day index (days since 1970-01-01, local date) of a check time"""
+    return date.fromtimestamp(checked_at).toordinal() - EPOCH_ORDINAL
+
+
+def parse_day(value: str) -> Optional[int]:
+    """Return the day index of a 'YYYY-MM-DD' date, or None if malformed"""
+    try:
+        return date.fromisoformat(value).toordinal() - EPOCH_ORDINAL
+    except (TypeError, ValueError):
+        return None
+
+
+def format_day(day: int) -> str:
+    """Return the 'YYYY-MM-DD' date of a day index"""
+    return date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+
+def cell_value(result: RankResult) -> int:
+    """Encode a result as a matrix cell"""
+    if result.status is RankStatus.FOUND:
+        return min(result.position, POSITION_MAX)
+    if result.status is RankStatus.NOT_FOUND:
+        return NOT_FOUND
+    return ERROR
+
+
+class RankSeriesStore:
+    """
+    Daily positions of every tracked series in one day-major int16 matrix file
+
+    Each series owns a column and each day a row, so one series is a strided view
+    and a date range of all series is a contiguous slab; both are returned as views
+    of the memory map without copying. A SQLite database holds the string dictionary
+    (series key to column) and the matrix layout, and serializes writers across
+    processes. New days extend the file in place; more columns or earlier days
+    rewrite it under a new generation number.
+    """
+
+    def __init__(self, directory: str = None):
+        """
+        Initialize the Rank Series Store
+
+        Args:
+            directory: Directory holding series.db and the matrix file. If not provided, uses config.RANK_SERIES_DIR
+        """
+        self.directory = directory or config.RANK_SERIES_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, 'series.db')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._keys: List[SeriesKey] = []
+        self._ids: Dict[SeriesKey, int] = {}
+        self._matrix = None
+        self._mapped: Optional[Layout] = None
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (web requests run on several threads)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _matrix_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"positions.{generation}.i16")
+
+    @staticmethod
+    def _layout(connection: sqlite3.Connection) -> Layout:
+        return Layout(*connection.execute(
+            'SELECT generation, first_day, last_day, rows, columns, writes, resets FROM layout'
+        ).fetchone())
+
+    def _sync(self, connection: sqlite3.Connection, layout: Layout):
+        """Load new dictionary entries and remap the matrix if its file changed (caller holds self._lock)"""
+        if self._mapped is None or self._mapped.resets != layout.resets:
+            self._keys, self._ids = [], {}
+        for series_id, website_url, keyword, location in connection.execute(
+                'SELECT series_id, website_url, keyword, location FROM series WHERE series_id >= ? ORDER BY series_id',
+                (len(self._keys),)):
+            key = (website_url, keyword, location)
+            self._ids[key] = series_id
+            self._keys.append(key)
+
+        if not layout.rows:
+            self._matrix = None
+        elif (self._matrix is None or (layout.generation, layout.rows, layout.columns) !=
+              (self._mapped.generation, self._mapped.rows, self._mapped.columns)):
+            self._matrix = np.memmap(self._matrix_path(layout.generation), dtype=np.int16, mode='r+',
+                                     shape=(layout.rows, layout.columns))
+        self._mapped = layout
+
+    def _refresh(self) -> Layout:
+        """Bring the dictionary and mapping up to date for a read (caller holds self._lock)"""
+        connection = self._connection()
+        for attempt in range(3):
+            layout = self._layout(connection)
+            try:
+                self._sync(connection, layout)
+                return layout
+            except FileNotFoundError:
+                # A writer replaced the file between reading the layout and mapping it
+                if attempt == 2:
+                    raise
+        return layout
+
+    def _grow(self, connection: sqlite3.Connection, layout: Layout, first: int, last: int,
+              series_count: int) -> Layout:
+        """Make room for days first..last and series_count columns (inside the write transaction)"""
+        if layout.rows:
+            first_day = min(layout.first_day, first - first % ROW_BLOCK)
+            end = max(layout.first_day + layout.rows, last + 1)
+        else:
+            first_day = first - first % ROW_BLOCK
+            end = last + 1
+        rows = -(-(end - first_day) // ROW_BLOCK) * ROW_BLOCK
+        columns = max(layout.columns, INITIAL_COLUMNS)
+        while columns < series_count:
+            columns *= 2
+        if (first_day, rows, columns) == (layout.first_day, layout.rows, layout.columns):
+            return layout
+
+        generation = layout.generation
+        if layout.rows and (first_day, columns) == (layout.first_day, layout.columns):
+            # Day-major: new days are appended to the end of the file; readers remap on the next query
+            with open(self._matrix_path(generation), 'r+b') as handle:
+                handle.truncate(rows * columns * 2)
+        else:
+            generation += 1
+            matrix = np.memmap(self._matrix_path(generation), dtype=np.int16, mode='w+', shape=(rows, columns))
+            if layout.rows:
+                old = np.memmap(self._matrix_path(layout.generation), dtype=np.int16, mode='r',
+                                shape=(layout.rows, layout.columns))
+                offset = layout.first_day - first_day
+                matrix[offset:offset + layout.rows, :layout.columns] = old
+                del old
+            matrix.flush()
+            del matrix
+
+        layout = layout._replace(generation=generation, first_day=first_day, rows=rows, columns=columns)
+        connection.execute('UPDATE layout SET generation = ?, first_day = ?, rows = ?, columns = ?',
+                           (generation, first_day, rows, columns))
+        return layout
+
+    def _remove_stale(self, generation: int):
+        """Delete matrix files of older generations (mappings still open keep working)"""
+        for name in os.listdir(self.directory):
+            if name.startswith('positions.') and name != os.path.basename(self._matrix_path(generation)):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def update(self, results: Iterable[Dict], location: str = None) -> int:
+        """
+        Record newly stored results
+
+        The latest result of a day replaces earlier ones of the same day; a failed
+        check is only recorded on a day without a result.
+
+        Args:
+            results: RankResult records or legacy result dictionaries
+            location: Location for results that do not carry one. If not provided, DEFAULT_LOCATION
+
+        Returns:
+            Number of cells written
+        """
+        cells: Dict[Tuple[SeriesKey, int], int] = {}
+        for result in results:
+            result = RankResult.from_dict(result, location)
+            if not result.keyword:
+                continue
+            cell = ((result.website_url or '', result.keyword, result.location or location or DEFAULT_LOCATION),
+                    day_index(result.checked_at))
+            value = cell_value(result)
+            if value == ERROR and cells.get(cell, ERROR) != ERROR:
+                continue
+            cells[cell] = value
+        if not cells:
+            return 0
+
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            layout = self._layout(connection)
+            generation = layout.generation
+            with self._lock:
+                self._sync(connection, layout)
+                new_keys = list(dict.fromkeys(key for key, _ in cells if key not in self._ids))
+                connection.executemany(
+                    'INSERT INTO series (series_id, website_url, keyword, location) VALUES (?, ?, ?, ?)',
+                    [(len(self._keys) + index,) + key for index, key in enumerate(new_keys)]
+                )
+                days = [day for _, day in cells]
+                layout = self._grow(connection, layout, min(days), max(days), len(self._keys) + len(new_keys))
+                self._sync(connection, layout)
+
+                rows = np.fromiter((day - layout.first_day for day in days), dtype=np.int64, count=len(cells))
+                columns = np.fromiter((self._ids[key] for key, _ in cells), dtype=np.int64, count=len(cells))
+                values = np.fromiter(cells.values(), dtype=np.int16, count=len(cells))
+                # Failed checks only fill empty days
+                keep = (values != ERROR) | (self._matrix[rows, columns] == EMPTY)
+                self._matrix[rows[keep], columns[keep]] = values[keep]
+                self._matrix.flush()
+
+            connection.execute('UPDATE layout SET last_day = MAX(last_day, ?), writes = writes + 1', (max(days),))
+            connection.execute('INSERT INTO changes VALUES (?, ?)', (layout.writes + 1, min(days)))
+            connection.execute('DELETE FROM changes WHERE write <= ?', (layout.writes + 1 - CHANGE_LOG_SIZE,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        if layout.generation != generation:
+            self._remove_stale(layout.generation)
+        return len(cells)
+
+    def rebuild(self, rows: List[List], location: str = None) -> int:
+        """
+        Replace the store contents from full stored history
+
+        Stored rows have no location column, so rebuilt series get one location,
+        the same one live updates use for results without a location.
+
+        Args:
+            rows: Rows as returned by a storage manager's get_all_results (header row included)
+            location: Location of the rebuilt series. If not provided, DEFAULT_LOCATION
+
+        Returns:
+            Number of cells written
+        """
+        results = []
+        for row in rows:
+            if len(row) < 5 or row[0] == 'Keyword':
+                continue
+            results.append(RankResult.from_dict({
+                'keyword': row[0],
+                'website_url': row[1],
+                'ranking_position': row[2],
+                'checked_on': row[4],
+                'error': (row[7] if len(row) > 7 else '') or None
+            }))
+
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM series')
+            connection.execute('DELETE FROM changes')
+            connection.execute('UPDATE layout SET generation = generation + 1, first_day = 0, last_day = -1, '
+                               'rows = 0, columns = 0, writes = writes + 1, resets = resets + 1')
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._remove_stale(self._layout(connection).generation)
+        return self.update(results, location)
+
+    @property
+    def version(self) -> Tuple[int, int, int]:
+        """Changes whenever the stored cells change (for caches)"""
+        layout = self._layout(self._connection())
+        return layout.resets, layout.generation, layout.writes
+
+    def changed_since(self, writes: int) -> Optional[int]:
+        """
+        Return the earliest day written after a given write count
+
+        Args:
+            writes: Write count from an earlier version
+
+        Returns:
+            Day index (past the last stored day if nothing changed), or None if the change log
+            no longer reaches back that far
+        """
+        connection = self._connection()
+        oldest, newest, earliest = connection.execute(
+            'SELECT MIN(write), MAX(write), MIN(CASE WHEN write > ? THEN first_day END) FROM changes', (writes,)
+        ).fetchone()
+        if newest is None or newest <= writes:
+            return self._layout(connection).last_day + 1
+        if oldest > writes + 1:
+            return None
+        return earliest
+
+    def keys(self) -> List[SeriesKey]:
+        """Return the key of each column, in column order"""
+        with self._lock:
+            self._refresh()
+            return list(self._keys)
+
+    def matrix(self, since_day: int = None, until_day: int = None) -> DayView:
+        """
+        Return the cells of all series for a day range without copying
+
+        Args:
+            since_day: First day index to include. If not provided, starts at the first stored day
+            until_day: Last day index to include. If not provided, ends at the last stored day
+
+        Returns:
+            DayView whose positions are a read-only (days x series) view of the memory map
+        """
+        with self._lock:
+            layout = self._refresh()
+            count = len(self._keys)
+            if self._matrix is None:
+                return DayView(since_day or 0, np.empty((0, count), dtype=np.int16))
+            start = layout.first_day if since_day is None else max(layout.first_day, since_day)
+            stop = layout.last_day + 1 if until_day is None else min(layout.last_day + 1, until_day + 1)
+            stop = max(start, stop)
+            view = np.asarray(self._matrix)[start - layout.first_day:stop - layout.first_day, :count]
+        view.setflags(write=False)
+        return DayView(start, view)
+
+    def series(self, website_url: str, keyword: str, location: str = None, since_day: int = None,
+               until_day: int = None) -> Optional[DayView]:
+        """
+        Return the cells of one series for a day range without copying
+
+        Args:
+            website_url: Website URL
+            keyword: Keyword
+            location: Location. If not provided, DEFAULT_LOCATION
+            since_day: First day index to include
+            until_day: Last day index to include
+
+        Returns:
+            DayView whose positions are a read-only strided view of the series' column, or None if unknown
+        """
+        view = self.matrix(since_day, until_day)
+        with self._lock:
+            column = self._ids.get((website_url, keyword, location or DEFAULT_LOCATION))
+        if column is None or column >= view.positions.shape[1]:
+            return None
+        return DayView(view.first_day, view.positions[:, column])
+
+    def count(self) -> int:
+        """Return the number of series"""
+        with self._lock:
+            self._refresh()
+            return len(self._keys)
+
+
+_stores: Dict[str, RankSeriesStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(directory: str = None) -> RankSeriesStore:
+    """Return the shared store for a directory (created on first use)"""
+    directory = directory or config.RANK_SERIES_DIR
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = RankSeriesStore(directory)
+        return store
+
+
+def maintains_series(method: Callable) -> Callable:
+    """
+    Decorator for storage manager append methods that records results in the
+    rank series store after the append succeeds, when config.RANK_SERIES_ENABLED is set
+
+    A failure to update the store is reported but never fails the append: the
+    store can always be rebuilt from history with `python rank_series.py rebuild`.
+    """
+    @functools.wraps(method)
+    def wrapper(self, results, *args, **kwargs):
+        outcome = method(self, results, *args, **kwargs)
+        if results and config.RANK_SERIES_ENABLED:
+            try:
+                get_store().update(results)
+            except (sqlite3.Error, OSError, ValueError) as e:
+                print(f"Warning: could not update rank series: {e}")
+        return outcome
+    return wrapper
+
+
+def format_series(view: DayView) -> Dict:
+    """
+    Convert a series view to the JSON shape used by the web API
+
+    Args:
+        view: DayView of one series
+
+    Returns:
+        Dictionary with the checked dates and their positions (None when not found); failed days are left out
+    """
+    positions = view.positions
+    checked = np.flatnonzero((positions != EMPTY) & (positions != ERROR))
+    dates = np.datetime_as_string((view.first_day + checked).astype('datetime64[D]')).tolist()
+    return {
+        'dates': dates,
+        'positions': [None if value == NOT_FOUND else value for value in positions[checked].tolist()],
+        'count': len(dates)
+    }
+
+
+def main():
+    """Show or rebuild the rank series store via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Memory-mapped daily rank series',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Daily positions of one keyword
+  python rank_series.py show -u https://www.example.com -k "AI tools"
+
+  # Size of the store
+  python rank_series.py stats
+
+  # Rebuild the store from stored history (e.g. after enabling it on an existing document)
+  python rank_series.py rebuild
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show_parser = subparsers.add_parser('show', help='Print the daily positions of one series')
+    show_parser.add_argument('-u', '--url', required=True, help='Website URL')
+    show_parser.add_argument('-k', '--keyword', required=True, help='Keyword')
+    show_parser.add_argument('-l', '--location', default=DEFAULT_LOCATION,
+                             help=f'Location (default: {DEFAULT_LOCATION})')
+    show_parser.add_argument('--since', help='First date (YYYY-MM-DD)')
+    show_parser.add_argument('--until', help='Last date (YYYY-MM-DD)')
+
+    subparsers.add_parser('stats', help='Print the size of the store')
+    rebuild_parser = subparsers.add_parser('rebuild', help='Rebuild the store from stored history')
+    rebuild_parser.add_argument('-l', '--location', default=DEFAULT_LOCATION,
+                                help=f'Location of the rebuilt series (default: {DEFAULT_LOCATION})')
+    args = parser.parse_args()
+
+    store = get_store()
+    if args.command == 'rebuild':
+        from main import StorageManager
+        count = store.rebuild(StorageManager().get_all_results(), args.location)
+        print(f"✅ Rebuilt rank series from {count} daily results ({store.count()} series)")
+        return
+
+    if args.command == 'stats':
+        view = store.matrix()
+        days, series = view.positions.shape
+        if not days:
+            print("The rank series store is empty. Run a rank check or `python rank_series.py rebuild`.")
+            return
+        print(f"Series: {series}")
+        print(f"Days:   {days} ({format_day(view.first_day)} to {format_day(view.first_day + days - 1)})")
+        print(f"Cells:  {int(((view.positions != EMPTY) & (view.positions != ERROR)).sum())} checked")
+        return
+
+    since = parse_day(args.since) if args.since else None
+    until = parse_day(args.until) if args.until else None
+    if (args.since and since is None) or (args.until and until is None):
+        print("❌ Dates must use YYYY-MM-DD format")
+        sys.exit(1)
+
+    view = store.series(args.url, args.keyword, args.location, since, until)
+    if view is None:
+        print("No series recorded for this keyword. Run a rank check or `python rank_series.py rebuild`.")
+        sys.exit(1)
+
+    series = format_series(view)
+    for checked_on, position in zip(series['dates'], series['positions']):
+        print(f"{checked_on}  {'not found' if position is None else position}")
+
+
+if __name__ == '__main__':
+    main()
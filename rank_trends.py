@@ -0,0 +1,606 @@
+"""
+Rank Trends Module
+Vectorized rank-trend analytics (deltas, moving averages, best/worst, visibility) over stored history
+"""
+import sys
+import json
+import argparse
+import threading
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+from rank_series import EMPTY, ERROR, NOT_FOUND, POSITION_MAX, get_store
+import config
+
+# Estimated click-through rate by organic position (1-20), used for visibility scores
+CTR_CURVE = np.array([
+    0.317, 0.247, 0.187, 0.136, 0.095, 0.062, 0.042, 0.031, 0.028, 0.025,
+    0.020, 0.018, 0.016, 0.014, 0.012, 0.010, 0.009, 0.008, 0.007, 0.006
+], dtype=np.float32)
+
+SECONDS_PER_DAY = 86400
+
+# Days of the series matrix reduced at a time, and first tail read for recent-check columns
+SCAN_ROWS = 128
+TAIL_ROWS = 64
+
+# Last ingested rows compared on each refresh to tell a pure extension from a reshuffled read
+BOUNDARY_ROWS = 8
+
+
+def visibility(positions: np.ndarray) -> np.ndarray:
+    """
+    Convert positions to visibility scores (0-100, estimated share of clicks)
+
+    Args:
+        positions: Float array of positions; NaN means not found
+
+    Returns:
+        Float array of scores
+    """
+    scores = np.zeros(positions.shape, dtype=np.float32)
+    ranked = ~np.isnan(positions) & (positions >= 1) & (positions <= len(CTR_CURVE))
+    scores[ranked] = CTR_CURVE[positions[ranked].astype(np.int64) - 1] * 100
+    return scores
+
+
+# Visibility score of every int16 cell value, indexed by the value viewed as uint16
+SCORE_TABLE = np.zeros(1 << 16, dtype=np.float32)
+SCORE_TABLE[1:len(CTR_CURVE) + 1] = CTR_CURVE * 100
+
+
+class _Dictionary:
+    """Maps repeated strings to dense integer ids"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value: str) -> int:
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+
+class TrendCache:
+    """
+    Columnar copy of rank history with cached trend computations
+
+    When a read only extends the previous one, each refresh parses just the
+    rows that were not seen before; trend aggregates are recomputed
+    (vectorized) only when new rows have arrived. Reads of several sheets or
+    shards (partitioned Sheets, sharded Docs) can grow in the middle instead;
+    the cache then starts over.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.keywords = _Dictionary()
+        self.sites = _Dictionary()
+        self._keyword_ids = np.empty(0, dtype=np.int32)
+        self._site_ids = np.empty(0, dtype=np.int32)
+        self._times = np.empty(0, dtype=np.int64)
+        self._positions = np.empty(0, dtype=np.float32)
+        self.rows_seen = 0
+        self._boundary: List[List] = []
+        self._trends = None
+        self._trends_key = None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def update(self, rows: List[List]) -> int:
+        """
+        Ingest rows appended since the last update
+
+        Args:
+            rows: Full history as returned by get_all_results (header row included)
+
+        Returns:
+            Number of newly ingested observations
+        """
+        with self._lock:
+            if (len(rows) < self.rows_seen or
+                    rows[self.rows_seen - len(self._boundary):self.rows_seen] != self._boundary):
+                # Not an extension of the last read: history was rewritten, or rows landed in
+                # an earlier website sheet or shard and shifted the rows after them; start over
+                self.__init__()
+            new_rows = rows[self.rows_seen:]
+            self.rows_seen = len(rows)
+            self._boundary = rows[max(0, len(rows) - BOUNDARY_ROWS):]
+            if not new_rows:
+                return 0
+
+            keyword_ids, site_ids, times, positions = [], [], [], []
+            for row in new_rows:
+                if len(row) < 5 or row[0] == 'Keyword':
+                    continue
+                raw_position = str(row[2]).strip()
+                if raw_position.isdigit():
+                    position = float(raw_position)
+                elif raw_position.startswith('>'):
+                    position = np.nan
+                else:
+                    # Failed checks say nothing about the ranking
+                    continue
+                keyword_ids.append(self.keywords.encode(row[0]))
+                site_ids.append(self.sites.encode(row[1]))
+                times.append(row[4].strip())
+                positions.append(position)
+
+            if not positions:
+                return 0
+
+            parsed_times = self._parse_times(times)
+            valid = parsed_times >= 0
+            self._keyword_ids = np.concatenate([self._keyword_ids, np.array(keyword_ids, dtype=np.int32)[valid]])
+            self._site_ids = np.concatenate([self._site_ids, np.array(site_ids, dtype=np.int32)[valid]])
+            self._times = np.concatenate([self._times, parsed_times[valid]])
+            self._positions = np.concatenate([self._positions, np.array(positions, dtype=np.float32)[valid]])
+            self._trends = None
+            return int(valid.sum())
+
+    @staticmethod
+    def _parse_times(values: List[str]) -> np.ndarray:
+        """Parse 'YYYY-MM-DD HH:MM:SS' strings to epoch seconds (-1 where malformed)"""
+        try:
+            return np.array(values, dtype='datetime64[s]').astype(np.int64)
+        except ValueError:
+            parsed = np.empty(len(values), dtype=np.int64)
+            for index, value in enumerate(values):
+                try:
+                    parsed[index] = np.datetime64(value, 's').astype(np.int64)
+                except ValueError:
+                    parsed[index] = -1
+            return parsed
+
+    def trends(self, window: int = None) -> Dict[str, np.ndarray]:
+        """
+        Compute per-(keyword, site) trend columns
+
+        Args:
+            window: Number of most recent checks in the moving average. If not provided, uses config.TREND_WINDOW
+
+        Returns:
+            Dictionary of equally sized arrays, one entry per series
+        """
+        window = window or config.TREND_WINDOW
+        with self._lock:
+            key = (len(self._positions), window)
+            if self._trends is not None and self._trends_key == key:
+                return self._trends
+            self._trends = self._compute(window)
+            self._trends_key = key
+            return self._trends
+
+    def _compute(self, window: int) -> Dict[str, np.ndarray]:
+        """Vectorized trend computation over all observations"""
+        if not len(self._positions):
+            empty_int = np.empty(0, dtype=np.int64)
+            empty_float = np.empty(0, dtype=np.float32)
+            return {'keyword_id': empty_int, 'site_id': empty_int, 'checks': empty_int, 'last_checked': empty_int,
+                    'latest': empty_float, 'previous': empty_float, 'delta': empty_float, 'week_ago': empty_float,
+                    'week_delta': empty_float, 'moving_average': empty_float, 'best': empty_float,
+                    'worst': empty_float, 'visibility': empty_float, 'average_visibility': empty_float}
+
+        series = self._site_ids.astype(np.int64) * (len(self.keywords.values) + 1) + self._keyword_ids
+        order = np.lexsort((self._times, series))
+        series = series[order]
+        times = self._times[order]
+        positions = self._positions[order]
+        scores = visibility(positions)
+
+        starts = np.flatnonzero(np.r_[True, series[1:] != series[:-1]])
+        ends = np.r_[starts[1:], len(series)]
+        counts = ends - starts
+        last = ends - 1
+
+        latest = positions[last]
+        previous = np.where(counts > 1, positions[np.maximum(last - 1, starts)], np.nan)
+
+        # Last observation at least 7 days before the latest one, within the same series
+        # (series, time) packed into one sorted int64 key; epoch seconds fit in 34 bits
+        keys = (series << 34) + times
+        targets = (series[last] << 34) + times[last] - 7 * SECONDS_PER_DAY
+        week_index = np.searchsorted(keys, targets, side='right') - 1
+        has_week = week_index >= starts
+        week_ago = np.where(has_week, positions[np.clip(week_index, 0, None)], np.nan)
+
+        # NaN-aware per-series aggregates: not-found counts as worse than any position,
+        # so 'worst' is None once a series has dropped out of the results
+        ranked = ~np.isnan(positions)
+        filled_best = np.where(ranked, positions, np.inf)
+        filled_worst = np.where(ranked, positions, -np.inf)
+        best = np.minimum.reduceat(filled_best, starts)
+        worst = np.maximum.reduceat(filled_worst, starts)
+        best[np.isinf(best)] = np.nan
+        worst[np.isinf(worst)] = np.nan
+        worst[np.add.reduceat((~ranked).astype(np.int64), starts) > 0] = np.nan
+
+        # Moving average of the last `window` ranked checks per series via cumulative sums
+        cumulative_sum = np.r_[0.0, np.cumsum(np.where(ranked, positions, 0.0))]
+        cumulative_count = np.r_[0, np.cumsum(ranked.astype(np.int64))]
+        window_start = np.maximum(starts, ends - window)
+        window_count = cumulative_count[ends] - cumulative_count[window_start]
+        window_sum = cumulative_sum[ends] - cumulative_sum[window_start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moving_average = np.where(window_count > 0, window_sum / window_count, np.nan)
+
+        series_ids = series[starts]
+        keyword_count = len(self.keywords.values) + 1
+        return {
+            'keyword_id': series_ids % keyword_count,
+            'site_id': series_ids // keyword_count,
+            'checks': counts,
+            'last_checked': times[last],
+            'latest': latest,
+            'previous': previous,
+            'delta': previous - latest,
+            'week_ago': week_ago,
+            'week_delta': week_ago - latest,
+            'moving_average': moving_average.astype(np.float32),
+            'best': best,
+            'worst': worst,
+            'visibility': scores[last],
+            'average_visibility': np.add.reduceat(scores, starts) / counts
+        }
+
+    def report(self, website_url: str = None, keyword: str = None, window: int = None,
+               limit: int = None) -> Dict:
+        """
+        Build a JSON-friendly trend report
+
+        Positive deltas mean the ranking improved (moved closer to position 1).
+        Positions are None when the site was not found.
+
+        Args:
+            website_url: Only include this website
+            keyword: Only include this keyword
+            window: Moving average window (checks)
+            limit: Maximum number of series to return (largest visibility first)
+
+        Returns:
+            Dictionary with 'series' rows and per-site 'sites' summaries
+        """
+        return _build_report(self.trends(window), self.keywords, self.sites, len(self), website_url, keyword, limit)
+
+
+class _BlockTotals(NamedTuple):
+    """All-history aggregates of one SCAN_ROWS block of the series matrix"""
+    rows: int
+    checks: np.ndarray
+    last: np.ndarray        # Matrix row of the last check, -1 if none
+    best: np.ndarray        # Smallest cell as uint16 minus one: positions sort below every sentinel
+    worst: np.ndarray
+    dropped: np.ndarray
+    score_sum: np.ndarray
+
+
+def _scan_block(block: np.ndarray, start: int) -> _BlockTotals:
+    """Reduce one block of matrix rows starting at row `start`"""
+    observed = (block != EMPTY) & (block != ERROR)
+    seen = observed.any(axis=0)
+    unsigned = block.view(np.uint16)
+    return _BlockTotals(
+        rows=len(block),
+        checks=np.count_nonzero(observed, axis=0),
+        last=np.where(seen, start + len(block) - 1 - observed[::-1].argmax(axis=0), -1),
+        best=(unsigned - np.uint16(1)).min(axis=0),
+        worst=block.max(axis=0),
+        dropped=(block == NOT_FOUND).any(axis=0),
+        # Cells as unsigned indexes into the score table: sentinels land on zero scores
+        score_sum=SCORE_TABLE[unsigned].sum(axis=0, dtype=np.float64)
+    )
+
+
+def _widen(totals: _BlockTotals, count: int) -> _BlockTotals:
+    """Pad block totals with empty entries for series added since they were computed"""
+    missing = count - len(totals.checks)
+    if missing <= 0:
+        return totals
+    fill = (0, -1, np.iinfo(np.uint16).max, 0, False, 0.0)
+    return _BlockTotals(totals.rows, *(np.concatenate([column, np.full(missing, value, dtype=column.dtype)])
+                                       for column, value in zip(totals[1:], fill)))
+
+
+def matrix_trends(matrix: np.ndarray, first_day: int, window: int,
+                  blocks: List[_BlockTotals] = None) -> Dict[str, np.ndarray]:
+    """
+    Compute trend columns from a day-major matrix of daily cells (see rank_series.py)
+
+    Same columns and meaning as TrendCache.trends, with one observation per checked
+    day. All-history aggregates are reduced per block of SCAN_ROWS days; the columns
+    that depend on the most recent checks only read the tail of the matrix, widened
+    for the series whose last `window` checks or week-ago check lie further back.
+
+    Args:
+        matrix: int16 (days x series) cells: positions, NOT_FOUND, ERROR or EMPTY
+        first_day: Day index of the first row
+        window: Number of most recent checks in the moving average
+        blocks: Block totals from an earlier call on the same matrix, updated in place. Blocks still
+                listed are reused, so a caller that drops the blocks holding changed days only rescans those
+
+    Returns:
+        Dictionary of arrays with one entry per matrix column (checks is 0 for series never checked)
+    """
+    days, count = matrix.shape
+    blocks = [] if blocks is None else blocks
+    for index, start in enumerate(range(0, days, SCAN_ROWS)):
+        block = matrix[start:start + SCAN_ROWS]
+        if index < len(blocks) and blocks[index].rows == len(block):
+            blocks[index] = _widen(blocks[index], count)
+        else:
+            del blocks[index:]
+            blocks.append(_scan_block(block, start))
+    del blocks[len(range(0, days, SCAN_ROWS)):]
+
+    if blocks:
+        checks = np.sum([totals.checks for totals in blocks], axis=0, dtype=np.int64)
+        last = np.max([totals.last for totals in blocks], axis=0)
+        best = np.min([totals.best for totals in blocks], axis=0).astype(np.int64) + 1
+        worst = np.max([totals.worst for totals in blocks], axis=0)
+        dropped = np.any([totals.dropped for totals in blocks], axis=0)
+        score_sum = np.sum([totals.score_sum for totals in blocks], axis=0)
+    else:
+        checks = last = best = worst = np.zeros(count, dtype=np.int64)
+        dropped = np.zeros(count, dtype=bool)
+        score_sum = np.zeros(count, dtype=np.float64)
+
+    latest = np.full(count, np.nan, dtype=np.float32)
+    previous = latest.copy()
+    week_ago = latest.copy()
+    moving_average = latest.copy()
+    needed = max(window, 2)
+    pending = np.flatnonzero(checks)
+    tail = TAIL_ROWS
+    while len(pending):
+        tail = min(tail, days)
+        # Row 0 is the most recent day
+        block = matrix[days - tail:, pending][::-1]
+        observed = (block != EMPTY) & (block != ERROR)
+        order = np.cumsum(observed, axis=0)
+        found_count = order[-1]
+        latest_row = observed.argmax(axis=0)
+        in_week = observed & (np.arange(tail)[:, None] >= latest_row + 7)
+        has_week = in_week.any(axis=0)
+        done = (found_count == checks[pending]) | ((found_count >= needed) & has_week)
+
+        values = np.where(block > 0, block, np.nan).astype(np.float32)
+        columns = np.arange(len(pending))
+        previous_row = (observed & (order == 2)).argmax(axis=0)
+        week_row = in_week.argmax(axis=0)
+        in_window = observed & (order <= window) & (block > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            window_average = np.where(in_window, block, 0).sum(axis=0) / in_window.sum(axis=0)
+
+        series = pending[done]
+        latest[series] = values[latest_row, columns][done]
+        previous[series] = np.where(found_count >= 2, values[previous_row, columns], np.nan)[done]
+        week_ago[series] = np.where(has_week, values[week_row, columns], np.nan)[done]
+        moving_average[series] = window_average[done]
+        pending = pending[~done]
+        tail *= 4
+
+    tracked = checks > 0
+    best = np.where(tracked & (best <= POSITION_MAX), best, np.nan).astype(np.float32)
+    worst = np.where(tracked & (worst > 0) & ~dropped, worst, np.nan).astype(np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average_visibility = np.where(tracked, score_sum / checks, np.nan)
+    return {
+        'checks': checks,
+        'last_checked': (first_day + last) * SECONDS_PER_DAY,
+        'latest': latest,
+        'previous': previous,
+        'delta': previous - latest,
+        'week_ago': week_ago,
+        'week_delta': week_ago - latest,
+        'moving_average': moving_average,
+        'best': best,
+        'worst': worst,
+        'visibility': visibility(latest),
+        'average_visibility': average_visibility
+    }
+
+
+class SeriesTrendCache:
+    """Trend computations served from the memory-mapped rank series store instead of stored history"""
+
+    def __init__(self, store=None):
+        """
+        Initialize the Series Trend Cache
+
+        Args:
+            store: RankSeriesStore. If not provided, uses the shared store of config.RANK_SERIES_DIR
+        """
+        self._store = store
+        self._lock = threading.Lock()
+        self.keywords = _Dictionary()
+        self.sites = _Dictionary()
+        self.locations = _Dictionary()
+        self.observations = 0
+        self._trends = None
+        self._trends_key = None
+        self._blocks: List[_BlockTotals] = []
+        self._column_ids = np.empty((0, 3), dtype=np.int64)
+        self._scanned = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    def trends(self, window: int = None) -> Dict[str, np.ndarray]:
+        """
+        Compute per-(keyword, site, location) trend columns (see TrendCache.trends)
+
+        Args:
+            window: Number of most recent checks in the moving average. If not provided, uses config.TREND_WINDOW
+
+        Returns:
+            Dictionary of equally sized arrays, one entry per checked series
+        """
+        window = window or config.TREND_WINDOW
+        with self._lock:
+            key = (self.store.version, window)
+            if self._trends is not None and self._trends_key == key:
+                return self._trends
+
+            resets, _, writes = key[0]
+            view = self.store.matrix()
+            # Only rescan the blocks holding days written since the last scan
+            changed = None
+            if self._scanned and self._scanned[:2] == (resets, view.first_day):
+                changed = self.store.changed_since(self._scanned[2])
+            if changed is None:
+                self._blocks = []
+                if not self._scanned or self._scanned[0] != resets:
+                    self._column_ids = np.empty((0, 3), dtype=np.int64)
+            else:
+                del self._blocks[max(0, changed - view.first_day) // SCAN_ROWS:]
+            self._scanned = (resets, view.first_day, writes)
+
+            count = view.positions.shape[1]
+            if len(self._column_ids) < count:
+                added = self.store.keys()[len(self._column_ids):count]
+                self._column_ids = np.concatenate([self._column_ids, np.array(
+                    [(self.sites.encode(site), self.keywords.encode(keyword), self.locations.encode(location))
+                     for site, keyword, location in added], dtype=np.int64).reshape(-1, 3)])
+
+            trends = matrix_trends(view.positions, view.first_day, window, self._blocks)
+            checked = np.flatnonzero(trends['checks'])
+            trends = {name: column[checked] for name, column in trends.items()}
+            for part, name in enumerate(('site_id', 'keyword_id', 'location_id')):
+                trends[name] = self._column_ids[checked, part]
+
+            self.observations = int(trends['checks'].sum())
+            self._trends = trends
+            self._trends_key = key
+            return trends
+
+    def report(self, website_url: str = None, keyword: str = None, window: int = None,
+               limit: int = None) -> Dict:
+        """Build a JSON-friendly trend report (see TrendCache.report); series rows also carry their location"""
+        trends = self.trends(window)
+        return _build_report(trends, self.keywords, self.sites, self.observations, website_url, keyword, limit,
+                             self.locations)
+
+
+def _build_report(trends: Dict[str, np.ndarray], keywords: _Dictionary, sites: _Dictionary, observations: int,
+                  website_url: str = None, keyword: str = None, limit: int = None,
+                  locations: _Dictionary = None) -> Dict:
+    """Filter, rank and format trend columns (see TrendCache.report)"""
+    mask = np.ones(len(trends['checks']), dtype=bool)
+    if website_url:
+        site_id = sites.ids.get(website_url)
+        mask &= trends['site_id'] == (-1 if site_id is None else site_id)
+    if keyword:
+        keyword_id = keywords.ids.get(keyword)
+        mask &= trends['keyword_id'] == (-1 if keyword_id is None else keyword_id)
+
+    selected = np.flatnonzero(mask)
+    selected = selected[np.argsort(-trends['visibility'][selected], kind='stable')]
+    if limit:
+        selected = selected[:limit]
+
+    def value(column: str, index: int) -> Optional[float]:
+        item = trends[column][index]
+        return None if np.isnan(item) else round(float(item), 2)
+
+    series = []
+    for index in selected:
+        row = {
+            'keyword': keywords.values[trends['keyword_id'][index]],
+            'website_url': sites.values[trends['site_id'][index]],
+            'checks': int(trends['checks'][index]),
+            'last_checked': str(np.datetime64(int(trends['last_checked'][index]), 's')).replace('T', ' '),
+            'latest': value('latest', index),
+            'previous': value('previous', index),
+            'delta': value('delta', index),
+            'week_ago': value('week_ago', index),
+            'week_delta': value('week_delta', index),
+            'moving_average': value('moving_average', index),
+            'best': value('best', index),
+            'worst': value('worst', index),
+            'visibility': value('visibility', index),
+            'average_visibility': value('average_visibility', index)
+        }
+        if locations is not None:
+            row['location'] = locations.values[trends['location_id'][index]]
+        series.append(row)
+
+    # Per-site totals over all matching series (not just the returned page)
+    site_ids = trends['site_id'][mask]
+    unique_sites, inverse = np.unique(site_ids, return_inverse=True)
+    site_visibility = np.bincount(inverse, weights=trends['visibility'][mask], minlength=len(unique_sites))
+    site_keywords = np.bincount(inverse, minlength=len(unique_sites))
+    sites_summary = [{
+        'website_url': sites.values[site_id],
+        'keywords': int(site_keywords[position]),
+        'visibility': round(float(site_visibility[position]), 2)
+    } for position, site_id in enumerate(unique_sites)]
+
+    return {
+        'observations': observations,
+        'series_count': int(mask.sum()),
+        'series': series,
+        'sites': sites_summary
+    }
+
+
+def main():
+    """Print rank trends via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Rank trend analytics over stored history',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Trends for every tracked keyword
+  python rank_trends.py
+
+  # One website, 14-check moving average, as JSON
+  python rank_trends.py -u https://www.example.com --window 14 --json
+
+  # Ten years of daily history from the rank series store
+  python rank_trends.py --series --limit 20
+        """
+    )
+    parser.add_argument('-u', '--url', help='Only show this website URL')
+    parser.add_argument('-k', '--keyword', help='Only show this keyword')
+    parser.add_argument('--window', type=int, default=config.TREND_WINDOW,
+                        help=f'Moving average window in checks (default: {config.TREND_WINDOW})')
+    parser.add_argument('--limit', type=int, help='Maximum number of keywords to show')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--series', action='store_true',
+                        help='Read the rank series store (rank_series.py) instead of stored history')
+    args = parser.parse_args()
+
+    if args.series:
+        cache = SeriesTrendCache()
+    else:
+        from main import StorageManager
+        cache = TrendCache()
+        cache.update(StorageManager().get_all_results())
+    report = cache.report(args.url, args.keyword, args.window, args.limit)
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+
+    def fmt(value) -> str:
+        return '-' if value is None else f"{value:g}"
+
+    print(f"{'Keyword':<40} {'Latest':>6} {'Δ':>6} {'Δ7d':>6} {'MA':>6} {'Best':>5} {'Worst':>5} {'Vis':>6}")
+    for row in report['series']:
+        print(f"{row['keyword'][:40]:<40} {fmt(row['latest']):>6} {fmt(row['delta']):>6} {fmt(row['week_delta']):>6} "
+              f"{fmt(row['moving_average']):>6} {fmt(row['best']):>5} {fmt(row['worst']):>5} {fmt(row['visibility']):>6}")
+    print()
+    for site in report['sites']:
+        print(f"{site['website_url']}: {site['keywords']} keywords, visibility {site['visibility']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Rank Worker Module
+Worker processes that run keyword checks from the shared work queue and save finished jobs
+"""
+import os
+import sys
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from typing import Optional
+from rank_checker import RankChecker
+from rank_result import RankStatus
+from work_queue import Task, WorkQueue
+import config
+
+# Lease renewals per lease period, so one late renewal does not lose the task
+LEASE_RENEWALS = 3
+
+
+def new_worker_id() -> str:
+    """Build a worker identifier that is unique across hosts and processes"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class LeaseHeartbeat:
+    """Renews a task's lease in the background while it is checked (Retry-After pauses and retries can be long)"""
+
+    def __init__(self, queue: WorkQueue, task: Task, worker_id: str, interval: float = None):
+        """
+        Initialize the Lease Heartbeat
+
+        Args:
+            queue: Work queue holding the lease
+            task: Leased task
+            worker_id: Identifier of the worker holding the lease
+            interval: Seconds between renewals. If not provided, a third of the queue's lease time
+        """
+        self.queue = queue
+        self.task = task
+        self.worker_id = worker_id
+        self.interval = queue.lease_seconds / LEASE_RENEWALS if interval is None else interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.extend(self.task.task_id, self.worker_id):
+                    # Handed to another worker; ack() will discard this worker's results
+                    return
+            except sqlite3.Error as e:
+                print(f"Warning: could not renew lease on '{self.task.keyword}': {e}")
+
+
+def save_job(queue: WorkQueue, worker_id: str, storage_manager=None) -> Optional[str]:
+    """
+    Save the results of one completed job, if any is waiting
+
+    Args:
+        queue: Work queue
+        worker_id: Identifier of this worker
+        storage_manager: Storage manager to save to. If not provided, one is created for config.STORAGE_TYPE
+
+    Returns:
+        ID of the saved job, or None if no job was waiting
+    """
+    from main import StorageManager, save_results
+
+    claimed = queue.claim_completed_job(worker_id)
+    if claimed is None:
+        return None
+
+    job_id, sheet_name = claimed
+    results = queue.job_results(job_id)
+    try:
+        save_results(storage_manager or StorageManager(), results, sheet_name)
+    except Exception as e:
+        queue.release_job(job_id, worker_id)
+        print(f"❌ Error saving results of job {job_id}: {e}")
+        return None
+
+    queue.mark_saved(job_id, worker_id)
+    print(f"✅ Saved {len(results)} results of job {job_id}")
+    return job_id
+
+
+def run_worker(queue_path: str = None, max_tasks: int = None, exit_when_idle: bool = False,
+               poll_seconds: float = None, storage_manager=None) -> int:
+    """
+    Lease and run tasks until stopped
+
+    Each task checks one keyword for all of its target websites, renewing its
+    lease while the check runs. Tasks whose checks fail are retried with backoff; completed jobs are saved to storage
+    in one append by whichever worker claims them first.
+
+    Args:
+        queue_path: Work queue database. If not provided, uses config.WORK_QUEUE_DB
+        max_tasks: Stop after running this many tasks
+        exit_when_idle: Stop when no task is pending (or backing off) and no job is waiting to be saved
+        poll_seconds: Sleep between polls of an empty queue. If not provided, uses config.QUEUE_POLL_SECONDS
+        storage_manager: Storage manager to save to. If not provided, one is created when first needed
+
+    Returns:
+        Number of tasks run
+    """
+    queue = WorkQueue(queue_path)
+    worker_id = new_worker_id()
+    poll_seconds = config.QUEUE_POLL_SECONDS if poll_seconds is None else poll_seconds
+    rank_checker = RankChecker()
+    tasks_run = 0
+
+    print(f"Worker {worker_id} started (queue: {queue.path})")
+    while max_tasks is None or tasks_run < max_tasks:
+        if save_job(queue, worker_id, storage_manager):
+            continue
+
+        leased = queue.lease(worker_id)
+        if not leased:
+            if exit_when_idle and not queue.has_pending():
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        task = leased[0]
+        if tasks_run:
+            # Rate limiting between keywords, as in RankChecker.iter_rankings
+            time.sleep(rank_checker.keyword_delay)
+        print(f"Checking keyword: {task.keyword} ({len(task.targets)} targets, attempt {task.attempts})")
+
+        with LeaseHeartbeat(queue, task, worker_id):
+            results = rank_checker.check_targets(task.keyword, task.targets, task.location, max_results=task.depth)
+        tasks_run += 1
+
+        if all(result.status is RankStatus.ERROR for result in results):
+            error = results[0].error
+            if queue.fail(task, worker_id, error):
+                print(f"⚠️  {task.keyword}: {error} (will retry)")
+                continue
+            # Out of attempts: the job reports the error results
+            print(f"❌ {task.keyword}: {error} (giving up after {task.attempts} attempts)")
+            continue
+
+        if not queue.ack(task, worker_id, results):
+            print(f"⚠️  Lease on '{task.keyword}' expired before it finished; results discarded")
+
+    # Save anything this worker completed last
+    while save_job(queue, worker_id, storage_manager):
+        pass
+
+    print(f"Worker {worker_id} stopped after {tasks_run} tasks")
+    return tasks_run
+
+
+def _worker_process(queue_path: Optional[str], max_tasks: Optional[int], exit_when_idle: bool):
+    """Entry point of a child worker process"""
+    try:
+        run_worker(queue_path, max_tasks, exit_when_idle)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    """Run rank workers via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Run keyword checks from the shared work queue',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # One worker per CPU core
+  python rank_worker.py --processes 0
+
+  # Drain the queue with 4 workers, then exit
+  python rank_worker.py --processes 4 --exit-when-idle
+
+  # Show queue and job status
+  python rank_worker.py --stats
+  python rank_worker.py --job 20240101-090000-3fa2c1
+
+Jobs are enqueued with --queue on main.py and scheduler.py, or "queue": true in /api/check-rankings.
+        """
+    )
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='Number of worker processes (0 = one per CPU core, default: 1)')
+    parser.add_argument('--queue-db', help=f'Work queue database (default: {config.WORK_QUEUE_DB})')
+    parser.add_argument('--max-tasks', type=int, help='Stop each worker after this many tasks')
+    parser.add_argument('--exit-when-idle', action='store_true',
+                        help='Stop when the queue is empty instead of polling for new jobs')
+    parser.add_argument('--stats', action='store_true', help='Print task and job counts and exit')
+    parser.add_argument('--job', metavar='JOB_ID', help='Print the status of a job and exit')
+    args = parser.parse_args()
+
+    if args.stats or args.job:
+        queue = WorkQueue(args.queue_db)
+        if args.job:
+            status = queue.job_status(args.job)
+            if status is None:
+                print(f"Error: job not found: {args.job}")
+                sys.exit(1)
+            counts = ', '.join(f"{state}: {count}" for state, count in status['task_states'].items())
+            print(f"Job {args.job} ({status['source']}, {status['priority']}): {status['state']} - {counts}")
+        else:
+            stats = queue.stats()
+            print(f"Tasks: {stats['tasks'] or 'none'}")
+            print(f"Jobs: {stats['jobs'] or 'none'}")
+            print(f"Pending by priority: {stats['pending_by_priority'] or 'none'}")
+        return
+
+    try:
+        RankChecker()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    processes = args.processes or os.cpu_count() or 1
+    if processes == 1:
+        _worker_process(args.queue_db, args.max_tasks, args.exit_when_idle)
+        return
+
+    workers = [
+        multiprocessing.Process(target=_worker_process, args=(args.queue_db, args.max_tasks, args.exit_when_idle))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Children receive the same SIGINT; leases of interrupted tasks expire and are retried
+        for worker in workers:
+            worker.join()
+        print("\n\nWorkers stopped.")
+
+
+if __name__ == '__main__':
+    main()
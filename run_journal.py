@@ -0,0 +1,218 @@
+"""
+Run Journal Module
+Records the progress of a rank tracking run so it can be resumed after a crash
+"""
+import os
+import json
+import time
+import uuid
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from rank_result import RankResult
+import config
+
+
+class RunJournal:
+    """Append-only journal of completed keyword results for a single run"""
+
+    def __init__(self, run_id: str = None, directory: str = None):
+        """
+        Initialize the Run Journal
+
+        Args:
+            run_id: Identifier of the run. A new one is generated if not provided
+            directory: Directory holding journal files. If not provided, uses config.RUN_JOURNAL_DIR
+        """
+        self.directory = directory or config.RUN_JOURNAL_DIR
+        self.run_id = run_id or self.new_run_id()
+        self.path = os.path.join(self.directory, f"{self.run_id}.jsonl")
+
+        self.info = {}
+        self.recorded_count = 0
+        self.flushed_count = 0
+        self.complete = False
+        self.finished_on: Optional[str] = None
+        # Why the last attempt stopped before every keyword was checked, if it recorded one
+        self.stopped_reason: Optional[str] = None
+        self._completed_keys = set()
+        # Only results not yet saved to storage are kept in memory
+        self._pending = deque()
+        # Results are recorded by the checking thread and flushed by the storage thread
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            self._load()
+
+    @staticmethod
+    def new_run_id() -> str:
+        """
+        Generate a new, sortable run identifier
+
+        Returns:
+            Run ID string (e.g. 20240101-090000-3fa2c1)
+        """
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    @staticmethod
+    def result_key(keyword: str, website_url: str, location: str) -> Tuple[str, str, str]:
+        """
+        Build the key identifying one keyword check within a run
+
+        Args:
+            keyword: Search keyword
+            website_url: Website URL being tracked
+            location: Search location
+
+        Returns:
+            Tuple uniquely identifying the check
+        """
+        return (keyword, website_url, location)
+
+    def exists(self) -> bool:
+        """Return True if the journal file already exists on disk"""
+        return os.path.exists(self.path)
+
+    def _load(self):
+        """Replay the journal file into memory"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash mid-write can leave a truncated final line
+                    continue
+
+                entry_type = entry.get('type')
+                if entry_type == 'start':
+                    self.info = entry
+                elif entry_type == 'result':
+                    result = RankResult.from_dict(entry['result'], entry.get('location'))
+                    self._pending.append(result)
+                    self.recorded_count += 1
+                    self._completed_keys.add(self.result_key(
+                        result.get('keyword', ''),
+                        result.get('website_url', ''),
+                        entry.get('location', '')
+                    ))
+                elif entry_type == 'flushed':
+                    self.flushed_count = entry.get('count', self.flushed_count)
+                    self._drop_flushed()
+                elif entry_type == 'complete':
+                    self.complete = True
+                    self.finished_on = entry.get('finished_on')
+                elif entry_type == 'stopped':
+                    self.stopped_reason = entry.get('reason')
+
+    def _drop_flushed(self):
+        """Forget results that are already saved to storage"""
+        while len(self._pending) > self.recorded_count - self.flushed_count:
+            self._pending.popleft()
+
+    def _write(self, entry: Dict):
+        """Append a single entry to the journal file and flush it to disk"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, url: str, location: str, sheet_name: str):
+        """
+        Record the start of a run (no-op if the journal already has a start entry)
+
+        Args:
+            url: Website URL to track
+            location: Search location
+            sheet_name: Google Sheets sheet name
+        """
+        if self.info:
+            return
+        self.info = {
+            'type': 'start',
+            'run_id': self.run_id,
+            'url': url,
+            'location': location,
+            'sheet_name': sheet_name,
+            'started_on': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self._write(self.info)
+
+    def is_done(self, keyword: str, website_url: str, location: str) -> bool:
+        """
+        Check whether a keyword has already been checked in this run
+
+        Args:
+            keyword: Search keyword
+            website_url: Website URL being tracked
+            location: Search location
+
+        Returns:
+            True if a result for the keyword is already journaled
+        """
+        return self.result_key(keyword, website_url, location) in self._completed_keys
+
+    def record_result(self, result: RankResult, location: str):
+        """
+        Record a completed keyword result
+
+        Args:
+            result: Ranking result
+            location: Search location used for the check
+        """
+        with self._lock:
+            self._write({'type': 'result', 'location': location, 'result': dict(result)})
+            self._pending.append(result)
+            self.recorded_count += 1
+            self._completed_keys.add(self.result_key(
+                result.get('keyword', ''),
+                result.get('website_url', ''),
+                location
+            ))
+
+    def pending_results(self) -> List[RankResult]:
+        """
+        Get results that have been journaled but not yet saved to storage
+
+        Returns:
+            List of ranking results
+        """
+        with self._lock:
+            return list(self._pending)
+
+    def mark_flushed(self, count: int):
+        """
+        Record that additional results have been saved to storage
+
+        Results are saved in the order they were recorded, so this releases the
+        oldest count pending results.
+
+        Args:
+            count: Number of newly saved results
+        """
+        with self._lock:
+            self.flushed_count += count
+            self._drop_flushed()
+            self._write({'type': 'flushed', 'count': self.flushed_count})
+
+    def mark_stopped(self, reason: str):
+        """
+        Record that the run stopped before checking every keyword
+
+        Args:
+            reason: Why the run stopped (shown when it is resumed)
+        """
+        with self._lock:
+            self.stopped_reason = reason
+            self._write({'type': 'stopped', 'reason': reason,
+                         'stopped_on': time.strftime('%Y-%m-%d %H:%M:%S')})
+
+    def mark_complete(self):
+        """Record that the run finished"""
+        with self._lock:
+            self.complete = True
+            self.finished_on = time.strftime('%Y-%m-%d %H:%M:%S')
+            self._write({'type': 'complete', 'finished_on': self.finished_on})
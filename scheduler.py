@@ -6,24 +6,42 @@ import schedule
 import time
 import sys
 from datetime import datetime
-from main import run_rank_tracking
+from main import enqueue_rank_tracking, run_rank_tracking, report_load_stats
+from keyword_loader import LoadStats, iter_keyword_rows
+import metrics
+import profiling
+import config
 import argparse
 
 
-def run_scheduled_check(url: str, keywords: list, location: str = "United States", sheet_name: str = "Rank Tracking"):
+def run_scheduled_check(url: str, keywords: list, location: str = "United States", sheet_name: str = "Rank Tracking",
+                        run_id: str = None, keywords_file: str = None, use_queue: bool = False):
     """
     Wrapper function to run rank check with specific parameters
     
     Args:
         url: Website URL to track
-        keywords: List of keywords
+        keywords: List of keywords (ignored when keywords_file is given)
         location: Search location
         sheet_name: Google Sheets sheet name
+        run_id: ID of an interrupted run to resume (new run if not provided)
+        keywords_file: CSV file re-read (streamed) on every run
+        use_queue: Enqueue the checks for rank_worker.py processes instead of running them here
     """
     print(f"\n[{datetime.now()}] Running scheduled rank check...")
     
     try:
-        run_rank_tracking(url, keywords, location, sheet_name)
+        stats = None
+        if keywords_file:
+            stats = LoadStats()
+            keywords = iter_keyword_rows(keywords_file, stats)
+        if use_queue:
+            enqueue_rank_tracking(url, keywords, location, sheet_name, source='scheduler')
+        else:
+            with profiling.session('scheduled-run'):
+                run_rank_tracking(url, keywords, location, sheet_name, run_id=run_id, collect_results=False)
+        if stats is not None:
+            report_load_stats(stats)
     except Exception as e:
         print(f"Error during scheduled check: {e}")
 
@@ -43,17 +61,39 @@ Examples:
   
   # Every 6 hours
   python scheduler.py -u https://www.example.com -k "AI tools" --hours 6
+  
+  # Keywords from a CSV file, re-read on every run
+  python scheduler.py -u https://www.example.com -f keywords.csv --daily 09:00
+  
+  # Enqueue each run for rank_worker.py processes
+  python scheduler.py -u https://www.example.com -f keywords.csv --daily 09:00 --queue
+  
+  # Resume an interrupted run as the initial check, then continue the schedule
+  python scheduler.py -u https://www.example.com -k "AI tools" --daily 09:00 --resume 20240101-090000-3fa2c1
         """
     )
     
     parser.add_argument('-u', '--url', required=True,
                        help='Website URL to track')
-    parser.add_argument('-k', '--keywords', nargs='+', required=True,
+    keyword_source = parser.add_mutually_exclusive_group(required=True)
+    keyword_source.add_argument('-k', '--keywords', nargs='+',
                        help='Keywords to check')
+    keyword_source.add_argument('-f', '--file',
+                       help='CSV file with keywords (optional url, location and depth columns)')
     parser.add_argument('--location', default='United States',
                        help='Search location')
     parser.add_argument('--sheet-name', default='Rank Tracking',
                        help='Google Sheets sheet name')
+    parser.add_argument('--metrics-port', type=int, default=config.METRICS_PORT,
+                       help='Serve Prometheus metrics on this port (default: METRICS_PORT env, disabled if unset)')
+    parser.add_argument('--profile', choices=profiling.PROFILE_MODES,
+                       help='Profile each scheduled run (cprofile or sampling)')
+    parser.add_argument('--profile-threshold-ms', type=float, default=None,
+                       help='Only write profiles for runs slower than this (default: PROFILE_THRESHOLD_MS)')
+    parser.add_argument('--resume', metavar='RUN_ID',
+                       help='Resume an interrupted run as the initial check')
+    parser.add_argument('--queue', action='store_true',
+                       help='Enqueue each run for rank_worker.py processes instead of running it here')
     
     # Scheduling options
     parser.add_argument('--daily', metavar='TIME',
@@ -66,6 +106,8 @@ Examples:
                        help='Run every N minutes')
     
     args = parser.parse_args()
+    if args.queue and args.resume:
+        parser.error('--resume cannot be combined with --queue (queued jobs are retried by the workers)')
     
     # Set up schedule
     if args.daily:
@@ -74,7 +116,9 @@ Examples:
             args.url, 
             args.keywords, 
             args.location, 
-            args.sheet_name
+            args.sheet_name,
+            keywords_file=args.file,
+            use_queue=args.queue
         )
         print(f"Scheduled daily check at {args.daily}")
     
@@ -99,7 +143,9 @@ Examples:
             args.url,
             args.keywords,
             args.location,
-            args.sheet_name
+            args.sheet_name,
+            keywords_file=args.file,
+            use_queue=args.queue
         )
         print(f"Scheduled weekly check on {day} at {time_str}")
     
@@ -109,7 +155,9 @@ Examples:
             args.url,
             args.keywords,
             args.location,
-            args.sheet_name
+            args.sheet_name,
+            keywords_file=args.file,
+            use_queue=args.queue
         )
         print(f"Scheduled check every {args.hours} hours")
     
@@ -119,7 +167,9 @@ Examples:
             args.url,
             args.keywords,
             args.location,
-            args.sheet_name
+            args.sheet_name,
+            keywords_file=args.file,
+            use_queue=args.queue
         )
         print(f"Scheduled check every {args.minutes} minutes")
     
@@ -127,9 +177,17 @@ Examples:
         print("Error: Must specify a schedule (--daily, --weekly, --hours, or --minutes)")
         sys.exit(1)
     
+    if args.profile:
+        profiling.configure(args.profile, args.profile_threshold_ms)
+    
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+        print(f"Metrics available at http://localhost:{args.metrics_port}/metrics")
+    
     # Run initial check
     print("\nRunning initial check...")
-    run_scheduled_check(args.url, args.keywords, args.location, args.sheet_name)
+    run_scheduled_check(args.url, args.keywords, args.location, args.sheet_name, run_id=args.resume,
+                        keywords_file=args.file, use_queue=args.queue)
     
     # Keep scheduler running
     print("\nScheduler running. Press Ctrl+C to stop.\n")
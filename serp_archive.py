@@ -0,0 +1,370 @@
+"""
+SERP Archive Module
+Stores every fetched SERP page in a compressed, content-addressed local archive
+and re-scores archived checks for any domain or match rule without API calls
+"""
+import os
+import sys
+import csv
+import gzip
+import time
+import uuid
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+from rank_checker import RankChecker
+import fast_json
+import config
+
+# Match rules supported by rescoring
+MATCH_RULES = ('domain', 'subdomain', 'prefix')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    check_id TEXT NOT NULL,
+    query TEXT NOT NULL,
+    location TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_by_query ON pages (query, location, fetched_at);
+CREATE INDEX IF NOT EXISTS pages_by_check ON pages (check_id, start);
+"""
+
+
+class SerpArchive:
+    """Content-addressed store of raw SerpAPI payloads with a SQLite index"""
+
+    def __init__(self, directory: str = None):
+        """
+        Initialize the SERP Archive
+
+        Args:
+            directory: Archive root. If not provided, uses config.SERP_ARCHIVE_DIR
+        """
+        self.directory = directory or config.SERP_ARCHIVE_DIR
+        self.objects_dir = os.path.join(self.directory, 'objects')
+        self.index_path = os.path.join(self.directory, 'index.db')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (checks may run on several threads)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.index_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def new_check_id() -> str:
+        """Generate an ID grouping the pages fetched by one keyword check"""
+        return uuid.uuid4().hex
+
+    def _object_path(self, digest: str) -> str:
+        """Return the file path of an archived payload"""
+        return os.path.join(self.objects_dir, digest[:2], f"{digest[2:]}.json.gz")
+
+    def store(self, check_id: str, query: str, location: str, start: int, payload: bytes,
+              fetched_at: float = None) -> str:
+        """
+        Archive one raw SERP page
+
+        Identical payloads are stored once; the index still records every fetch.
+
+        Args:
+            check_id: ID of the keyword check the page belongs to
+            query: Search keyword
+            location: Search location
+            start: Result offset of the page
+            payload: Raw JSON response body
+            fetched_at: Fetch time (epoch seconds). Defaults to now
+
+        Returns:
+            SHA-256 digest of the payload
+        """
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self._object_path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(payload, compresslevel=6, mtime=0))
+            os.replace(tmp_path, path)
+
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'INSERT INTO pages (check_id, query, location, start, fetched_at, digest) VALUES (?, ?, ?, ?, ?, ?)',
+                (check_id, query, location or '', start, fetched_at or time.time(), digest)
+            )
+        return digest
+
+    def load(self, digest: str, serp_only: bool = False) -> Dict:
+        """
+        Load an archived payload
+
+        Args:
+            digest: Payload digest returned by store()
+            serp_only: Only decode what rank scoring needs (see fast_json.extract_serp)
+
+        Returns:
+            Decoded SERP JSON
+        """
+        with open(self._object_path(digest), 'rb') as f:
+            payload = gzip.decompress(f.read())
+        return fast_json.extract_serp(payload) if serp_only else fast_json.loads(payload)
+
+    def iter_checks(self, query: str = None, location: str = None, since: float = None,
+                    until: float = None) -> Iterator[Tuple[str, str, str, float, List[Tuple[int, str]]]]:
+        """
+        Iterate archived keyword checks in fetch order
+
+        Args:
+            query: Only include checks for this keyword
+            location: Only include checks for this location
+            since: Only include checks fetched at or after this time (epoch seconds)
+            until: Only include checks fetched before this time (epoch seconds)
+
+        Yields:
+            (check_id, query, location, fetched_at, [(start, digest), ...]) per check
+        """
+        clauses = []
+        params = []
+        if query:
+            clauses.append('query = ?')
+            params.append(query)
+        if location:
+            clauses.append('location = ?')
+            params.append(location)
+        if since:
+            clauses.append('fetched_at >= ?')
+            params.append(since)
+        if until:
+            clauses.append('fetched_at < ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        sql = (f'SELECT check_id, query, location, MIN(fetched_at), GROUP_CONCAT(start || ":" || digest) '
+               f'FROM pages {where} GROUP BY check_id ORDER BY MIN(fetched_at)')
+        for check_id, check_query, check_location, fetched_at, pages in self._connection().execute(sql, params):
+            page_list = []
+            for item in pages.split(','):
+                start, digest = item.split(':', 1)
+                page_list.append((int(start), digest))
+            page_list.sort()
+            yield check_id, check_query, check_location, fetched_at, page_list
+
+    def stats(self) -> Dict:
+        """Return page/object counts and on-disk size of the archive"""
+        connection = self._connection()
+        pages, checks = connection.execute('SELECT COUNT(*), COUNT(DISTINCT check_id) FROM pages').fetchone()
+        objects = 0
+        size = 0
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                objects += 1
+                size += os.path.getsize(os.path.join(root, name))
+        return {'checks': checks, 'pages': pages, 'objects': objects, 'bytes': size}
+
+
+def matches(result_url: str, target: str, rule: str = 'domain') -> bool:
+    """
+    Check whether a SERP result URL matches a target under a match rule
+
+    Args:
+        result_url: URL of an organic result
+        target: Target domain or URL
+        rule: 'domain' (same domain, as used by RankChecker), 'subdomain'
+              (domain or any of its subdomains) or 'prefix' (normalized URL prefix)
+
+    Returns:
+        True if the result matches
+    """
+    if rule == 'prefix':
+        return RankChecker.normalize_url(result_url).startswith(RankChecker.normalize_url(target))
+
+    result_domain = RankChecker.extract_domain(result_url)
+    target_domain = RankChecker.extract_domain(target)
+    if rule == 'subdomain':
+        return result_domain == target_domain or result_domain.endswith('.' + target_domain)
+    return result_domain == target_domain
+
+
+def score_pages(pages: List[Dict], starts: List[int], targets: List[str], rule: str) -> Dict[str, Optional[int]]:
+    """
+    Find the first position of each target in a check's archived pages
+
+    Args:
+        pages: Decoded SERP payloads, in page order
+        starts: Result offset of each page
+        targets: Domains or URLs to score
+        rule: Match rule (see matches())
+
+    Returns:
+        Mapping of target to 1-based position, or None if not found
+    """
+    positions = {target: None for target in targets}
+    for data, start in zip(pages, starts):
+        if 'error' in data:
+            continue
+        for index, result in enumerate(data.get('organic_results', [])):
+            url = result.get('link', '')
+            for target in targets:
+                if positions[target] is None and matches(url, target, rule):
+                    positions[target] = start + index + 1
+        if all(position is not None for position in positions.values()):
+            break
+    return positions
+
+
+# Per-process state for rescoring workers
+_worker_archive = None
+_worker_targets = None
+_worker_rule = None
+
+
+def _init_worker(directory: str, targets: List[str], rule: str):
+    """Open the archive once per worker process"""
+    global _worker_archive, _worker_targets, _worker_rule
+    _worker_archive = SerpArchive(directory)
+    _worker_targets = targets
+    _worker_rule = rule
+
+
+def _rescore_check(check) -> List[Dict]:
+    """Rescore one archived check inside a worker process"""
+    check_id, query, location, fetched_at, page_list = check
+    starts = [start for start, _ in page_list]
+    pages = [_worker_archive.load(digest, serp_only=True) for _, digest in page_list]
+    positions = score_pages(pages, starts, _worker_targets, _worker_rule)
+
+    depth = max(starts) + config.RESULTS_PER_PAGE if starts else 0
+    checked_on = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(fetched_at))
+    rows = []
+    for target, position in positions.items():
+        rows.append({
+            'keyword': query,
+            'location': location,
+            'target': target,
+            'ranking_position': position if position is not None else f"> {depth}",
+            'checked_on': checked_on,
+            'check_id': check_id
+        })
+    return rows
+
+
+def rescore(targets: List[str], rule: str = 'domain', directory: str = None, query: str = None,
+            location: str = None, since: float = None, until: float = None,
+            workers: int = None) -> Iterator[Dict]:
+    """
+    Recompute ranking positions across the archive in parallel, with zero API calls
+
+    Positions are only as deep as the pages originally fetched: checks that
+    stopped early report '> depth' for targets not on those pages.
+
+    Args:
+        targets: Domains or URLs to score
+        rule: Match rule (see matches())
+        directory: Archive root. If not provided, uses config.SERP_ARCHIVE_DIR
+        query: Only rescore checks for this keyword
+        location: Only rescore checks for this location
+        since: Only rescore checks fetched at or after this time (epoch seconds)
+        until: Only rescore checks fetched before this time (epoch seconds)
+        workers: Worker processes. Defaults to the number of CPU cores
+
+    Yields:
+        One row per (check, target) with the recomputed position
+    """
+    if rule not in MATCH_RULES:
+        raise ValueError(f"Unknown match rule '{rule}'. Use one of: {', '.join(MATCH_RULES)}")
+
+    directory = directory or config.SERP_ARCHIVE_DIR
+    archive = SerpArchive(directory)
+    checks = archive.iter_checks(query, location, since, until)
+
+    with Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(directory, targets, rule)) as pool:
+        for rows in pool.imap(_rescore_check, checks, chunksize=32):
+            yield from rows
+
+
+def _parse_date(value: str) -> float:
+    """argparse type for YYYY-MM-DD dates, returned as epoch seconds"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date '{value}'. Use YYYY-MM-DD format")
+
+
+def main():
+    """Inspect the SERP archive or rescore it via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Raw SERP archive tools',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Where did a competitor rank in every archived check?
+  python serp_archive.py rescore -d competitor.com
+
+  # Several domains, counting subdomains, written to CSV
+  python serp_archive.py rescore -d example.com -d competitor.com --match subdomain -o rescored.csv
+
+  # Archive size
+  python serp_archive.py stats
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rescore_parser = subparsers.add_parser('rescore', help='Recompute positions from archived SERPs')
+    rescore_parser.add_argument('-d', '--domain', action='append', required=True,
+                                help='Domain or URL to score (repeatable)')
+    rescore_parser.add_argument('--match', choices=MATCH_RULES, default='domain',
+                                help='Match rule (default: domain)')
+    rescore_parser.add_argument('-k', '--keyword', help='Only rescore this keyword')
+    rescore_parser.add_argument('--location', help='Only rescore this location')
+    rescore_parser.add_argument('--since', type=_parse_date, help='Only checks on or after this date (YYYY-MM-DD)')
+    rescore_parser.add_argument('--until', type=_parse_date, help='Only checks before this date (YYYY-MM-DD)')
+    rescore_parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    rescore_parser.add_argument('-o', '--output', help='Write results to this CSV file instead of the console')
+
+    subparsers.add_parser('stats', help='Show archive size')
+
+    parser.add_argument('--archive-dir', help=f'Archive directory (default: {config.SERP_ARCHIVE_DIR})')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        for key, value in SerpArchive(args.archive_dir).stats().items():
+            print(f"{key}: {value}")
+        return
+
+    rows = rescore(args.domain, args.match, args.archive_dir, args.keyword, args.location,
+                   args.since, args.until, args.workers)
+    fields = ['keyword', 'location', 'target', 'ranking_position', 'checked_on', 'check_id']
+
+    count = 0
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        print(f"✅ Rescored {count} rows to {args.output}")
+    else:
+        writer = csv.DictWriter(sys.stdout, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""
+SerpAPI Key Pool Module
+Spreads SerpAPI calls over several accounts: each call goes to the key with the most
+headroom under its hourly rate limit and remaining searches, keys rejected for auth
+or quota are retired for a while, and calls are counted per key
+"""
+import sys
+import time
+import argparse
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+import requests
+import metrics
+import config
+
+# Responses that mean the key itself was rejected
+AUTH_STATUSES = frozenset({401, 403})
+
+# SerpAPI error messages that mean the account has no searches left (sent with 429)
+QUOTA_MESSAGES = ('run out of searches', 'searches for the month')
+
+# Errors that retire a key (a 429 without a quota message only cools it down)
+RETIRE_REASONS = frozenset({'auth', 'quota'})
+
+# Window of the hourly rate limit
+HOUR_SECONDS = 3600
+
+
+class KeyPoolExhausted(requests.exceptions.RequestException):
+    """Every SerpAPI key in the pool is retired"""
+
+
+def mask_key(key: str, index: int) -> str:
+    """Return a printable label for a key: its position in the pool (keeps keys ending alike apart) and last 4 characters"""
+    return f"#{index}...{key[-4:]}"
+
+
+def _optional_int(value: str) -> Optional[int]:
+    """Parse a limit; empty means unknown"""
+    return int(value) if value.strip() else None
+
+
+def parse_keys(spec: str) -> List['SerpKey']:
+    """
+    Parse a comma-separated key list
+
+    Args:
+        spec: Entries of the form key, key:hourly_limit or key:hourly_limit:searches_left
+
+    Returns:
+        SerpKey per distinct key, in order and labelled by position
+
+    Raises:
+        ValueError: If a limit is not a number
+    """
+    keys = {}
+    for entry in (spec or '').split(','):
+        key, _, limits = entry.strip().partition(':')
+        if not key or key in keys:
+            continue
+        hourly_limit, _, searches_left = limits.partition(':')
+        keys[key] = SerpKey(key, _optional_int(hourly_limit), _optional_int(searches_left), index=len(keys) + 1)
+    return list(keys.values())
+
+
+class SerpKey:
+    """One SerpAPI key with its limits, usage and retirement"""
+
+    def __init__(self, key: str, hourly_limit: int = None, searches_left: int = None, index: int = 1):
+        """
+        Initialize the SerpAPI Key
+
+        Args:
+            key: SerpAPI key
+            hourly_limit: Searches per hour the account allows (None if unknown)
+            searches_left: Searches left on the account (None if unknown)
+            index: Position of the key in the pool (1-based), part of its label
+        """
+        self.key = key
+        self.label = mask_key(key, index)
+        self.hourly_limit = hourly_limit
+        self.searches_left = searches_left
+        self.inflight = 0
+        self.calls = 0
+        self.errors = 0
+        # Monotonic start times of the calls made in the last hour
+        self.recent = deque()
+        self.last_used = 0.0
+        self.cooling_until = 0.0
+        self.retired_until = 0.0
+        self.retired_reason: Optional[str] = None
+
+    def headroom(self, now: float) -> float:
+        """Return how many more calls the key can take right now (infinite if its limits are unknown)"""
+        while self.recent and self.recent[0] <= now - HOUR_SECONDS:
+            self.recent.popleft()
+        room = float('inf')
+        if self.hourly_limit is not None:
+            room = self.hourly_limit - len(self.recent)
+        if self.searches_left is not None:
+            room = min(room, self.searches_left - self.inflight)
+        return room
+
+    def usage(self, now: float) -> Dict:
+        """Return the key's limits and usage as a dictionary (see KeyPool.usage)"""
+        headroom = self.headroom(now)
+        return {
+            'key': self.label,
+            'calls': self.calls,
+            'errors': self.errors,
+            'inflight': self.inflight,
+            'last_hour': len(self.recent),
+            'hourly_limit': self.hourly_limit,
+            'searches_left': self.searches_left,
+            'headroom': None if headroom == float('inf') else headroom,
+            'retired': self.retired_reason if self.retired_until > now else None,
+            'retired_seconds': max(0.0, round(self.retired_until - now, 1))
+        }
+
+
+class KeyPool:
+    """SerpAPI keys shared by every call of a process"""
+
+    def __init__(self, keys: Iterable[SerpKey], retire_seconds: float = None, cooldown_seconds: float = None):
+        """
+        Initialize the Key Pool
+
+        Args:
+            keys: Keys of the pool
+            retire_seconds: How long a key rejected for auth or quota is left out.
+                            If not provided, uses config.SERPAPI_KEY_RETIRE_MINUTES
+            cooldown_seconds: How long other keys are preferred after a key was throttled
+                              without Retry-After. If not provided, uses config.SERPAPI_KEY_COOLDOWN_SECONDS
+        """
+        self.keys = list(keys)
+        if not self.keys:
+            raise ValueError("SerpAPI key is required. Set SERPAPI_KEY in .env file")
+        self.retire_seconds = (config.SERPAPI_KEY_RETIRE_MINUTES * 60 if retire_seconds is None
+                               else retire_seconds)
+        self.cooldown_seconds = (config.SERPAPI_KEY_COOLDOWN_SECONDS if cooldown_seconds is None
+                                 else cooldown_seconds)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def available(self) -> bool:
+        """Whether at least one key is not retired"""
+        now = time.monotonic()
+        with self._lock:
+            return any(key.retired_until <= now for key in self.keys)
+
+    def acquire(self) -> SerpKey:
+        """
+        Choose the key for the next call
+
+        Keys that are not cooling down after a 429 come first, then the one with the
+        most headroom; ties go to the key with the fewest calls in flight, then the
+        one used least recently.
+
+        Returns:
+            Key to pass to release() once the call has finished
+
+        Raises:
+            KeyPoolExhausted: If every key is retired
+        """
+        with self._lock:
+            now = time.monotonic()
+            active = [key for key in self.keys if key.retired_until <= now]
+            if not active:
+                soonest = min(self.keys, key=lambda key: key.retired_until)
+                raise KeyPoolExhausted(
+                    f"All SerpAPI keys are retired ({soonest.label}: {soonest.retired_reason}, "
+                    f"back in {soonest.retired_until - now:.0f}s)")
+            key = max(active, key=lambda key: (key.cooling_until <= now, key.headroom(now),
+                                               -key.inflight, -key.last_used))
+            key.inflight += 1
+            key.calls += 1
+            key.recent.append(now)
+            key.last_used = now
+            headroom = key.headroom(now)
+        metrics.SERP_KEY_CALLS.labels(key.label).inc()
+        if headroom != float('inf'):
+            metrics.SERP_KEY_HEADROOM.labels(key.label).set(headroom)
+        return key
+
+    def release(self, key: SerpKey, status: Optional[int], message: str = '',
+                retry_after: Optional[float] = None) -> Optional[str]:
+        """
+        Record the outcome of a call made with a key
+
+        Args:
+            key: Value returned by acquire()
+            status: HTTP status, or None if the call failed without a response
+            message: Response body of failed calls (SerpAPI's error message)
+            retry_after: Seconds from a Retry-After header
+
+        Returns:
+            'auth' or 'quota' if the key was retired, 'throttled' if it is cooling down, else None
+        """
+        reason = None
+        if status in AUTH_STATUSES:
+            reason = 'auth'
+        elif status == 429:
+            message = (message or '').lower()
+            reason = 'quota' if any(text in message for text in QUOTA_MESSAGES) else 'throttled'
+
+        with self._lock:
+            now = time.monotonic()
+            key.inflight -= 1
+            if status is not None and status < 400 and key.searches_left is not None:
+                key.searches_left = max(0, key.searches_left - 1)
+            if status is None or status >= 400:
+                key.errors += 1
+            if reason == 'throttled':
+                key.cooling_until = now + (retry_after or self.cooldown_seconds)
+            elif reason:
+                key.retired_until = now + self.retire_seconds
+                key.retired_reason = reason
+                # Limits are unknown until the key is back (e.g. after the account was topped up)
+                key.searches_left = None
+        if reason:
+            metrics.SERP_KEY_ERRORS.labels(key.label, reason).inc()
+        if reason in RETIRE_REASONS:
+            metrics.SERP_KEY_RETIREMENTS.labels(key.label, reason).inc()
+            print(f"⚠️  SerpAPI key {key.label} retired for {self.retire_seconds / 60:.0f} minutes ({reason})")
+        return reason
+
+    def abandon(self, key: SerpKey):
+        """Return a key whose call was cancelled, without counting an outcome"""
+        with self._lock:
+            key.inflight -= 1
+
+    def refresh(self, timeout: float = 10) -> Dict[str, Optional[str]]:
+        """
+        Update each key's hourly limit and searches left from the SerpAPI Account API
+
+        The Account API is free and does not count against the quota.
+
+        Args:
+            timeout: Seconds to wait for each key's response
+
+        Returns:
+            Error message per key label, None for keys updated successfully
+        """
+        errors = {}
+        for key in self.keys:
+            try:
+                response = requests.get(config.SERPAPI_ACCOUNT_URL, params={'api_key': key.key}, timeout=timeout)
+                response.raise_for_status()
+                account = response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                errors[key.label] = str(e)
+                continue
+            with self._lock:
+                if account.get('account_rate_limit_per_hour') is not None:
+                    key.hourly_limit = int(account['account_rate_limit_per_hour'])
+                if account.get('total_searches_left') is not None:
+                    key.searches_left = int(account['total_searches_left'])
+            errors[key.label] = None
+        return errors
+
+    def usage(self) -> List[Dict]:
+        """
+        Return the limits and usage of every key
+
+        Returns:
+            One dictionary per key: masked key, calls, errors, inflight, calls in the
+            last hour, hourly_limit, searches_left, headroom (None if unlimited), and
+            retired reason with the seconds left (None if active)
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [key.usage(now) for key in self.keys]
+
+
+def configured_keys() -> List[SerpKey]:
+    """Return config.SERPAPI_KEY followed by the keys of config.SERPAPI_KEYS"""
+    return parse_keys(','.join(spec for spec in (config.SERPAPI_KEY, config.SERPAPI_KEYS) if spec))
+
+
+_pool: Optional[KeyPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool() -> KeyPool:
+    """Return the process-wide key pool, so every RankChecker spreads its calls over the same keys"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            pool = KeyPool(configured_keys())
+            if config.SERPAPI_ACCOUNT_CHECK:
+                for label, error in pool.refresh().items():
+                    if error:
+                        print(f"Warning: could not read SerpAPI account of key {label}: {error}")
+            _pool = pool
+        return _pool
+
+
+def format_usage(usage: List[Dict]) -> str:
+    """Format KeyPool.usage() as a console table"""
+    lines = [f"{'Key':<12} {'Calls':>7} {'Errors':>7} {'Last hour':>10} {'Hourly limit':>13} "
+             f"{'Searches left':>14}  Status"]
+    for entry in usage:
+        status = (f"retired ({entry['retired']}, {entry['retired_seconds']:.0f}s left)" if entry['retired']
+                  else 'active')
+        lines.append(
+            f"{entry['key']:<12} {entry['calls']:>7} {entry['errors']:>7} {entry['last_hour']:>10} "
+            f"{entry['hourly_limit'] if entry['hourly_limit'] is not None else '-':>13} "
+            f"{entry['searches_left'] if entry['searches_left'] is not None else '-':>14}  {status}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Show the configured SerpAPI keys via CLI"""
+    parser = argparse.ArgumentParser(
+        description='SerpAPI key pool',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Keys from SERPAPI_KEY and SERPAPI_KEYS with their configured limits
+  python serpapi_keys.py
+
+  # Read each account's hourly limit and searches left from SerpAPI
+  python serpapi_keys.py --refresh
+        """
+    )
+    parser.add_argument('--refresh', action='store_true',
+                        help='Query the SerpAPI Account API for each key (free, no searches used)')
+    args = parser.parse_args()
+
+    try:
+        pool = KeyPool(configured_keys())
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.refresh:
+        for label, error in pool.refresh().items():
+            print(f"❌ {label}: {error}" if error else f"✅ {label}")
+    print(format_usage(pool.usage()))
+    print(f"\n{len(pool)} key(s); calls go to the key with the most headroom")
+
+
+if __name__ == "__main__":
+    main()
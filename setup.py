@@ -24,11 +24,14 @@ def check_setup():
         # Check if it has values
         from dotenv import load_dotenv
         load_dotenv()
-        if not os.getenv('SERPAPI_KEY') or os.getenv('SERPAPI_KEY') == 'your_serpapi_key_here':
+        if (not os.getenv('SERPAPI_KEY') or os.getenv('SERPAPI_KEY') == 'your_serpapi_key_here') and \
+                not os.getenv('SERPAPI_KEYS'):
             issues.append("❌ SERPAPI_KEY not configured in .env")
             print("❌ SERPAPI_KEY not configured")
         else:
             print("✅ SERPAPI_KEY configured")
+            if os.getenv('SERPAPI_KEYS'):
+                print("✅ SERPAPI_KEYS configured (run 'python serpapi_keys.py --refresh' to check each key)")
         
     
     # Check storage type
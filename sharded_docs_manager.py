@@ -0,0 +1,433 @@
+"""
+Sharded Google Docs Manager Module
+Rolling Google Docs storage: results go to a small active document per month or
+per N rows, and a manifest maps the time range of each document so reads touch
+only the documents they need
+"""
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from googleapiclient.errors import HttpError
+from google_docs_manager import GoogleDocsManager, HEADER_LINE
+from rank_result import RankResult, TIMESTAMP_FORMAT
+from metrics import instrument_storage
+from latest_ranks import maintains_latest
+from rank_series import maintains_series
+from delta_storage import delta_decoded, delta_encoded
+from profiling import profiled
+import config
+
+# Sharding modes (config.DOCS_SHARDING)
+SHARDING_MODES = ('off', 'monthly', 'rows')
+
+# Period of the configured document when it already held history before sharding was enabled
+LEGACY_PERIOD = 'legacy'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id TEXT NOT NULL UNIQUE,
+    period TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    first_checked_at REAL,
+    last_checked_at REAL,
+    created_at REAL NOT NULL
+);
+"""
+
+SHARD_COLUMNS = ('document_id', 'period', 'row_count', 'first_checked_at', 'last_checked_at')
+
+
+class Shard(NamedTuple):
+    """One document holding a contiguous slice of history"""
+    document_id: str
+    period: str
+    row_count: int
+    first_checked_at: Optional[float]
+    last_checked_at: Optional[float]
+
+
+class ShardManifest:
+    """SQLite manifest mapping shard documents to the time range of the rows they hold"""
+
+    def __init__(self, path: str = None):
+        """
+        Initialize the Shard Manifest
+
+        Args:
+            path: SQLite database file. If not provided, uses config.DOCS_SHARD_MANIFEST
+        """
+        self.path = path or config.DOCS_SHARD_MANIFEST
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (web requests run on several threads)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _select(self, where: str = '', params: tuple = ()) -> List[Shard]:
+        """Return shards matching a WHERE clause, oldest first"""
+        sql = f"SELECT {', '.join(SHARD_COLUMNS)} FROM shards {where} ORDER BY id"
+        return [Shard(*row) for row in self._connection().execute(sql, params)]
+
+    def shards(self) -> List[Shard]:
+        """Return all shards, oldest first"""
+        return self._select()
+
+    def shards_between(self, since: Optional[float], until: Optional[float]) -> List[Shard]:
+        """
+        Return the shards that may hold rows checked in [since, until)
+
+        Args:
+            since: Epoch seconds (None = unbounded)
+            until: Epoch seconds (None = unbounded)
+
+        Returns:
+            Matching shards, oldest first (empty shards are skipped)
+        """
+        return self._select(
+            'WHERE first_checked_at IS NOT NULL AND (? IS NULL OR last_checked_at >= ?) '
+            'AND (? IS NULL OR first_checked_at < ?)',
+            (since, since, until, until)
+        )
+
+    def active(self, period: str) -> Optional[Shard]:
+        """Return the newest shard of a period, or None"""
+        shards = self._select('WHERE period = ?', (period,))
+        return shards[-1] if shards else None
+
+    def add(self, document_id: str, period: str, row_count: int = 0,
+            first_checked_at: float = None, last_checked_at: float = None) -> Shard:
+        """Register a shard document"""
+        self._connection().execute(
+            'INSERT INTO shards (document_id, period, row_count, first_checked_at, last_checked_at, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (document_id, period, row_count, first_checked_at, last_checked_at, time.time())
+        )
+        return Shard(document_id, period, row_count, first_checked_at, last_checked_at)
+
+    def record_append(self, document_id: str, row_count: int, first_checked_at: float, last_checked_at: float):
+        """Widen a shard's row count and time range after rows were appended to it"""
+        self._connection().execute(
+            'UPDATE shards SET row_count = row_count + ?, '
+            'first_checked_at = MIN(COALESCE(first_checked_at, ?), ?), '
+            'last_checked_at = MAX(COALESCE(last_checked_at, ?), ?) '
+            'WHERE document_id = ?',
+            (row_count, first_checked_at, first_checked_at, last_checked_at, last_checked_at, document_id)
+        )
+
+    def clear(self):
+        """Forget all shards"""
+        self._connection().execute('DELETE FROM shards')
+
+    def write_lock(self) -> '_WriteLock':
+        """Serialize shard selection and creation across threads and processes"""
+        return _WriteLock(self._connection())
+
+
+class _WriteLock:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+def shard_period(checked_at: float, mode: str = None) -> str:
+    """
+    Return the shard period a result belongs to
+
+    Args:
+        checked_at: Epoch seconds of the check
+        mode: Sharding mode. If not provided, uses config.DOCS_SHARDING
+
+    Returns:
+        'YYYY-MM' in monthly mode, '' in rows mode (one rolling sequence)
+    """
+    mode = mode or config.DOCS_SHARDING
+    if mode == 'monthly':
+        return time.strftime('%Y-%m', time.localtime(checked_at))
+    return ''
+
+
+def _checked_at(row: List) -> Optional[float]:
+    """Epoch seconds of a stored row's 'Checked On' column, or None"""
+    if len(row) < 5 or row[0] == 'Keyword':
+        return None
+    try:
+        return time.mktime(time.strptime(row[4].strip(), TIMESTAMP_FORMAT))
+    except ValueError:
+        return None
+
+
+def _result_time(result: Dict) -> float:
+    """Epoch seconds of a result's check (now, if it carries no time)"""
+    return RankResult.from_dict(result).checked_at or time.time()
+
+
+class ShardedDocsManager(GoogleDocsManager):
+    """Google Docs storage that rolls to a new document per month or per DOCS_SHARD_MAX_ROWS rows"""
+
+    def __init__(self, credentials_file: str = None, document_id: str = None, manifest: ShardManifest = None,
+                 mode: str = None, max_rows: int = None, index_document_id: str = None):
+        """
+        Initialize Sharded Google Docs Manager
+
+        Args:
+            credentials_file: Path to Google OAuth credentials JSON file
+            document_id: Configured document. History it already holds stays readable as the first shard
+            manifest: Shard manifest. If not provided, uses config.DOCS_SHARD_MANIFEST
+            mode: 'monthly' or 'rows'. If not provided, uses config.DOCS_SHARDING
+            max_rows: Roll to a new shard after this many rows (0 = no limit). If not provided,
+                      uses config.DOCS_SHARD_MAX_ROWS
+            index_document_id: Document holding a durable copy of the shard list, used to rebuild a
+                               lost manifest. If not provided, uses config.GOOGLE_DOCS_INDEX_DOCUMENT_ID
+        """
+        super().__init__(credentials_file, document_id)
+        self.mode = mode or config.DOCS_SHARDING
+        if self.mode not in SHARDING_MODES[1:]:
+            raise ValueError(f"Unknown sharding mode '{self.mode}'. Use 'monthly' or 'rows'")
+        self.max_rows = config.DOCS_SHARD_MAX_ROWS if max_rows is None else max_rows
+        self.index_document_id = index_document_id or config.GOOGLE_DOCS_INDEX_DOCUMENT_ID
+        self.manifest = manifest or ShardManifest()
+
+        if not self.manifest.shards():
+            self.rebuild_manifest()
+
+    def _register_existing(self, document_id: str, period: str) -> Shard:
+        """Add a document that may already hold rows, reading it once to record its range"""
+        rows = [row for row in self._read_rows(document_id) if row[0] != 'Keyword']
+        times = [checked_at for checked_at in map(_checked_at, rows) if checked_at is not None]
+        return self.manifest.add(document_id, period, len(rows),
+                                 min(times) if times else None, max(times) if times else None)
+
+    def rebuild_manifest(self) -> int:
+        """
+        Recreate the manifest from the index document and the configured document
+
+        Every listed shard is read once to recover its row count and time range.
+
+        Returns:
+            Number of shards registered
+        """
+        with self.manifest.write_lock():
+            self.manifest.clear()
+            listed = []
+            if self.index_document_id:
+                listed = [row for row in self._read_rows(self.index_document_id) if len(row) >= 2]
+            if not any(row[0] == self.document_id for row in listed):
+                # The configured document: an empty one becomes the first shard of the current period
+                rows = self._read_rows(self.document_id)
+                period = shard_period(time.time(), self.mode) if len(rows) <= 1 else LEGACY_PERIOD
+                listed.insert(0, [self.document_id, period])
+                self._publish(self.document_id, period)
+            for document_id, period in (row[:2] for row in listed):
+                self._register_existing(document_id, period)
+        return len(listed)
+
+    def _publish(self, document_id: str, period: str):
+        """Record a new shard in the index document, if one is configured"""
+        if not self.index_document_id:
+            return
+        _, insert_index = self._read_document(self.index_document_id)
+        self.service.documents().batchUpdate(
+            documentId=self.index_document_id,
+            body={'requests': [{'insertText': {
+                'location': {'index': insert_index},
+                'text': f"{document_id}\t{period}\t{time.strftime(TIMESTAMP_FORMAT)}\n"
+            }}]}
+        ).execute()
+
+    def _create_shard(self, period: str) -> Shard:
+        """Create a new shard document for a period (caller holds the manifest write lock)"""
+        title = f"Rank Tracking {period or 'shard'} #{len(self.manifest.shards()) + 1}"
+        doc = self.service.documents().create(body={'title': title}).execute()
+        document_id = doc['documentId']
+        # Headers go in now, so appends to the shard never need a separate header write
+        self.service.documents().batchUpdate(
+            documentId=document_id,
+            body={'requests': [{'insertText': {'location': {'index': 1}, 'text': HEADER_LINE}}]}
+        ).execute()
+        self._publish(document_id, period)
+        print(f"Created Google Docs shard '{title}': {document_id}")
+        return self.manifest.add(document_id, period)
+
+    def _target_shard(self, period: str, row_count: int) -> Shard:
+        """Return the shard a batch of row_count rows goes to, rolling to a new one if the active shard is full"""
+        with self.manifest.write_lock():
+            shard = self.manifest.active(period)
+            if shard is None or (self.max_rows and shard.row_count and
+                                 shard.row_count + row_count > self.max_rows):
+                shard = self._create_shard(period)
+            return shard
+
+    @maintains_latest
+    @maintains_series
+    @delta_encoded
+    @instrument_storage('append')
+    @profiled()
+    def append_results(self, results: List[Dict], document_name: str = None):
+        """
+        Append ranking results to the active shard of their period
+
+        Args:
+            results: List of ranking result dictionaries
+            document_name: Not used (kept for compatibility)
+        """
+        if not results:
+            return
+
+        # A batch spanning a month boundary is split between the two months' shards
+        batches: Dict[str, List] = {}
+        for result in results:
+            checked_at = _result_time(result)
+            batches.setdefault(shard_period(checked_at, self.mode), []).append((checked_at, result))
+
+        try:
+            for period, batch in batches.items():
+                shard = self._target_shard(period, len(batch))
+                self._append_rows(shard.document_id, [result for _, result in batch])
+                times = [checked_at for checked_at, _ in batch]
+                self.manifest.record_append(shard.document_id, len(batch), min(times), max(times))
+            print(f"Successfully appended {len(results)} results to Google Docs")
+        except HttpError as error:
+            print(f"Error appending results to Google Docs: {error}")
+            raise
+
+    def save_result(self, result: Dict) -> str:
+        """
+        Save a single ranking result to Google Docs
+
+        Args:
+            result: Ranking result dictionary
+
+        Returns:
+            Document ID of the shard the result was written to
+        """
+        self.append_results([result])
+        checked_at = _result_time(result)
+        return self.manifest.active(shard_period(checked_at, self.mode)).document_id
+
+    def save_results(self, results: List[Dict]) -> List[str]:
+        """
+        Save multiple ranking results to Google Docs
+
+        Args:
+            results: List of ranking result dictionaries
+
+        Returns:
+            Document IDs of the shards the results were written to
+        """
+        self.append_results(results)
+        periods = {shard_period(_result_time(result), self.mode) for result in results}
+        return [self.manifest.active(period).document_id for period in sorted(periods)]
+
+    def _read_shards(self, shards: List[Shard]) -> List[List]:
+        """Concatenate the rows of several shards under one header row"""
+        rows = [HEADER_LINE.rstrip('\n').split('\t')]
+        for shard in shards:
+            rows.extend(row for row in self._read_rows(shard.document_id) if row[0] != 'Keyword')
+        return rows
+
+    @delta_decoded
+    @instrument_storage('read')
+    @profiled()
+    def get_all_results(self) -> List[List]:
+        """
+        Get all results from every shard, oldest shard first
+
+        Returns:
+            List of rows (one header row first)
+        """
+        try:
+            return self._read_shards(self.manifest.shards_between(None, None))
+        except HttpError as error:
+            print(f"Error reading results from Google Docs: {error}")
+            return []
+
+    @delta_decoded
+    @instrument_storage('read')
+    @profiled()
+    def get_results_between(self, since: datetime = None, until: datetime = None) -> List[List]:
+        """
+        Get results checked in a time window, reading only the shards that overlap it
+
+        Args:
+            since: Only include rows checked on or after this time
+            until: Only include rows checked before this time
+
+        Returns:
+            List of rows (one header row first)
+        """
+        since_ts = since.timestamp() if since else None
+        until_ts = until.timestamp() if until else None
+        try:
+            rows = self._read_shards(self.manifest.shards_between(since_ts, until_ts))
+        except HttpError as error:
+            print(f"Error reading results from Google Docs: {error}")
+            return []
+
+        selected = rows[:1]
+        for row in rows[1:]:
+            checked_at = _checked_at(row)
+            if checked_at is None:
+                continue
+            if (since_ts is None or checked_at >= since_ts) and (until_ts is None or checked_at < until_ts):
+                selected.append(row)
+        return selected
+
+
+def main():
+    """List or rebuild the shard manifest via CLI"""
+    parser = argparse.ArgumentParser(
+        description='Manage rolling Google Docs shards (DOCS_SHARDING=monthly or rows)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # List shards with their row counts and time ranges
+  python sharded_docs_manager.py list
+
+  # Recreate a lost manifest from GOOGLE_DOCS_INDEX_DOCUMENT_ID (reads every shard once)
+  python sharded_docs_manager.py rebuild
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='Print the shard manifest')
+    subparsers.add_parser('rebuild', help='Rebuild the manifest from the index document')
+    args = parser.parse_args()
+
+    if config.DOCS_SHARDING not in SHARDING_MODES[1:]:
+        print("Error: sharding is off. Set DOCS_SHARDING=monthly or DOCS_SHARDING=rows in .env")
+        sys.exit(1)
+
+    manager = ShardedDocsManager()
+    if args.command == 'rebuild':
+        count = manager.rebuild_manifest()
+        print(f"✅ Rebuilt shard manifest: {count} documents")
+        return
+
+    def display(timestamp: Optional[float]) -> str:
+        return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp else '-'
+
+    for shard in manager.manifest.shards():
+        print(f"{shard.document_id}  {shard.period or 'rows':<8} {shard.row_count:>7} rows  "
+              f"{display(shard.first_checked_at)} .. {display(shard.last_checked_at)}")
+
+
+if __name__ == '__main__':
+    main()
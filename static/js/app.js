@@ -9,6 +9,25 @@ document.addEventListener('DOMContentLoaded', function() {
     const resultsContainer = document.getElementById('resultsContainer');
     const loadHistoryBtn = document.getElementById('loadHistoryBtn');
     const historyContainer = document.getElementById('historyContainer');
+    const historyToolbar = document.getElementById('historyToolbar');
+    const historyFilter = document.getElementById('historyFilter');
+    const historyCount = document.getElementById('historyCount');
+    
+    // Result cards appended per step while scrolling through a large check
+    const RESULTS_CHUNK = 50;
+    // History rows requested from /api/history per page
+    const HISTORY_PAGE_SIZE = 500;
+    // Fixed row height of the virtualized history list (matches .history-viewport .history-item)
+    const HISTORY_ROW_HEIGHT = 72;
+    // Rows rendered above and below the visible ones
+    const HISTORY_OVERSCAN = 10;
+    // Load the next page when the last loaded row is this many rows away
+    const HISTORY_PREFETCH_ROWS = 100;
+    // Sort keys of positions that are not numbers (not found sorts after every rank, errors last)
+    const NOT_FOUND_RANK = 10000;
+    const ERROR_RANK = 20000;
+    const STATUS_CODES = { success: 0, not_found: 1, error: 2 };
+    const STATUS_NAMES = ['success', 'not_found', 'error'];
 
     // Handle form submission
     rankForm.addEventListener('submit', async function(e) {
@@ -112,104 +131,367 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Handle history loading
     loadHistoryBtn.addEventListener('click', async function() {
-        const websiteUrl = document.getElementById('historyUrl').value.trim();
-        const keyword = document.getElementById('historyKeyword').value.trim();
-        
         loadHistoryBtn.disabled = true;
         loadHistoryBtn.textContent = '⏳ Loading...';
         historyContainer.innerHTML = '<div class="loading">Loading history</div>';
+        historyToolbar.style.display = 'none';
         
         try {
-            const params = new URLSearchParams();
-            if (websiteUrl) params.append('website_url', websiteUrl);
-            if (keyword) params.append('keyword', keyword);
-            params.append('limit', '50');
-            
-            const response = await fetch(`/api/history?${params.toString()}`);
-            const data = await response.json();
-            
-            if (!response.ok) {
-                throw new Error(data.error || 'Failed to load history');
-            }
-            
-            displayHistory(data.results);
-            
+            historyRows.reset(
+                document.getElementById('historyUrl').value.trim(),
+                document.getElementById('historyKeyword').value.trim()
+            );
+            await historyRows.loadNextPage();
+            displayHistory();
         } catch (error) {
-            historyContainer.innerHTML = `<div class="error-message">${error.message}</div>`;
+            historyContainer.innerHTML = `<div class="error-message">${escapeHtml(error.message)}</div>`;
         } finally {
             loadHistoryBtn.disabled = false;
             loadHistoryBtn.textContent = 'Load History';
         }
     });
     
+    historyFilter.addEventListener('input', function() {
+        historyRows.setFilter(historyFilter.value);
+        renderHistory(true);
+    });
+    
+    historyToolbar.querySelectorAll('.btn-sort').forEach(button => {
+        button.addEventListener('click', function() {
+            historyRows.setSort(button.dataset.sort);
+            historyToolbar.querySelectorAll('.btn-sort').forEach(other => {
+                other.classList.toggle('active', other === button);
+                other.textContent = other.textContent.replace(/ [▲▼]$/, '');
+            });
+            button.textContent += historyRows.sortDescending ? ' ▼' : ' ▲';
+            renderHistory(true);
+        });
+    });
+    
+    // Appends result cards while the results are scrolled (replaced on every check)
+    let resultsObserver = null;
+    
     // Display results
     function displayResults(results, websiteUrl, location, saved) {
         resultsSection.style.display = 'block';
         resultsSection.scrollIntoView({ behavior: 'smooth' });
         
-        let html = '';
+        resultsContainer.innerHTML = saved ?
+            '<div class="success-message">✅ Results saved successfully!</div>' : '';
+        const grid = document.createElement('div');
+        grid.className = 'results-grid';
+        resultsContainer.appendChild(grid);
         
-        if (saved) {
-            html += '<div class="success-message">✅ Results saved successfully!</div>';
+        // Cards are added a chunk at a time as the end of the grid scrolls into view
+        let rendered = 0;
+        const sentinel = document.createElement('div');
+        
+        function appendChunk() {
+            const end = Math.min(results.length, rendered + RESULTS_CHUNK);
+            let html = '';
+            for (let i = rendered; i < end; i++) {
+                html += resultCardHtml(results[i]);
+            }
+            grid.insertAdjacentHTML('beforeend', html);
+            rendered = end;
         }
         
-        html += '<div class="results-grid">';
+        if (resultsObserver) {
+            resultsObserver.disconnect();
+            resultsObserver = null;
+        }
+        appendChunk();
+        if (rendered >= results.length) return;
         
-        results.forEach(result => {
-            const statusClass = result.status;
-            const positionText = result.status === 'not_found' ? '> 100' : result.position;
-            const statusIcon = result.status === 'success' ? '✅' : 
-                             result.status === 'not_found' ? '⚠️' : '❌';
-            
-            html += `
-                <div class="result-item ${statusClass}">
-                    <div class="result-header">
-                        <div class="result-keyword">${statusIcon} ${escapeHtml(result.keyword)}</div>
-                        <div class="result-position">${positionText}</div>
-                    </div>
-                    <div class="result-details">
-                        ${result.found_url ? `<a href="${escapeHtml(result.found_url)}" target="_blank">${escapeHtml(result.found_url)}</a><br>` : ''}
-                        ${result.serp_title ? `<strong>${escapeHtml(result.serp_title)}</strong><br>` : ''}
-                        ${result.serp_snippet ? `<span>${escapeHtml(result.serp_snippet)}</span><br>` : ''}
-                        <small>Checked on: ${escapeHtml(result.checked_on)}</small>
-                        ${result.error ? `<br><span style="color: #dc3545;">Error: ${escapeHtml(result.error)}</span>` : ''}
-                    </div>
-                </div>
-            `;
-        });
+        if (!('IntersectionObserver' in window)) {
+            while (rendered < results.length) appendChunk();
+            return;
+        }
+        resultsContainer.appendChild(sentinel);
+        const observer = new IntersectionObserver(entries => {
+            if (!entries.some(entry => entry.isIntersecting)) return;
+            appendChunk();
+            if (rendered >= results.length) {
+                observer.disconnect();
+                sentinel.remove();
+            }
+        }, { rootMargin: '600px' });
+        observer.observe(sentinel);
+        resultsObserver = observer;
+    }
+    
+    // HTML of one result card
+    function resultCardHtml(result) {
+        const statusClass = result.status;
+        const positionText = result.status === 'not_found' ? '> 100' : result.position;
+        const statusIcon = result.status === 'success' ? '✅' : 
+                         result.status === 'not_found' ? '⚠️' : '❌';
         
-        html += '</div>';
-        resultsContainer.innerHTML = html;
+        return `
+            <div class="result-item ${statusClass}">
+                <div class="result-header">
+                    <div class="result-keyword">${statusIcon} ${escapeHtml(result.keyword)}</div>
+                    <div class="result-position">${positionText}</div>
+                </div>
+                <div class="result-details">
+                    ${result.found_url ? `<a href="${escapeHtml(result.found_url)}" target="_blank">${escapeHtml(result.found_url)}</a><br>` : ''}
+                    ${result.serp_title ? `<strong>${escapeHtml(result.serp_title)}</strong><br>` : ''}
+                    ${result.serp_snippet ? `<span>${escapeHtml(result.serp_snippet)}</span><br>` : ''}
+                    <small>Checked on: ${escapeHtml(result.checked_on)}</small>
+                    ${result.error ? `<br><span style="color: #dc3545;">Error: ${escapeHtml(result.error)}</span>` : ''}
+                </div>
+            </div>
+        `;
     }
     
+    // Loaded history rows, stored column by column; sorting and filtering reorder an index array
+    const historyRows = {
+        websiteUrl: '',
+        keyword: '',
+        generation: 0,
+        size: 0,
+        hasMore: false,
+        loading: null,
+        keywords: [],
+        websiteUrls: [],
+        checkedOn: [],
+        positionText: [],
+        searchText: [],
+        rank: new Float64Array(0),
+        time: new Float64Array(0),
+        status: new Uint8Array(0),
+        view: new Uint32Array(0),
+        viewSize: 0,
+        filter: '',
+        sortKey: 'checked_on',
+        sortDescending: false,
+        
+        reset(websiteUrl, keyword) {
+            this.websiteUrl = websiteUrl;
+            this.keyword = keyword;
+            this.generation++;
+            this.size = 0;
+            this.hasMore = false;
+            this.loading = null;
+            this.keywords = [];
+            this.websiteUrls = [];
+            this.checkedOn = [];
+            this.positionText = [];
+            this.searchText = [];
+            this.rank = new Float64Array(HISTORY_PAGE_SIZE);
+            this.time = new Float64Array(HISTORY_PAGE_SIZE);
+            this.status = new Uint8Array(HISTORY_PAGE_SIZE);
+            this.view = new Uint32Array(0);
+            this.viewSize = 0;
+        },
+        
+        // Fetch the next page of rows (concurrent calls share one request)
+        loadNextPage() {
+            if (!this.loading) {
+                const params = new URLSearchParams();
+                if (this.websiteUrl) params.append('website_url', this.websiteUrl);
+                if (this.keyword) params.append('keyword', this.keyword);
+                params.append('limit', String(HISTORY_PAGE_SIZE));
+                params.append('offset', String(this.size));
+                const generation = this.generation;
+                
+                this.loading = fetch(`/api/history?${params.toString()}`)
+                    .then(async response => {
+                        const data = await response.json();
+                        if (!response.ok) {
+                            throw new Error(data.error || 'Failed to load history');
+                        }
+                        // Ignore pages of a query that was replaced meanwhile
+                        if (generation === this.generation) {
+                            this.append(data.results);
+                            this.hasMore = Boolean(data.has_more);
+                        }
+                    })
+                    .finally(() => {
+                        this.loading = null;
+                    });
+            }
+            return this.loading;
+        },
+        
+        append(results) {
+            this.reserve(this.size + results.length);
+            results.forEach(result => {
+                const i = this.size++;
+                const status = result.status in STATUS_CODES ? STATUS_CODES[result.status] : STATUS_CODES.error;
+                this.keywords[i] = result.keyword;
+                this.websiteUrls[i] = result.website_url;
+                this.checkedOn[i] = result.checked_on;
+                this.positionText[i] = result.status === 'not_found' ? '> 100' : result.position;
+                this.searchText[i] = `${result.keyword} ${result.website_url}`.toLowerCase();
+                this.status[i] = status;
+                this.rank[i] = status === STATUS_CODES.success ? (parseInt(result.position, 10) || ERROR_RANK) :
+                    status === STATUS_CODES.not_found ? NOT_FOUND_RANK : ERROR_RANK;
+                this.time[i] = Date.parse(String(result.checked_on).replace(' ', 'T')) || 0;
+            });
+            this.rebuildView();
+        },
+        
+        // Grow the typed columns geometrically so appending pages stays cheap
+        reserve(capacity) {
+            if (capacity <= this.rank.length) return;
+            const size = Math.max(capacity, this.rank.length * 2);
+            const grow = (column, Type) => {
+                const grown = new Type(size);
+                grown.set(column);
+                return grown;
+            };
+            this.rank = grow(this.rank, Float64Array);
+            this.time = grow(this.time, Float64Array);
+            this.status = grow(this.status, Uint8Array);
+        },
+        
+        setFilter(text) {
+            this.filter = text.trim().toLowerCase();
+            this.rebuildView();
+        },
+        
+        // Clicking the active sort again reverses it
+        setSort(key) {
+            this.sortDescending = key === this.sortKey ? !this.sortDescending : false;
+            this.sortKey = key;
+            this.rebuildView();
+        },
+        
+        rebuildView() {
+            if (this.view.length < this.size) {
+                this.view = new Uint32Array(this.rank.length);
+            }
+            let count = 0;
+            for (let i = 0; i < this.size; i++) {
+                if (!this.filter || this.searchText[i].includes(this.filter)) {
+                    this.view[count++] = i;
+                }
+            }
+            this.viewSize = count;
+            
+            const direction = this.sortDescending ? -1 : 1;
+            let compare;
+            if (this.sortKey === 'position') {
+                compare = (a, b) => (this.rank[a] - this.rank[b]) * direction || a - b;
+            } else if (this.sortKey === 'keyword') {
+                compare = (a, b) => (this.keywords[a] < this.keywords[b] ? -direction :
+                    this.keywords[a] > this.keywords[b] ? direction : 0) || a - b;
+            } else {
+                compare = (a, b) => (this.time[a] - this.time[b]) * direction || a - b;
+            }
+            this.view.subarray(0, count).sort(compare);
+        }
+    };
+    
+    // Virtualized list state: the rows currently in the DOM, reused as the list scrolls
+    let historyViewport = null;
+    let historySpacer = null;
+    let historyStatus = null;
+    let historyRowPool = [];
+    let historyFrame = 0;
+    
     // Display history
-    function displayHistory(results) {
-        if (results.length === 0) {
+    function displayHistory() {
+        if (historyRows.size === 0) {
             historyContainer.innerHTML = '<div class="error-message">No history found</div>';
             return;
         }
         
-        let html = '<div class="results-grid">';
+        historyContainer.innerHTML = '';
+        historyViewport = document.createElement('div');
+        historyViewport.className = 'history-viewport';
+        historySpacer = document.createElement('div');
+        historySpacer.className = 'history-spacer';
+        historyViewport.appendChild(historySpacer);
+        historyStatus = document.createElement('div');
+        historyStatus.className = 'history-status';
+        historyContainer.appendChild(historyViewport);
+        historyContainer.appendChild(historyStatus);
+        historyRowPool = [];
         
-        results.forEach(result => {
-            const positionText = result.status === 'not_found' ? '> 100' : result.position;
-            const statusIcon = result.status === 'success' ? '✅' : 
-                             result.status === 'not_found' ? '⚠️' : '❌';
-            
-            html += `
-                <div class="history-item">
-                    <div class="history-info">
-                        <div class="history-keyword">${statusIcon} ${escapeHtml(result.keyword)}</div>
-                        <div class="history-url">${escapeHtml(result.website_url)}</div>
-                        <small>${escapeHtml(result.checked_on)}</small>
-                    </div>
-                    <div class="history-position">${positionText}</div>
-                </div>
-            `;
+        historyViewport.addEventListener('scroll', function() {
+            if (!historyFrame) {
+                historyFrame = requestAnimationFrame(() => {
+                    historyFrame = 0;
+                    renderHistory(false);
+                });
+            }
         });
         
-        html += '</div>';
-        historyContainer.innerHTML = html;
+        historyFilter.value = historyRows.filter;
+        historyToolbar.style.display = 'flex';
+        renderHistory(true);
+    }
+    
+    // Render the rows in view; reset scrolls back to the top (after sorting or filtering)
+    function renderHistory(reset) {
+        if (!historyViewport) return;
+        if (reset) historyViewport.scrollTop = 0;
+        
+        historySpacer.style.height = `${historyRows.viewSize * HISTORY_ROW_HEIGHT}px`;
+        const scrollTop = historyViewport.scrollTop;
+        const first = Math.max(0, Math.floor(scrollTop / HISTORY_ROW_HEIGHT) - HISTORY_OVERSCAN);
+        const last = Math.min(historyRows.viewSize,
+            Math.ceil((scrollTop + historyViewport.clientHeight) / HISTORY_ROW_HEIGHT) + HISTORY_OVERSCAN);
+        
+        while (historyRowPool.length < last - first) {
+            historyRowPool.push(createHistoryRow());
+        }
+        historyRowPool.forEach((row, slot) => {
+            const viewIndex = first + slot;
+            if (viewIndex >= last) {
+                row.element.style.display = 'none';
+                return;
+            }
+            fillHistoryRow(row, historyRows.view[viewIndex], viewIndex);
+        });
+        
+        const loaded = historyRows.filter ? `${historyRows.viewSize} of ${historyRows.size}` : `${historyRows.size}`;
+        historyCount.textContent = `${loaded} rows loaded${historyRows.hasMore ? ', more available' : ''}`;
+        historyStatus.textContent = historyRows.loading ? 'Loading more historyRows...' : '';
+        
+        // Fetch the next page before the user reaches the end of what is loaded
+        if (historyRows.hasMore && !historyRows.loading && last + HISTORY_PREFETCH_ROWS >= historyRows.viewSize) {
+            historyRows.loadNextPage()
+                .then(() => renderHistory(false))
+                .catch(error => {
+                    historyStatus.textContent = `Could not load more history: ${error.message}`;
+                });
+            historyStatus.textContent = 'Loading more historyRows...';
+        }
+    }
+    
+    // Build one reusable history row (the same markup the list used before virtualization)
+    function createHistoryRow() {
+        const element = document.createElement('div');
+        element.className = 'history-item';
+        const info = document.createElement('div');
+        info.className = 'history-info';
+        const keyword = document.createElement('div');
+        keyword.className = 'history-keyword';
+        const url = document.createElement('div');
+        url.className = 'history-url';
+        const checkedOn = document.createElement('small');
+        const position = document.createElement('div');
+        position.className = 'history-position';
+        
+        info.append(keyword, url, checkedOn);
+        element.append(info, position);
+        historySpacer.appendChild(element);
+        return { element, keyword, url, checkedOn, position };
+    }
+    
+    // Point a pooled row at one loaded history row (textContent, so no escaping is needed)
+    function fillHistoryRow(row, index, viewIndex) {
+        const status = STATUS_NAMES[historyRows.status[index]];
+        const statusIcon = status === 'success' ? '✅' : status === 'not_found' ? '⚠️' : '❌';
+        row.element.style.display = '';
+        row.element.style.top = `${viewIndex * HISTORY_ROW_HEIGHT}px`;
+        row.keyword.textContent = `${statusIcon} ${historyRows.keywords[index]}`;
+        row.url.textContent = historyRows.websiteUrls[index];
+        row.checkedOn.textContent = historyRows.checkedOn[index];
+        row.position.textContent = historyRows.positionText[index];
     }
     
     // Show error message
@@ -0,0 +1,21 @@
+"""
+Test configuration
+Makes the top-level modules importable and keeps every store out of the working directory
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """Point every on-disk store at the test's temporary directory"""
+    for name, file_name in (('RUN_JOURNAL_DIR', 'runs'), ('SERP_ARCHIVE_DIR', 'serp_archive'),
+                            ('LATEST_RANKS_DB', 'latest_ranks.db'), ('DELTA_STATE_DB', 'delta_state.db'),
+                            ('RANK_SERIES_DIR', 'rank_series'), ('WORK_QUEUE_DB', 'work_queue.db'),
+                            ('PROFILE_DIR', 'profiles')):
+        monkeypatch.setattr(config, name, str(tmp_path / file_name))
@@ -0,0 +1,74 @@
+"""Tests for the AIMD concurrency limiter"""
+import time
+import threading
+from adaptive_concurrency import AdaptiveLimiter, AimdWindow, parse_retry_after
+
+
+def window(initial: float = 4) -> AimdWindow:
+    return AimdWindow(initial=initial, minimum=1, maximum=10, decrease_factor=0.5, latency_factor=2)
+
+
+def test_healthy_responses_grow_window_additively():
+    aimd = window(4)
+    for _ in range(4):
+        assert aimd.on_response(time.monotonic(), 0.1, 200) is None
+    assert 4.9 < aimd.window < 5.1
+
+
+def test_congestion_cuts_window_once_per_round_trip():
+    aimd = window(8)
+    started = time.monotonic()
+    assert aimd.on_response(started, 0.1, 429) == 'throttled'
+    assert aimd.window == 4
+    # A call sent before the cut does not cut again
+    assert aimd.on_response(started, 0.1, 503) == 'server_error'
+    assert aimd.window == 4
+    assert aimd.on_response(time.monotonic(), 0.1, None) == 'transport'
+    assert aimd.window == 2
+
+
+def test_client_errors_leave_window_alone():
+    aimd = window(4)
+    assert aimd.on_response(time.monotonic(), 0.1, 401) is None
+    assert aimd.window == 4
+
+
+def test_window_stays_within_bounds():
+    aimd = window(2)
+    for _ in range(5):
+        aimd.on_response(time.monotonic(), 0.1, 500)
+    assert aimd.window == 1
+    assert aimd.limit == 1
+
+
+def test_retry_after_pauses_calls():
+    aimd = window(4)
+    aimd.on_response(time.monotonic(), 0.1, 429, retry_after=30)
+    assert aimd.paused_until > time.monotonic() + 29
+    assert parse_retry_after('12') == 12
+    assert parse_retry_after('soon') is None
+
+
+def test_limiter_blocks_when_window_is_full():
+    limiter = AdaptiveLimiter(window(1))
+    token = limiter.acquire()
+    acquired = threading.Event()
+
+    def second_call():
+        limiter.abandon(limiter.acquire())
+        acquired.set()
+
+    thread = threading.Thread(target=second_call)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(token, 200)
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.inflight == 0
+
+
+def test_abandon_does_not_judge_window():
+    limiter = AdaptiveLimiter(window(4))
+    limiter.abandon(limiter.acquire())
+    assert limiter.window.window == 4
+    assert limiter.inflight == 0
@@ -0,0 +1,119 @@
+"""Tests for change-only storage"""
+import time
+import threading
+import pytest
+from delta_storage import FILL_SECONDS, DeltaState, encode_results, expand_rows
+from rank_result import RankResult, TIMESTAMP_FORMAT
+
+DAY = FILL_SECONDS
+START = time.mktime(time.strptime('2024-03-01 10:00:00', TIMESTAMP_FORMAT))
+
+
+def check(position, day, location='United States'):
+    return RankResult.found('shoes', 'example.com', position, 'https://example.com/a',
+                            location=location, checked_at=START + day * DAY)
+
+
+def rows_of(results):
+    return [[r['keyword'], r['website_url'], str(r['ranking_position']), r['found_url'], r['checked_on'],
+             r['serp_title'] or '', r['serp_snippet'] or '', r['error'] or ''] for r in results]
+
+
+def encode_days(state, checks, heartbeat_seconds=7 * DAY):
+    stored = []
+    for result in checks:
+        rows, updates = encode_results([result], state, heartbeat_seconds)
+        state.save(updates)
+        stored.extend(rows_of(rows))
+    return stored
+
+
+@pytest.fixture
+def state(tmp_path):
+    return DeltaState(str(tmp_path / 'delta.db'))
+
+
+def test_unchanged_checks_are_dropped(state):
+    stored = encode_days(state, [check(5, day) for day in range(4)])
+    assert len(stored) == 1
+
+
+def test_change_after_dropped_checks_closes_with_heartbeat(state):
+    stored = encode_days(state, [check(5, 0), check(5, 1), check(5, 2), check(3, 3)])
+    expanded = expand_rows(stored, fill=True, heartbeat_seconds=7 * DAY)
+
+    assert [row[2] for row in expanded] == ['5', '5', '5', '3']
+    assert all(not row[7] for row in expanded)
+
+
+def test_full_rows_are_not_filled():
+    stored = rows_of([check(5, 0), check(3, 7)])
+    assert len(expand_rows(stored, fill=True, heartbeat_seconds=7 * DAY)) == 2
+
+
+def test_days_after_last_stored_row_are_filled_up_to_last_check(state):
+    stored = encode_days(state, [check(5, day) for day in range(4)])
+    expanded = expand_rows(stored, fill=True, heartbeat_seconds=7 * DAY, last_checked=state.last_checked())
+
+    assert [row[4] for row in expanded] == [time.strftime(TIMESTAMP_FORMAT, time.localtime(START + day * DAY))
+                                            for day in range(4)]
+    assert {row[2] for row in expanded} == {'5'}
+
+
+def test_locations_are_encoded_separately(state):
+    checks = []
+    for day in range(3):
+        checks += [check(5, day, 'United States'), check(9, day, 'Germany')]
+    stored = encode_days(state, checks)
+
+    assert [row[2] for row in stored] == ['5', '9']
+
+
+def test_state_without_location_is_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / 'delta.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE delta_state (website_url TEXT NOT NULL, keyword TEXT NOT NULL, '
+                       'ranking_position TEXT NOT NULL, found_url TEXT NOT NULL, since_on TEXT NOT NULL, '
+                       'written_at REAL NOT NULL, PRIMARY KEY (website_url, keyword))')
+    connection.execute("INSERT INTO delta_state VALUES ('example.com', 'shoes', '5', 'https://example.com/a', "
+                       "'2024-03-01 10:00:00', ?)", (START,))
+    connection.commit()
+    connection.close()
+
+    stored, _ = encode_results([check(5, 1)], DeltaState(path), 7 * DAY)
+    assert stored == []
+
+
+def test_concurrent_appenders_store_a_change_once(state):
+    encode_days(state, [check(5, 0)])
+    stored = []
+    barrier = threading.Barrier(2)
+
+    def append():
+        barrier.wait()
+        with state.transaction():
+            rows, updates = encode_results([check(3, 1)], state, 7 * DAY)
+            time.sleep(0.05)
+            stored.extend(rows)
+            state.save(updates)
+
+    threads = [threading.Thread(target=append) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stored) == 1
+
+
+def test_failed_append_keeps_state(state):
+    encode_days(state, [check(5, 0)])
+    with pytest.raises(RuntimeError):
+        with state.transaction():
+            _, updates = encode_results([check(3, 1)], state, 7 * DAY)
+            state.save(updates)
+            raise RuntimeError('append failed')
+
+    stored, _ = encode_results([check(3, 2)], state, 7 * DAY)
+    assert len(stored) == 1
@@ -0,0 +1,32 @@
+"""Tests for the latest-rank table"""
+from latest_ranks import LatestRankTable
+from rank_result import RankResult
+from rank_series import DEFAULT_LOCATION
+
+HEADER = ['Keyword', 'Website URL', 'Ranking Position', 'Found URL', 'Checked On', 'SERP Title',
+          'SERP Snippet', 'Notes']
+
+
+def test_rebuild_and_live_update_share_one_entry(tmp_path):
+    table = LatestRankTable(str(tmp_path / 'latest.db'))
+    table.rebuild([HEADER, ['shoes', 'example.com', '7', 'https://example.com/a', '2024-01-01 10:00:00']])
+    table.update([RankResult.found('shoes', 'example.com', 3, 'https://example.com/a', location=DEFAULT_LOCATION)])
+
+    entries = table.query()
+    assert len(entries) == 1
+    assert entries[0]['location'] == DEFAULT_LOCATION
+    assert (entries[0]['position'], entries[0]['previous_position']) == (3, 7)
+
+
+def test_rebuild_location(tmp_path):
+    table = LatestRankTable(str(tmp_path / 'latest.db'))
+    table.rebuild([['shoes', 'example.com', '7', '', '2024-01-01 10:00:00']], location='Germany')
+
+    assert [entry['location'] for entry in table.query()] == ['Germany']
+
+
+def test_results_without_location_use_default(tmp_path):
+    table = LatestRankTable(str(tmp_path / 'latest.db'))
+    table.update([RankResult.not_found('shoes', 'example.com', 100)])
+
+    assert table.query()[0]['location'] == DEFAULT_LOCATION
@@ -0,0 +1,56 @@
+"""Tests for the rank tracking pipeline (checks, run journal and storage sink)"""
+import pytest
+import config
+import serpapi_keys
+from fake_serpapi import FakeSerpApi, FakeSerpApiConfig
+from keyword_loader import LoadStats, iter_keyword_rows
+from main import run_rank_tracking
+from memory_storage import MemoryStorageManager
+from run_journal import RunJournal
+
+
+@pytest.fixture
+def serpapi(monkeypatch):
+    with FakeSerpApi(FakeSerpApiConfig(latency_ms=1, jitter_ms=0, payload_kb=0, not_found_rate=0)) as server:
+        monkeypatch.setattr(config, 'SERPAPI_URL', server.url)
+        monkeypatch.setattr(config, 'SERPAPI_KEY', 'test-key')
+        monkeypatch.setattr(config, 'SERPAPI_KEYS', '')
+        monkeypatch.setattr(serpapi_keys, '_pool', None)
+        yield server
+
+
+def test_run_saves_every_result(serpapi):
+    storage = MemoryStorageManager()
+    results = run_rank_tracking('example.com', ['one', 'two', 'three'], storage_manager=storage)
+
+    assert len(results) == 3
+    assert len(storage.get_all_results()) == 4
+
+
+def test_unreadable_keyword_file_stops_cleanly(serpapi, tmp_path, capsys):
+    # Long rows, so the undecodable bytes come after the first chunk the reader decodes
+    keywords = [f"keyword {index} {'x' * 200}" for index in range(100)]
+    path = tmp_path / 'keywords.csv'
+    path.write_bytes('\n'.join(['keyword'] + keywords).encode() + b'\n\xff\xfe broken\nlater\n')
+    stats = LoadStats()
+    storage = MemoryStorageManager()
+
+    run_rank_tracking('example.com', iter_keyword_rows(str(path), stats), run_id='broken', storage_manager=storage)
+
+    saved = [row[0] for row in storage.get_all_results()[1:]]
+    assert saved and saved == keywords[:len(saved)]
+    assert stats.failed_row == stats.rows_read + 1
+    journal = RunJournal('broken')
+    assert not journal.complete
+    assert journal.stopped_reason
+    assert f"Could not read the keyword file after {len(saved)} keywords" in capsys.readouterr().out
+
+
+def test_resuming_a_completed_run_checks_nothing(serpapi, capsys):
+    storage = MemoryStorageManager()
+    run_rank_tracking('example.com', ['one', 'two'], run_id='done', storage_manager=storage)
+    serpapi.reset_stats()
+
+    assert run_rank_tracking('example.com', ['one', 'two', 'three'], run_id='done', storage_manager=storage) == []
+    assert serpapi.stats['requests'] == 0
+    assert 'already completed' in capsys.readouterr().out
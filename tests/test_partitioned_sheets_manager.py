@@ -0,0 +1,125 @@
+"""Tests for per-website Google Sheets partitions, against an in-memory Sheets API"""
+import re
+import copy
+import pytest
+
+pytest.importorskip('googleapiclient')
+
+import httplib2
+from googleapiclient.errors import HttpError
+import partitioned_sheets_manager
+from partitioned_sheets_manager import LEGACY_SHEET, PartitionedSheetsManager
+
+
+class _Call:
+    def __init__(self, function):
+        self._function = function
+
+    def execute(self):
+        return self._function()
+
+
+class FakeSheets:
+    """Just enough of the Sheets v4 API; batchUpdate is atomic and can be made to fail"""
+
+    def __init__(self):
+        self.sheets = {}
+        self.fail_updates = set()
+        self.updates = 0
+
+    def add_sheet(self, title, rows):
+        self.sheets[title] = {'id': len(self.sheets) + 1, 'rows': [list(row) for row in rows]}
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields=None, range=None):
+        if range is None:
+            return _Call(lambda: {'sheets': [{'properties': {'title': title, 'sheetId': sheet['id']}}
+                                             for title, sheet in self.sheets.items()]})
+        return _Call(lambda: {'values': self._read(range)})
+
+    def batchGet(self, spreadsheetId, ranges):
+        return _Call(lambda: {'valueRanges': [{'values': self._read(cells)} for cells in ranges]})
+
+    def batchUpdate(self, spreadsheetId, body):
+        return _Call(lambda: self._update(body['requests']))
+
+    def _read(self, cells):
+        title, start = re.match(r"'(.*)'!A(\d+)", cells).groups()
+        return copy.deepcopy(self.sheets[title.replace("''", "'")]['rows'][int(start) - 1:])
+
+    def _update(self, requests):
+        self.updates += 1
+        if self.updates in self.fail_updates:
+            raise HttpError(httplib2.Response({'status': 429}), b'Quota exceeded')
+        sheets = copy.deepcopy(self.sheets)
+        by_id = {sheet['id']: sheet for sheet in sheets.values()}
+        for request in requests:
+            if 'addSheet' in request:
+                properties = request['addSheet']['properties']
+                if properties['title'] in sheets:
+                    raise HttpError(httplib2.Response({'status': 400}), b'Sheet already exists')
+                sheets[properties['title']] = by_id[properties['sheetId']] = {'id': properties['sheetId'], 'rows': []}
+            elif 'appendCells' in request:
+                by_id[request['appendCells']['sheetId']]['rows'].extend(
+                    [cell['userEnteredValue']['stringValue'] for cell in row['values']]
+                    for row in request['appendCells']['rows'])
+            elif 'updateCells' in request:
+                target = request['updateCells']['range']
+                row = by_id[target['sheetId']]['rows'][target['startRowIndex']]
+                values = [cell['userEnteredValue']['stringValue']
+                          for cell in request['updateCells']['rows'][0]['values']]
+                row.extend([''] * (target['startColumnIndex'] + len(values) - len(row)))
+                row[target['startColumnIndex']:target['startColumnIndex'] + len(values)] = values
+        self.sheets = sheets
+        return {}
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    fake = FakeSheets()
+    monkeypatch.setattr(PartitionedSheetsManager, '_authenticate', lambda self: fake)
+    monkeypatch.setattr(partitioned_sheets_manager, 'MIGRATION_BATCH_ROWS', 5)
+    return fake
+
+
+def legacy_rows(count):
+    return [[f'keyword {index}', f'site{index % 2}.com', str(index + 1), '', '2024-01-01 10:00:00', '', '', '']
+            for index in range(count)]
+
+
+def manager():
+    return PartitionedSheetsManager(spreadsheet_id='sheet', directory_sheet='Directory')
+
+
+def test_legacy_rows_are_copied_into_partitions(sheets):
+    sheets.add_sheet(LEGACY_SHEET, [partitioned_sheets_manager.HEADERS] + legacy_rows(12))
+
+    assert sorted(manager().websites()) == ['site0.com', 'site1.com']
+    assert len(manager().get_all_results()) == 13
+
+
+def test_interrupted_migration_resumes_without_losing_or_duplicating_rows(sheets):
+    sheets.add_sheet(LEGACY_SHEET, [partitioned_sheets_manager.HEADERS] + legacy_rows(12))
+    sheets.fail_updates = {3}  # the second batch of copied rows
+
+    first = manager()
+    with pytest.raises(HttpError):
+        first.websites()
+
+    rows = manager().get_all_results()
+    assert sorted(row[0] for row in rows[1:]) == sorted(row[0] for row in legacy_rows(12))
+    assert sheets.sheets['Directory']['rows'][0][-1] == partitioned_sheets_manager.MIGRATION_DONE
+
+
+def test_new_rows_go_to_their_website_sheet(sheets):
+    store = manager()
+    store.append_results([{'keyword': 'shoes', 'website_url': 'a.com', 'ranking_position': 3,
+                           'found_url': 'https://a.com/', 'checked_on': '2024-01-01 10:00:00'}])
+
+    assert [row[0] for row in store.get_website_results('a.com')[1:]] == ['shoes']
+    assert store.get_website_results('b.com') == [partitioned_sheets_manager.HEADERS]
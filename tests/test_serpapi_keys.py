@@ -0,0 +1,73 @@
+"""Tests for the SerpAPI key pool"""
+import pytest
+from serpapi_keys import KeyPool, KeyPoolExhausted, parse_keys
+
+
+def pool(spec: str) -> KeyPool:
+    return KeyPool(parse_keys(spec), retire_seconds=60, cooldown_seconds=60)
+
+
+def test_keys_ending_alike_get_distinct_labels():
+    keys = parse_keys('aaaa1234,bbbb1234:100,aaaa1234')
+    assert [key.label for key in keys] == ['#1...1234', '#2...1234']
+    assert keys[1].hourly_limit == 100
+
+
+def test_limits_are_parsed():
+    key, = parse_keys('abcd:100:5')
+    assert (key.hourly_limit, key.searches_left) == (100, 5)
+    with pytest.raises(ValueError):
+        parse_keys('abcd:many')
+
+
+def test_acquire_prefers_headroom():
+    keys = pool('low1:10:1,high:10:50')
+    assert keys.acquire().key == 'high'
+
+
+def test_calls_spread_over_idle_keys():
+    keys = pool('aaaa,bbbb')
+    first, second = keys.acquire(), keys.acquire()
+    assert first is not second
+
+
+def test_rejected_keys_are_retired_until_pool_is_exhausted():
+    keys = pool('aaaa,bbbb')
+    first = keys.acquire()
+    assert keys.release(first, 401) == 'auth'
+    second = keys.acquire()
+    assert second is not first
+    assert keys.release(second, 429, 'Your account has run out of searches.') == 'quota'
+    assert not keys.available()
+    with pytest.raises(KeyPoolExhausted):
+        keys.acquire()
+    assert [entry['retired'] for entry in keys.usage()] == ['auth', 'quota']
+
+
+def test_throttled_key_cools_down():
+    keys = pool('aaaa,bbbb')
+    first = keys.acquire()
+    assert keys.release(first, 429, 'Too many requests') == 'throttled'
+    assert keys.available()
+    # The cooling key is passed over even though it has no calls in flight
+    second = keys.acquire()
+    assert second is not first
+    keys.release(second, 200)
+    assert keys.acquire() is not first
+
+
+def test_successful_calls_use_up_searches_left():
+    keys = pool('aaaa::2')
+    key = keys.acquire()
+    keys.release(key, 200)
+    assert key.searches_left == 1
+    assert key.inflight == 0
+
+
+def test_abandon_frees_key_without_outcome():
+    keys = pool('aaaa::2')
+    key = keys.acquire()
+    keys.abandon(key)
+    assert key.inflight == 0
+    assert key.errors == 0
+    assert key.searches_left == 2
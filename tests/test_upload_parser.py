@@ -0,0 +1,58 @@
+"""Tests for streaming keyword uploads"""
+import io
+import gzip
+import pytest
+from upload_parser import UploadError, parse_keyword_upload
+
+BOUNDARY = 'test-boundary'
+
+
+def multipart(content: bytes, filename: str = 'keywords.csv') -> bytes:
+    return (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode() + content + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def parse(body: bytes, mimetype: str = 'multipart/form-data', **limits):
+    return parse_keyword_upload(io.BytesIO(body), mimetype, BOUNDARY, **limits)
+
+
+def test_multipart_upload():
+    parsed = parse(multipart(b'keyword\nshoes\nboots\nshoes\n'))
+    assert parsed['keywords'] == ['shoes', 'boots']
+    assert parsed['duplicates'] == 1
+
+
+def test_truncated_multipart_is_rejected():
+    body = multipart(b'keyword\nshoes\nboots\n')
+    with pytest.raises(UploadError) as error:
+        parse(body[:len(body) // 2])
+    assert error.value.status_code == 400
+
+
+def test_keyword_for_several_urls_is_returned_once():
+    parsed = parse(b'keyword,url,location\nshoes,a.com,\nshoes,b.com,\nshoes,a.com,Germany\n', 'text/csv')
+    assert parsed['keywords'] == ['shoes']
+    assert len(parsed['rows']) == 3
+
+
+def test_gzip_size_limit_applies_to_decompressed_data():
+    body = gzip.compress(b'keyword\n' + b'shoes\n' * 100000)
+    with pytest.raises(UploadError) as error:
+        parse(body, 'application/gzip', max_bytes=len(body) * 2)
+    assert error.value.status_code == 413
+
+
+def test_row_limit_counts_duplicates():
+    with pytest.raises(UploadError) as error:
+        parse(b'keyword\n' + b'shoes\n' * 20, 'text/csv', max_rows=10)
+    assert error.value.status_code == 413
+
+
+@pytest.mark.parametrize('body', [
+    gzip.compress(b'keyword\nshoes\n')[:-6],
+    b'\x1f\x8b' + b'not gzip at all',
+])
+def test_corrupt_gzip_is_rejected(body):
+    with pytest.raises(UploadError) as error:
+        parse(body, 'application/gzip')
+    assert error.value.status_code == 400
@@ -0,0 +1,95 @@
+"""Tests for the SQLite work queue"""
+import time
+import sqlite3
+import pytest
+from rank_result import RankResult
+from rank_worker import LeaseHeartbeat
+from work_queue import WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(str(tmp_path / 'queue.db'), lease_seconds=60, max_attempts=2)
+
+
+def rows(website_url, *keywords):
+    return [(keyword, website_url, 'United States', None) for keyword in keywords]
+
+
+def test_targets_of_one_keyword_share_a_task(queue):
+    job_id = queue.enqueue(rows('a.com', 'shoes') + rows('b.com', 'shoes'))
+    task, = queue.lease('w1')
+
+    assert task.targets == ['a.com', 'b.com']
+    assert queue.lease('w1') == []
+    assert queue.job_status(job_id)['tasks'] == 1
+
+
+def test_interactive_jobs_are_leased_first(queue):
+    queue.enqueue(rows('a.com', 'one', 'two'), source='cli')
+    queue.enqueue(rows('b.com', 'web'), source='web')
+
+    assert [task.keyword for task in queue.lease('w1', limit=3)] == ['web', 'one', 'two']
+
+
+def test_tenants_take_turns(queue):
+    queue.enqueue(rows('a.com', 'a1', 'a2', 'a3'))
+    queue.enqueue(rows('b.com', 'b1', 'b2', 'b3'))
+
+    assert [task.keyword for task in queue.lease('w1', limit=4)] == ['a1', 'b1', 'a2', 'b2']
+
+
+def test_acked_job_completes(queue):
+    job_id = queue.enqueue(rows('a.com', 'shoes'))
+    task, = queue.lease('w1')
+
+    assert queue.ack(task, 'w1', [RankResult.found('shoes', 'a.com', 3, 'https://a.com/')])
+    assert queue.job_status(job_id)['state'] == 'complete'
+    assert queue.job_results(job_id)[0].position == 3
+
+
+def test_expired_lease_is_handed_out_again(queue):
+    queue.lease_seconds = 0.1
+    queue.enqueue(rows('a.com', 'shoes'))
+    task, = queue.lease('w1')
+    time.sleep(0.2)
+
+    assert [again.task_id for again in queue.lease('w2')] == [task.task_id]
+    assert not queue.ack(task, 'w1', [])
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    queue.lease_seconds = 0.3
+    queue.enqueue(rows('a.com', 'shoes'))
+    task, = queue.lease('w1')
+
+    with LeaseHeartbeat(queue, task, 'w1'):
+        time.sleep(0.8)
+        assert queue.lease('w2') == []
+    assert queue.ack(task, 'w1', [])
+
+
+def test_failed_task_is_retried_then_failed(queue, monkeypatch):
+    monkeypatch.setattr('config.QUEUE_RETRY_DELAY_SECONDS', 0)
+    job_id = queue.enqueue(rows('a.com', 'shoes'))
+
+    task, = queue.lease('w1')
+    assert queue.fail(task, 'w1', 'timeout')
+    task, = queue.lease('w1')
+    assert not queue.fail(task, 'w1', 'timeout')
+    assert queue.job_status(job_id)['state'] == 'complete'
+
+
+def test_tasks_of_older_databases_get_their_job_lane(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    WorkQueue(path).enqueue(rows('a.com', 'shoes'), source='web')
+    connection = sqlite3.connect(path)
+    connection.execute('DROP INDEX tasks_by_lane')
+    connection.execute('ALTER TABLE tasks DROP COLUMN priority')
+    connection.execute('ALTER TABLE tasks DROP COLUMN tenant')
+    connection.commit()
+    connection.close()
+
+    queue = WorkQueue(path)
+    assert queue._connection().execute('SELECT priority, tenant FROM tasks').fetchone() == (0, 'a.com')
+    assert [task.keyword for task in queue.lease('w1')] == ['shoes']
@@ -0,0 +1,193 @@
+"""
+Upload Parser Module
+Parses keyword CSV uploads incrementally from the request stream, without temporary files
+"""
+import io
+import csv
+import gzip
+import zlib
+from typing import Dict, Iterator, List, Optional, IO
+from werkzeug.sansio.multipart import MultipartDecoder, File, Field, Data, Epilogue, NeedData
+from keyword_loader import GZIP_MAGIC, LoadStats, iter_keyword_rows
+import config
+
+# Bytes read from the request stream per iteration
+CHUNK_SIZE = 64 * 1024
+
+ALLOWED_EXTENSIONS = ('.csv', '.csv.gz')
+
+
+class UploadError(ValueError):
+    """Raised when an upload is rejected; carries the HTTP status to return"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only binary stream over an iterator of byte chunks, enforcing a size limit"""
+
+    def __init__(self, chunks: Iterator[bytes], max_bytes: int = None):
+        self._chunks = chunks
+        self._buffer = b''
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self.bytes_read += len(chunk)
+            if self.max_bytes and self.bytes_read > self.max_bytes:
+                raise UploadError(f"File is too large (limit is {self.max_bytes} bytes)", 413)
+            self._buffer = chunk
+
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _read_chunks(stream: IO[bytes]) -> Iterator[bytes]:
+    """Yield raw chunks from a stream until EOF"""
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_multipart_file(stream: IO[bytes], boundary: bytes, field_name: str = 'file') -> Iterator[bytes]:
+    """
+    Yield the contents of one file field of a multipart/form-data body as it arrives
+
+    Args:
+        stream: Request body stream
+        boundary: Multipart boundary from the Content-Type header
+        field_name: Name of the form field carrying the file
+
+    Yields:
+        Byte chunks of the file contents
+
+    Raises:
+        UploadError: If the body is malformed or truncated, the field is missing or the
+                     file type is not supported
+    """
+    decoder = MultipartDecoder(boundary)
+    in_file = False
+    found = False
+
+    while True:
+        try:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                chunk = stream.read(CHUNK_SIZE)
+                decoder.receive_data(chunk or None)
+                continue
+        except ValueError as e:
+            # werkzeug reports truncated or malformed bodies as plain ValueErrors
+            raise UploadError(f"Malformed multipart upload ({e})")
+
+        if isinstance(event, File):
+            in_file = event.name == field_name and not found
+            if in_file:
+                found = True
+                filename = (event.filename or '').lower()
+                if not filename:
+                    raise UploadError('No file selected')
+                if not filename.endswith(ALLOWED_EXTENSIONS):
+                    raise UploadError('Only CSV files are supported')
+        elif isinstance(event, Field):
+            in_file = False
+        elif isinstance(event, Data):
+            if in_file and event.data:
+                yield event.data
+            if not event.more_data:
+                in_file = False
+        elif isinstance(event, Epilogue):
+            break
+
+    if not found:
+        raise UploadError('No file provided')
+
+
+def parse_keyword_upload(stream: IO[bytes], mimetype: str, boundary: Optional[str] = None,
+                         max_bytes: int = None, max_rows: int = None) -> Dict:
+    """
+    Parse an uploaded keyword file straight from the request stream
+
+    Accepts a multipart/form-data body with a 'file' field (as sent by the web
+    UI) or a raw CSV / gzip body. Rows are parsed as bytes arrive, duplicate
+    rows are dropped while reading (a keyword listed for several URLs or
+    locations is returned once in 'keywords' and once per row in 'rows'), and size and row limits are enforced
+    without buffering the whole file. The size limit applies to the upload and,
+    for gzip, to the decompressed data; the row limit counts duplicates too.
+
+    Args:
+        stream: Request body stream
+        mimetype: Request mimetype
+        boundary: Multipart boundary (required for multipart bodies)
+        max_bytes: Maximum upload size, compressed and decompressed. If not provided, uses config.UPLOAD_MAX_BYTES
+        max_rows: Maximum number of keyword rows. If not provided, uses config.UPLOAD_MAX_ROWS
+
+    Returns:
+        Dictionary with 'keywords', 'rows', 'duplicates' and 'stats'
+
+    Raises:
+        UploadError: If the upload is missing, unsupported, corrupt or exceeds a limit
+    """
+    max_bytes = max_bytes or config.UPLOAD_MAX_BYTES
+    max_rows = max_rows or config.UPLOAD_MAX_ROWS
+
+    if mimetype == 'multipart/form-data':
+        if not boundary:
+            raise UploadError('Malformed multipart upload (missing boundary)')
+        chunks = iter_multipart_file(stream, boundary.encode('latin-1'))
+    else:
+        chunks = _read_chunks(stream)
+
+    reader = io.BufferedReader(ChunkReader(chunks, max_bytes), CHUNK_SIZE)
+    if reader.peek(2)[:2] == GZIP_MAGIC:
+        # Decompress here so the size limit also caps the decompressed data
+        decompressed = _read_chunks(gzip.GzipFile(fileobj=reader, mode='rb'))
+        reader = io.BufferedReader(ChunkReader(decompressed, max_bytes), CHUNK_SIZE)
+    stats = LoadStats()
+    keywords: List[str] = []
+    rows: List[Dict] = []
+    seen = set()
+    seen_keywords = set()
+    duplicates = 0
+
+    try:
+        for row in iter_keyword_rows(reader, stats):
+            # Duplicates count too: they cost as much to parse
+            if stats.rows_loaded > max_rows:
+                raise UploadError(f"Too many keywords (limit is {max_rows})", 413)
+
+            key = (row.keyword.casefold(), row.url, row.location)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            rows.append(row._asdict())
+            if key[0] not in seen_keywords:
+                seen_keywords.add(key[0])
+                keywords.append(row.keyword)
+    except UnicodeDecodeError:
+        raise UploadError('File is not valid UTF-8 text')
+    except (gzip.BadGzipFile, EOFError, zlib.error):
+        raise UploadError('Compressed file is corrupt or truncated')
+    except csv.Error as e:
+        raise UploadError(f"File is not valid CSV: {e}")
+
+    return {
+        'keywords': keywords,
+        'rows': rows,
+        'duplicates': duplicates,
+        'stats': stats.to_dict()
+    }
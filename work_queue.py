@@ -0,0 +1,512 @@
+"""
+Work Queue Module
+Durable SQLite queue of keyword checks shared by rank_worker.py processes
+"""
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from rank_result import RankResult
+from priority_lanes import PRIORITY_CLASSES, FairShare, priority_for_source, priority_rank
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    tasks INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    finished_at REAL,
+    priority INTEGER NOT NULL DEFAULT 1,
+    tenant TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    location TEXT NOT NULL,
+    depth INTEGER,
+    targets TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    results TEXT,
+    error TEXT,
+    priority INTEGER NOT NULL DEFAULT 1,
+    tenant TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (state, available_at);
+CREATE INDEX IF NOT EXISTS tasks_by_lane ON tasks (state, priority, tenant, task_id);
+CREATE INDEX IF NOT EXISTS tasks_by_job ON tasks (job_id, state);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state);
+CREATE TABLE IF NOT EXISTS fair_share (
+    priority INTEGER NOT NULL,
+    tenant TEXT NOT NULL,
+    finish REAL NOT NULL,
+    PRIMARY KEY (priority, tenant)
+);
+CREATE TABLE IF NOT EXISTS lane_clock (
+    priority INTEGER PRIMARY KEY,
+    clock REAL NOT NULL
+);
+"""
+
+# Columns added after the first release, with their definitions for older databases
+JOB_COLUMNS = {
+    'priority': 'INTEGER NOT NULL DEFAULT 1',
+    'tenant': "TEXT NOT NULL DEFAULT ''"
+}
+
+# Tasks carry their job's priority and tenant too, so lane heads come from an index
+TASK_COLUMNS = JOB_COLUMNS
+
+# Next runnable task of each (priority, tenant): the candidates of a lease. Lanes come from the
+# running jobs and each head is the first runnable entry of the lane in tasks_by_lane, so a lease
+# does not scan the pending backlog
+LANE_HEADS = """
+SELECT priority, tenant, head FROM (
+    SELECT lanes.priority, lanes.tenant, (
+        SELECT task_id FROM tasks INDEXED BY tasks_by_lane
+        WHERE tasks.state = 'pending' AND tasks.priority = lanes.priority AND tasks.tenant = lanes.tenant
+              AND tasks.available_at <= ?
+        ORDER BY task_id LIMIT 1
+    ) AS head
+    FROM (SELECT DISTINCT priority, tenant FROM jobs WHERE state = 'running') AS lanes
+)
+WHERE head IS NOT NULL
+"""
+
+# Task states: pending -> leased -> done | failed (leased -> pending again on retry or lease expiry)
+# Job states: running -> complete (every task done or failed) -> saving (leased by a worker) -> saved
+# Leases serve the highest priority class first (see priority_lanes.py); within a class, tenants
+# (the job's website) take turns in proportion to config.TENANT_WEIGHTS, oldest task first
+
+
+class Task(NamedTuple):
+    """One keyword check (all targets share the fetched result pages)"""
+    task_id: int
+    job_id: str
+    keyword: str
+    location: str
+    depth: Optional[int]
+    targets: List[str]
+    attempts: int
+
+
+class WorkQueue:
+    """SQLite-backed queue of rank check jobs with leases, acknowledgements and retries"""
+
+    def __init__(self, path: str = None, lease_seconds: float = None, max_attempts: int = None):
+        """
+        Initialize the Work Queue
+
+        Workers on other machines can share the queue through a network file
+        system that supports SQLite locking; otherwise run them on one host.
+
+        Args:
+            path: SQLite database file. If not provided, uses config.WORK_QUEUE_DB
+            lease_seconds: How long a worker owns a task before it is considered abandoned.
+                           If not provided, uses config.QUEUE_LEASE_SECONDS
+            max_attempts: Attempts before a task is marked failed. If not provided, uses config.QUEUE_MAX_ATTEMPTS
+        """
+        self.path = path or config.WORK_QUEUE_DB
+        self.lease_seconds = lease_seconds or config.QUEUE_LEASE_SECONDS
+        self.max_attempts = max_attempts or config.QUEUE_MAX_ATTEMPTS
+        self._local = threading.local()
+        connection = self._connection()
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(jobs)')}
+        for column, definition in JOB_COLUMNS.items():
+            if columns and column not in columns:
+                connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(tasks)')}
+        for column, definition in TASK_COLUMNS.items():
+            if columns and column not in columns:
+                connection.execute(f"ALTER TABLE tasks ADD COLUMN {column} {definition}")
+                connection.execute(f"UPDATE tasks SET {column} = "
+                                   f"(SELECT {column} FROM jobs WHERE jobs.job_id = tasks.job_id)")
+        connection.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection (autocommit; transactions are explicit)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _write(self):
+        """Context manager for a write transaction that takes the database lock up front"""
+        return _WriteTransaction(self._connection())
+
+    @staticmethod
+    def new_job_id() -> str:
+        """
+        Generate a new, sortable job identifier
+
+        Returns:
+            Job ID string (e.g. 20240101-090000-3fa2c1)
+        """
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def enqueue(self, rows: Iterable[Tuple[str, str, str, Optional[int]]], sheet_name: str = "Rank Tracking",
+                source: str = 'cli', priority: str = None, tenant: str = None) -> Optional[str]:
+        """
+        Add a job made of (keyword, website_url, location, depth) rows
+
+        Rows with the same keyword, location and depth become one task whose
+        targets are all of their website URLs.
+
+        Args:
+            rows: Keyword rows (e.g. KeywordRow tuples)
+            sheet_name: Google Sheets sheet name the job's results are saved to
+            source: Who enqueued the job (cli, scheduler, web)
+            priority: Priority class (see priority_lanes.PRIORITY_CLASSES). If not provided,
+                      web jobs are interactive and others batch
+            tenant: Fair-share key. If not provided, the website URL of the first row
+
+        Returns:
+            Job ID, or None if there were no rows
+        """
+        grouped: Dict[Tuple[str, str, Optional[int]], List[str]] = {}
+        for keyword, website_url, location, depth in rows:
+            if tenant is None:
+                tenant = website_url or ''
+            targets = grouped.setdefault((keyword, location, depth), [])
+            if website_url not in targets:
+                targets.append(website_url)
+        if not grouped:
+            return None
+
+        job_id = self.new_job_id()
+        now = time.time()
+        rank = priority_rank(priority or priority_for_source(source))
+        with self._write() as connection:
+            connection.execute(
+                'INSERT INTO jobs (job_id, source, sheet_name, created_at, tasks, state, priority, tenant) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, source, sheet_name, now, len(grouped), 'running', rank, tenant)
+            )
+            connection.executemany(
+                'INSERT INTO tasks (job_id, keyword, location, depth, targets, state, available_at, priority, tenant) '
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)",
+                [(job_id, keyword, location, depth, json.dumps(targets), now, rank, tenant)
+                 for (keyword, location, depth), targets in grouped.items()]
+            )
+        return job_id
+
+    def lease(self, worker_id: str, limit: int = 1) -> List[Task]:
+        """
+        Lease up to `limit` runnable tasks
+
+        Tasks whose lease expired (their worker died or hung) are handed out
+        again, or failed once they have used up their attempts. Interactive jobs
+        are served before batch jobs; within a class, the tenant with the
+        smallest fair-share start tag goes next.
+
+        Args:
+            worker_id: Identifier of the leasing worker
+            limit: Maximum number of tasks
+
+        Returns:
+            Leased tasks (empty if none are runnable)
+        """
+        now = time.time()
+        with self._write() as connection:
+            self._expire_leases(connection, now)
+            fair_share = FairShare(
+                {(rank, tenant): finish for rank, tenant, finish in
+                 connection.execute('SELECT priority, tenant, finish FROM fair_share')},
+                dict(connection.execute('SELECT priority, clock FROM lane_clock').fetchall())
+            )
+            rows = []
+            while len(rows) < limit:
+                head = fair_share.pick(connection.execute(LANE_HEADS, (now,)).fetchall())
+                if head is None:
+                    break
+                rank, tenant, task_id = head
+                clock, finish = fair_share.charge(rank, tenant)
+                connection.execute('INSERT OR REPLACE INTO fair_share VALUES (?, ?, ?)', (rank, tenant, finish))
+                connection.execute('INSERT OR REPLACE INTO lane_clock VALUES (?, ?)', (rank, clock))
+                rows.append(connection.execute(
+                    'SELECT task_id, job_id, keyword, location, depth, targets, attempts FROM tasks WHERE task_id = ?',
+                    (task_id,)
+                ).fetchone())
+                connection.execute(
+                    "UPDATE tasks SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE task_id = ?",
+                    (worker_id, now + self.lease_seconds, task_id)
+                )
+            # Tenants at or behind their class clock start from the clock anyway
+            connection.execute('DELETE FROM fair_share WHERE finish <= '
+                               '(SELECT clock FROM lane_clock WHERE lane_clock.priority = fair_share.priority)')
+        return [Task(task_id, job_id, keyword, location, depth, json.loads(targets), attempts + 1)
+                for task_id, job_id, keyword, location, depth, targets, attempts in rows]
+
+    def has_pending(self) -> bool:
+        """Return True if tasks are waiting to run (including retries that are backing off)"""
+        return self._connection().execute("SELECT 1 FROM tasks WHERE state = 'pending' LIMIT 1").fetchone() is not None
+
+    def _expire_leases(self, connection: sqlite3.Connection, now: float):
+        """Return abandoned tasks to the queue, failing those out of attempts"""
+        expired = connection.execute(
+            "SELECT task_id, job_id, attempts FROM tasks WHERE state = 'leased' AND lease_expires < ?", (now,)
+        ).fetchall()
+        for task_id, job_id, attempts in expired:
+            if attempts >= self.max_attempts:
+                connection.execute(
+                    "UPDATE tasks SET state = 'failed', lease_owner = NULL, error = ? WHERE task_id = ?",
+                    (f"Abandoned by workers after {attempts} attempts", task_id)
+                )
+                self._update_job(connection, job_id, now)
+            else:
+                connection.execute(
+                    "UPDATE tasks SET state = 'pending', lease_owner = NULL, available_at = ? WHERE task_id = ?",
+                    (now, task_id)
+                )
+
+    def extend(self, task_id: int, worker_id: str) -> bool:
+        """
+        Renew a lease for a long-running task
+
+        Returns:
+            False if the lease was lost (the task was handed to another worker)
+        """
+        with self._write() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE task_id = ? AND state = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, task_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def ack(self, task: Task, worker_id: str, results: List[RankResult]) -> bool:
+        """
+        Record a finished task
+
+        Args:
+            task: Leased task
+            worker_id: Identifier of the worker holding the lease
+            results: One result per target
+
+        Returns:
+            False if the lease was lost, in which case the results are discarded
+        """
+        payload = json.dumps([dict(result) for result in results])
+        now = time.time()
+        with self._write() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET state = 'done', results = ?, error = NULL, lease_owner = NULL "
+                "WHERE task_id = ? AND state = 'leased' AND lease_owner = ?",
+                (payload, task.task_id, worker_id)
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._update_job(connection, task.job_id, now)
+        return True
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        """
+        Record a failed attempt; the task is retried with backoff until it runs out of attempts
+
+        Args:
+            task: Leased task
+            worker_id: Identifier of the worker holding the lease
+            error: Error message
+
+        Returns:
+            True if the task will be retried
+        """
+        now = time.time()
+        retry = task.attempts < self.max_attempts
+        with self._write() as connection:
+            if retry:
+                delay = config.QUEUE_RETRY_DELAY_SECONDS * (2 ** (task.attempts - 1))
+                connection.execute(
+                    "UPDATE tasks SET state = 'pending', available_at = ?, lease_owner = NULL, error = ? "
+                    "WHERE task_id = ? AND state = 'leased' AND lease_owner = ?",
+                    (now + delay, error, task.task_id, worker_id)
+                )
+            else:
+                connection.execute(
+                    "UPDATE tasks SET state = 'failed', lease_owner = NULL, error = ? "
+                    "WHERE task_id = ? AND state = 'leased' AND lease_owner = ?",
+                    (error, task.task_id, worker_id)
+                )
+                self._update_job(connection, task.job_id, now)
+        return retry
+
+    @staticmethod
+    def _update_job(connection: sqlite3.Connection, job_id: str, now: float):
+        """Mark a running job complete once none of its tasks are outstanding"""
+        outstanding = connection.execute(
+            "SELECT 1 FROM tasks WHERE job_id = ? AND state IN ('pending', 'leased') LIMIT 1", (job_id,)
+        ).fetchone()
+        if outstanding is None:
+            connection.execute(
+                "UPDATE jobs SET state = 'complete', finished_at = ? WHERE job_id = ? AND state = 'running'",
+                (now, job_id)
+            )
+
+    def claim_completed_job(self, worker_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Lease a completed job whose results have not been saved yet
+
+        Saving is leased like tasks, so a worker dying mid-save hands the job to another one.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+
+        Returns:
+            (job_id, sheet_name), or None if no job is waiting to be saved
+        """
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                "SELECT job_id, sheet_name FROM jobs WHERE state = 'complete' "
+                "OR (state = 'saving' AND lease_expires < ?) ORDER BY created_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET state = 'saving', lease_owner = ?, lease_expires = ? WHERE job_id = ?",
+                (worker_id, now + self.lease_seconds, row[0])
+            )
+        return row
+
+    def mark_saved(self, job_id: str, worker_id: str):
+        """Record that a claimed job's results were saved to storage"""
+        with self._write() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = 'saved', lease_owner = NULL WHERE job_id = ? AND lease_owner = ?",
+                (job_id, worker_id)
+            )
+
+    def release_job(self, job_id: str, worker_id: str):
+        """Give up a claimed job after a failed save so it is retried later"""
+        with self._write() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = 'complete', lease_owner = NULL, lease_expires = NULL "
+                "WHERE job_id = ? AND lease_owner = ?",
+                (job_id, worker_id)
+            )
+
+    def job_results(self, job_id: str) -> List[RankResult]:
+        """
+        Collect the results of a job, in enqueue order
+
+        Failed tasks produce an error result for each of their targets.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            List of RankResults for finished tasks
+        """
+        results = []
+        rows = self._connection().execute(
+            "SELECT keyword, location, targets, state, results, error FROM tasks "
+            "WHERE job_id = ? AND state IN ('done', 'failed') ORDER BY task_id", (job_id,)
+        )
+        for keyword, location, targets, state, payload, error in rows:
+            if state == 'done':
+                results.extend(RankResult.from_dict(data, location) for data in json.loads(payload))
+            else:
+                results.extend(RankResult.failed(keyword, url, error or 'Task failed', location=location)
+                               for url in json.loads(targets))
+        return results
+
+    def job_status(self, job_id: str) -> Optional[Dict]:
+        """
+        Summarize a job's progress
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Dictionary with job state and task counts per state, or None if the job does not exist
+        """
+        connection = self._connection()
+        job = connection.execute(
+            'SELECT source, sheet_name, created_at, tasks, state, finished_at, priority, tenant FROM jobs '
+            'WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        if job is None:
+            return None
+
+        source, sheet_name, created_at, task_count, state, finished_at, priority, tenant = job
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        for task_state, count in connection.execute(
+                'SELECT state, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY state', (job_id,)):
+            counts[task_state] = count
+
+        return {
+            'job_id': job_id,
+            'source': source,
+            'priority': PRIORITY_CLASSES[priority] if 0 <= priority < len(PRIORITY_CLASSES) else 'batch',
+            'tenant': tenant,
+            'sheet_name': sheet_name,
+            'state': state,
+            'tasks': task_count,
+            'task_states': counts,
+            'finished': state != 'running',
+            'created_at': created_at,
+            'finished_at': finished_at
+        }
+
+    def wait(self, job_id: str, poll_seconds: float = 2.0, timeout: float = None) -> Optional[Dict]:
+        """
+        Block until a job has finished (all tasks done or failed)
+
+        Args:
+            job_id: Job ID
+            poll_seconds: Seconds between status checks
+            timeout: Give up after this many seconds
+
+        Returns:
+            Final job status, or the latest status if the timeout expired
+        """
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            status = self.job_status(job_id)
+            if status is None or status['finished']:
+                return status
+            if deadline and time.time() >= deadline:
+                return status
+            time.sleep(poll_seconds)
+
+    def stats(self) -> Dict:
+        """Return task counts per state, job counts per state and pending tasks per priority class"""
+        connection = self._connection()
+        pending = connection.execute(
+            "SELECT jobs.priority, COUNT(*) FROM tasks JOIN jobs ON jobs.job_id = tasks.job_id "
+            "WHERE tasks.state = 'pending' GROUP BY jobs.priority"
+        ).fetchall()
+        return {
+            'tasks': dict(connection.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state').fetchall()),
+            'jobs': dict(connection.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall()),
+            'pending_by_priority': {PRIORITY_CLASSES[rank] if 0 <= rank < len(PRIORITY_CLASSES) else 'batch': count
+                                    for rank, count in pending}
+        }
+
+
+class _WriteTransaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK, so concurrent workers never lease the same task"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False